@@ -0,0 +1,45 @@
+"""
+Time and peak memory of building the categorisation frame from a parsed
+document, with the generic `flatten` of every record (the previous
+`Categorisation.df`) and with the columnar extraction of `Categorisation.fields`.
+
+    python -m benchmarks.categorisations --records 20000
+"""
+import argparse
+import tracemalloc
+import timeit
+
+import pandas as pd
+
+from benchmarks.normalize import synthesize
+from eupol.download.sdmx.base import sdmxBase, Categorisation
+
+
+def reference(document: list) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(sdmxBase.flatten(sdmxBase.normalize(document)))
+    return df.drop(columns=[col for col in df.columns if col.startswith("annotations")])
+
+def peak(build) -> int:
+    tracemalloc.start()
+    build()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000, help="synthetic categorisations")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    document = synthesize(args.records)
+    categorisation = Categorisation("ESTAT")
+    expected = reference(document)[list(Categorisation.fields)]
+    pd.testing.assert_frame_equal(pd.DataFrame(categorisation.extract(document)), expected)
+    for name, build in [
+        ("flatten (reference)", lambda: reference(document)),
+        ("columnar", lambda: pd.DataFrame(categorisation.extract(document))),
+        ("columnar, annotations", lambda: pd.DataFrame(categorisation.extract(document, annotations=True))),
+    ]:
+        best = min(timeit.repeat(build, number=1, repeat=args.repeat))
+        print(f"{name:>22}: {1000 * best:8.1f} ms, peak {peak(build) / 2**20:6.1f} MiB")
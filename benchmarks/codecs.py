@@ -0,0 +1,68 @@
+"""
+Size and write/read time of the metadata payloads with every installed
+cache codec, against gzip at level 9 (the previous `to_gzip_json`).
+
+The payloads already in the metadata cache are used (run `Model("ESTAT").init()`
+once to fill it with the real ESTAT documents), otherwise categorisation
+columns are synthesized as in `benchmarks.categorisations`.
+
+    python -m benchmarks.codecs --repeat 5
+    python -m benchmarks.codecs --records 100000
+"""
+import argparse
+import tempfile
+import timeit
+import gzip
+import json
+import io
+import os
+
+from pathlib import Path
+
+from eupol.download.cache import codecs
+from eupol.download.sdmx.metacache import metadata
+from eupol.download.utils import from_gzip_json
+
+
+def payloads(records: int) -> bytes:
+    """The cached metadata payloads as one json document, or a synthetic one"""
+    found = sorted(metadata.directory.glob("**/payload.json.gz")) if metadata.directory.exists() else []
+    if found:
+        print(f"{len(found)} payloads from {metadata.directory}")
+        return json.dumps([from_gzip_json(str(fname)) for fname in found]).encode()
+    from benchmarks.normalize import synthesize
+    from eupol.download.sdmx.base import Categorisation
+
+    print(f"no cached payloads, {records} synthetic categorisations")
+    return json.dumps(Categorisation("ESTAT").extract(synthesize(records), annotations=True)).encode()
+
+def level9(fname: str, mode: str) -> io.IOBase:
+    return gzip.open(fname, mode, compresslevel=9)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50000, help="synthetic categorisations")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = payloads(args.records)
+    print(f"{len(data) / 2**20:.1f} MiB of json")
+    candidates = [("gzip -9 (reference)", level9)]
+    candidates += [(codec.name, codec.open) for codec in codecs.codecs.values() if codecs.installed(codec.name)]
+    with tempfile.TemporaryDirectory() as directory:
+        for name, opener in candidates:
+            fname = os.path.join(directory, "payload")
+
+            def write():
+                with opener(fname, "wb") as f:
+                    f.write(data)
+
+            def read():
+                with codecs.open(fname, "rb") as f:
+                    return f.read()
+
+            wbest = min(timeit.repeat(write, number=1, repeat=args.repeat))
+            assert read() == data
+            rbest = min(timeit.repeat(read, number=1, repeat=args.repeat))
+            size = Path(fname).stat().st_size
+            print(f"{name:>20}: {size / 2**20:6.2f} MiB ({len(data) / size:5.1f}x), write {1000 * wbest:7.1f} ms, read {1000 * rbest:7.1f} ms")
@@ -0,0 +1,55 @@
+"""
+Time the imports of the package in fresh interpreters, the cost every
+short-lived process pays before doing anything, minus the interpreter
+startup itself.
+
+    python -m benchmarks.imports --repeat 10
+    python -m benchmarks.imports --importtime "import eupol"
+"""
+import argparse
+import statistics
+import subprocess
+import time
+import sys
+
+statements = [
+    "import eupol",
+    "import eupol.download",
+    "from eupol.download import tmpcache",
+    "from eupol.download.sdmx import Model",
+    "from eupol import as_geodf; as_geodf.__module__",
+]
+
+def timed(statement: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", statement], check=True)
+    return time.perf_counter() - start
+
+def importtime(statement: str, top: int = 15):
+    """The slowest modules imported by `statement`, from `-X importtime`"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        check=True, capture_output=True, text=True,
+    ).stderr
+    rows = []
+    # "import time: self [us] | cumulative | imported package"
+    for line in stderr.splitlines()[1:]:
+        _, cumulative, module = line.split("|")
+        rows.append((int(cumulative), module.rstrip()))
+    for cumulative, module in sorted(rows, reverse=True)[:top]:
+        print(f"{cumulative / 1000:8.1f} ms {module}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--importtime", metavar="STATEMENT", help="list the slowest modules imported by STATEMENT")
+    args = parser.parse_args()
+
+    if args.importtime:
+        importtime(args.importtime)
+        sys.exit()
+    startup = statistics.median(timed("pass") for _ in range(args.repeat))
+    print(f"{'interpreter startup':>48}: {1000 * startup:8.1f} ms")
+    for statement in statements:
+        best = statistics.median(timed(statement) for _ in range(args.repeat))
+        print(f"{statement:>48}: {1000 * (best - startup):8.1f} ms")
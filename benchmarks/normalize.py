@@ -0,0 +1,101 @@
+"""
+Per-node cost of the key normalization on a categorisation document.
+
+By default a document shaped like the ESTAT `categorisation/ESTAT/all`
+response (as parsed by xmltodict) is synthesized; pass `--xml` with a
+saved response to run on the real thing. The previous recursive
+`rclean(recurlang(...))` pair is kept here as the reference.
+
+    python -m benchmarks.normalize --records 20000
+    python -m benchmarks.normalize --xml categorisation.xml
+"""
+import argparse
+import timeit
+import copy
+
+import xmltodict as xtd
+
+from eupol.download.sdmx.base import sdmxBase, to_snake_case
+
+
+def _cleantxt(x):
+    return to_snake_case(x.replace("s:", "").replace("c:", "").replace("@", "").replace("m:", ""))
+
+def recurlang(data):
+    if isinstance(data, (str, int, float)):
+        return data
+    elif isinstance(data, list):
+        return [recurlang(o) for o in data]
+    elif isinstance(data, dict):
+        for k in data.keys():
+            if sdmxBase.name in k or sdmxBase.description in k:
+                data[k] = sdmxBase.multilang(data[k])
+            else:
+                data[k] = recurlang(data[k])
+        return data
+    else:
+        return data
+
+def rclean(data):
+    if isinstance(data, (str, int, float)):
+        return data
+    elif isinstance(data, list):
+        return [rclean(o) for o in data]
+    elif isinstance(data, dict):
+        return { _cleantxt(k) : rclean(v) for k, v in data.items()}
+
+def synthesize(records: int) -> list:
+    ref = lambda **attrs: {"@" + k: v for k, v in attrs.items()}
+    return [{
+        "@id": f"FLOW_{i}_t_cat_{i % 300}",
+        "@urn": f"urn:sdmx:org.sdmx.infomodel.categoryscheme.Categorisation=ESTAT:FLOW_{i}(1.0)",
+        "@agencyID": "ESTAT",
+        "@version": "1.0",
+        "@isFinal": "true",
+        "c:Annotations": {"c:Annotation": [
+            {"c:AnnotationTitle": "2022-12-05T23:00:00+0100", "c:AnnotationType": "UPDATE_DATA"},
+            {"c:AnnotationTitle": "2022-11-21T23:00:00+0100", "c:AnnotationType": "UPDATE_STRUCTURE"},
+        ]},
+        "c:Name": [
+            {"@xml:lang": lang, "#text": f"Categorisation {i} ({lang})"} for lang in ("de", "en", "fr")
+        ],
+        "s:Source": {"Ref": ref(id=f"FLOW_{i}", version="1.0", agencyID="ESTAT", package="datastructure", **{"class": "Dataflow"})},
+        "s:Target": {"Ref": ref(id=f"t_cat_{i % 300}", maintainableParentID="t_economy", maintainableParentVersion="1.0", agencyID="ESTAT", package="categoryscheme", **{"class": "Category"})},
+    } for i in range(records)]
+
+def nodes(data) -> int:
+    count, stack = 0, [data]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if isinstance(node, dict):
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=20000, help="synthetic categorisations")
+    parser.add_argument("--xml", help="saved categorisation response to use instead")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.xml:
+        with open(args.xml, "rb") as f:
+            dxml = xtd.parse(f)
+        document = dxml[sdmxBase.structure][sdmxBase.structures][sdmxBase.categorisations][sdmxBase.categorisation]
+    else:
+        document = synthesize(args.records)
+    total = nodes(document)
+    print(f"{total} nodes")
+
+    assert sdmxBase.normalize(document) == rclean(recurlang(copy.deepcopy(document)))
+    for name, run in [
+        ("recursive (reference)", lambda doc: rclean(recurlang(doc))),
+        ("iterative, memoized", sdmxBase.normalize),
+    ]:
+        # the reference mutates its input, give every run a fresh copy
+        copies = [copy.deepcopy(document) for _ in range(args.repeat)]
+        best = min(timeit.repeat(lambda: run(copies.pop()), number=1, repeat=args.repeat))
+        print(f"{name:>22}: {1000 * best:8.1f} ms, {1e9 * best / total:6.0f} ns/node")
@@ -0,0 +1,70 @@
+"""
+Time `tmpcache` hits on a table of contents sized frame (synthesized as in
+`benchmarks.toc`) and on its records as a list of dicts, from the files
+and from the memory tier, against the previous gzipped json round trip
+kept here as the reference.
+
+    python -m benchmarks.tmpcache --flows 5 --repeat 5
+"""
+import argparse
+import tempfile
+import timeit
+import shutil
+import gzip
+import json
+import io
+
+import pandas as pd
+
+from benchmarks.toc import catschemes_json, synthesize
+from eupol.download.sdmx.base import TableOfContents
+
+
+def reference(result, directory: str):
+    """The former json tier: `to_json` wrapped in a gzipped json document, `read_json` on a hit"""
+    fname = directory + "/reference.json.gz"
+    serialized = result.to_json() if isinstance(result, pd.DataFrame) else json.dumps(result)
+    with gzip.open(fname, "wt", encoding="UTF-8") as f:
+        json.dump({"result": serialized}, f)
+
+    def hit():
+        with gzip.open(fname, "rt", encoding="UTF-8") as f:
+            stored = json.load(f)["result"]
+        return pd.read_json(io.StringIO(stored)) if isinstance(result, pd.DataFrame) else json.loads(stored)
+    return hit
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=5, help="dataflows per leaf category")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    tempfile.tempdir = directory
+    # the cache directories are set up when the function is decorated
+    from eupol.download.utils import tmpcache, rc, memory
+    rc.quiet = True
+
+    dfcatschemes = pd.read_json(catschemes_json)
+    dflows, dfcategories = synthesize(dfcatschemes, args.flows)
+    toc = TableOfContents(dflows, dfcategories, dfcatschemes).toc
+    print(f"{toc.shape[0]} rows x {toc.shape[1]} columns")
+
+    def frame():
+        return toc
+
+    def records():
+        return toc.to_dict(orient="records")
+
+    for name, function in [("DataFrame", frame), ("records", records)]:
+        cached = tmpcache(function)
+        result = cached()
+        for tier, hit, entries in [
+            ("json (reference)", reference(result, directory), 0),
+            ("binary", cached, 0),
+            ("memory", cached, 1024),
+        ]:
+            memory.configure(max_entries=entries)
+            best = min(timeit.repeat(hit, number=1, repeat=args.repeat))
+            print(f"{name:>10} {tier:>16}: {1000 * best:8.3f} ms")
+    shutil.rmtree(directory)
@@ -0,0 +1,89 @@
+"""
+Time the `TableOfContents` join on the bundled `catschemes.json`.
+
+The categorisations and dataflows are synthesized from the category
+schemes (`--flows` dataflows per leaf category) so that the table has
+the size of the full ESTAT catalogue. The previous row-wise
+implementation is kept here as the reference.
+
+    python -m benchmarks.toc --flows 5 --repeat 5
+"""
+import argparse
+import timeit
+import pandas as pd
+
+from pathlib import Path
+from eupol.download.sdmx.base import TableOfContents
+
+catschemes_json = Path(__file__).parent.parent.joinpath("catschemes.json")
+
+
+def reference(dflows: pd.DataFrame, dfcategories: pd.DataFrame, dfcatschemes: pd.DataFrame) -> pd.DataFrame:
+    dfcatschemes = dfcatschemes.copy()
+    dfcatschemes['nested_id'] = dfcatschemes.apply(
+        func=lambda row : ".".join([
+            row[col]
+                for col in dfcatschemes.columns if "id" in str(col) and isinstance(row[col],str)
+                ]),
+                axis=1
+            )
+    dfcatschemes.columns = ["category_scheme." + str(col) for col in dfcatschemes.columns]
+    categories = dfcategories[[
+        'source.ref.id', 'target.ref.id',
+        'target.ref.maintainable_parent_id',
+    ]].drop_duplicates().rename(columns={
+        'source.ref.id': 'dataflow.id',
+        'target.ref.id': 'category.id',
+        'target.ref.maintainable_parent_id': 'category.parent.id',
+    })
+    flows = dflows[["id", "name", "description"]].rename(columns={
+        "id": "dataflow.id",
+        "name": "dataflow.name",
+        "description": "dataflow.description",
+    })
+    toc = pd.merge(categories, flows, left_on="dataflow.id", right_on="dataflow.id")
+    toc["category.nested_id"] = toc["category.parent.id"] + "." + toc["category.id"]
+    return pd.merge(
+        dfcatschemes,
+        toc,
+        left_on="category_scheme.nested_id",
+        right_on="category.nested_id",
+    )
+
+def synthesize(dfcatschemes: pd.DataFrame, flows: int):
+    idcols = [col for col in dfcatschemes.columns if "id" in col]
+    paths = dfcatschemes[idcols].apply(lambda row: [v for v in row if isinstance(v, str)], axis=1)
+    categorisations, dataflows = [], []
+    for i, path in enumerate(paths):
+        for j in range(flows):
+            flow = f"FLOW_{i}_{j}"
+            dataflows.append({"id": flow, "name": f"Dataflow {i} {j}", "description": f"Synthetic dataflow {flow}"})
+            categorisations.append({
+                "source.ref.id": flow,
+                "target.ref.id": ".".join(path[1:]),
+                "target.ref.maintainable_parent_id": path[0],
+            })
+    return pd.DataFrame(dataflows), pd.DataFrame(categorisations)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=5, help="dataflows per leaf category")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    dfcatschemes = pd.read_json(catschemes_json)
+    dflows, dfcategories = synthesize(dfcatschemes, args.flows)
+    print(f"{len(dfcatschemes)} category paths, {len(dflows)} dataflows, {len(dfcategories)} categorisations")
+
+    expected = reference(dflows, dfcategories, dfcatschemes)
+    result = TableOfContents(dflows, dfcategories, dfcatschemes).df
+    pd.testing.assert_frame_equal(
+        result.astype(object).reset_index(drop=True),
+        expected.astype(object).reset_index(drop=True),
+    )
+    for name, build in [
+        ("row-wise (reference)", lambda: reference(dflows, dfcategories, dfcatschemes)),
+        ("vectorized", lambda: TableOfContents(dflows, dfcategories, dfcatschemes)),
+    ]:
+        best = min(timeit.repeat(build, number=1, repeat=args.repeat))
+        print(f"{name:>22}: {1000 * best:8.1f} ms")
@@ -0,0 +1,37 @@
+"""
+Time `TableOfContents.toc_tree` on a table of contents of the size of the
+full ESTAT catalogue, synthesized as in `benchmarks.toc`.
+The cold time builds the tree, the warm time loads its snapshot.
+
+    python -m benchmarks.tree --flows 5 --repeat 3
+"""
+import argparse
+import tempfile
+import timeit
+import shutil
+import pandas as pd
+
+from benchmarks.toc import catschemes_json, synthesize
+from eupol.download.sdmx.base import TableOfContents
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", type=int, default=5, help="dataflows per leaf category")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # keep the snapshots of the benchmark away from the user's ones
+    tempfile.tempdir = tempfile.mkdtemp()
+    dfcatschemes = pd.read_json(catschemes_json)
+    dflows, dfcategories = synthesize(dfcatschemes, args.flows)
+    ftoc = TableOfContents(dflows, dfcategories, dfcatschemes)
+    print(f"{len(ftoc.toc)} rows")
+
+    def cold():
+        shutil.rmtree(tempfile.tempdir)
+        ftoc.toc_tree()
+
+    for name, build in [("cold", cold), ("warm", lambda: ftoc.toc_tree())]:
+        best = min(timeit.repeat(build, number=1, repeat=args.repeat))
+        print(f"{name:>5}: {1000 * best:8.1f} ms")
+    shutil.rmtree(tempfile.tempdir)
@@ -1,6 +1,34 @@
-from .download.paths import module_dir
-from .download.nuts import metadata, dl, path, as_geodf
-# from .download.stats.eu.tfilter import TopicFilter
-from .download import text, utils
-from .download.text import tokens, tokenize
-from .download.utils import check_dependency, savetmp, funtmpdir, tmpcache, rmcache
\ No newline at end of file
+from typing import TYPE_CHECKING
+
+from eupol.lazy import attributes
+
+# everything is imported on first access, `import eupol` doesn't load the geo or sdmx stacks
+exports = {
+    "download": (".download", None),
+    "module_dir": (".download.paths", "module_dir"),
+    "metadata": (".download.nuts", "metadata"),
+    "dl": (".download.nuts", "dl"),
+    "mirror": (".download.nuts", "mirror"),
+    "path": (".download.nuts", "path"),
+    "as_geodf": (".download.nuts", "as_geodf"),
+    # "TopicFilter": (".download.stats.eu.tfilter", "TopicFilter"),
+    "text": (".download.text", None),
+    "utils": (".download.utils", None),
+    "tokens": (".download.text", "tokens"),
+    "tokenize": (".download.text", "tokenize"),
+    "check_dependency": (".download.utils", "check_dependency"),
+    "savetmp": (".download.utils", "savetmp"),
+    "funtmpdir": (".download.utils", "funtmpdir"),
+    "tmpcache": (".download.utils", "tmpcache"),
+    "rmcache": (".download.utils", "rmcache"),
+}
+__all__ = list(exports)
+__getattr__, __dir__ = attributes(__name__, exports)
+
+if TYPE_CHECKING:
+    from . import download
+    from .download.paths import module_dir
+    from .download.nuts import metadata, dl, mirror, path, as_geodf
+    from .download import text, utils
+    from .download.text import tokens, tokenize
+    from .download.utils import check_dependency, savetmp, funtmpdir, tmpcache, rmcache
@@ -1,8 +1,40 @@
-from .paths import module_dir
-from .nuts import metadata
-from .utils import check_dependency, savetmp, funtmpdir, tmpcache, rmcache
-from . import text, utils
-from .text import tokens, tokenize
-# from .stats.eu import tfilter
+from typing import TYPE_CHECKING
 
-from .sdmx.base import sdmxBase, ConceptScheme, DataFlow, Descendants, Model, to_snake_case
\ No newline at end of file
+from eupol.lazy import attributes
+
+exports = {
+    "module_dir": (".paths", "module_dir"),
+    "metadata": (".nuts", "metadata"),
+    "check_dependency": (".utils", "check_dependency"),
+    "savetmp": (".utils", "savetmp"),
+    "funtmpdir": (".utils", "funtmpdir"),
+    "tmpcache": (".utils", "tmpcache"),
+    "rmcache": (".utils", "rmcache"),
+    "text": (".text", None),
+    "utils": (".utils", None),
+    "session": (".session", None),
+    "cache": (".cache", None),
+    "metrics": (".metrics", None),
+    "DownloadManager": (".downloads", "DownloadManager"),
+    "tokens": (".text", "tokens"),
+    "tokenize": (".text", "tokenize"),
+    # "tfilter": (".stats.eu", "tfilter"),
+    "sdmx": (".sdmx", None),
+    "sdmxBase": (".sdmx.base", "sdmxBase"),
+    "ConceptScheme": (".sdmx.base", "ConceptScheme"),
+    "DataFlow": (".sdmx.base", "DataFlow"),
+    "Descendants": (".sdmx.base", "Descendants"),
+    "Model": (".sdmx.base", "Model"),
+    "to_snake_case": (".sdmx.base", "to_snake_case"),
+}
+__all__ = list(exports)
+__getattr__, __dir__ = attributes(__name__, exports)
+
+if TYPE_CHECKING:
+    from .paths import module_dir
+    from .nuts import metadata
+    from .utils import check_dependency, savetmp, funtmpdir, tmpcache, rmcache
+    from . import text, utils, session, cache, metrics, sdmx
+    from .text import tokens, tokenize
+    from .downloads import DownloadManager
+    from .sdmx.base import sdmxBase, ConceptScheme, DataFlow, Descendants, Model, to_snake_case
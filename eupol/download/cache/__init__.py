@@ -0,0 +1,4 @@
+from .lock import FileLock, atomic_write, lockfile
+from .index import CacheIndex, digest, index
+from .memory import MemoryCache, memory
+from .manager import CacheManager, manager
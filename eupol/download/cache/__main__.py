@@ -0,0 +1,57 @@
+"""
+Report and trim the eupol caches.
+
+    python -m eupol.download.cache usage
+    python -m eupol.download.cache list tmpcache
+    python -m eupol.download.cache evict --budget 500M --policy lfu
+    python -m eupol.download.cache clear searches
+"""
+import argparse
+import time
+
+from rich.table import Table
+
+from eupol.download.utils import rc
+from eupol.download.cache import manager
+from eupol.download.cache.manager import parse_size, human
+
+
+def usage():
+    table = Table("namespace", "entries", "size", "ttl", title=f"eupol caches in {manager.root}")
+    for namespace, u in manager.usage().items():
+        ttl = manager.ttls.get(namespace)
+        table.add_row(namespace, str(u["entries"]), human(u["bytes"]), "-" if ttl is None else f"{ttl / 86400:g} d")
+    rc.print(table)
+    rc.print(f"budget {human(manager.budget)}, {manager.policy} eviction")
+
+def listing(namespace: str = None):
+    table = Table("namespace", "entry", "size", "last access", "hits")
+    for entry in sorted(manager.entries(namespace), key=lambda entry: -(entry["last_access"] or 0)):
+        name = entry.get("function") or entry["key"]
+        if entry["namespace"] == "tmpcache":
+            name += " " + entry["args"][:60]
+        last = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry["last_access"] or 0))
+        table.add_row(entry["namespace"], name, human(entry["size"] or 0), last, str(entry["hits"] or 0))
+    rc.print(table)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m eupol.download.cache", description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["usage", "list", "evict", "clear"])
+    parser.add_argument("namespace", nargs="?", choices=manager.namespaces)
+    parser.add_argument("--budget", type=parse_size, help="size budget, e.g. 500M or 2G")
+    parser.add_argument("--policy", choices=["lru", "lfu"])
+    args = parser.parse_args()
+
+    manager.configure(budget=args.budget, policy=args.policy)
+    if args.command == "usage":
+        usage()
+    elif args.command == "list":
+        listing(args.namespace)
+    elif args.command == "evict":
+        removed = manager.evict()
+        rc.print(f"removed {len(removed)} entries, {human(sum(entry['size'] or 0 for entry in removed))}")
+    else:
+        removed = manager.entries(args.namespace)
+        for entry in removed:
+            manager.remove(entry)
+        rc.print(f"removed {len(removed)} entries, {human(sum(entry['size'] or 0 for entry in removed))}")
@@ -0,0 +1,93 @@
+import importlib
+import builtins
+import gzip as gz
+
+from typing import IO, Callable, Dict, List, NamedTuple, Optional
+
+
+class Codec(NamedTuple):
+    """A compression format: the magic bytes its files start with and how to open them"""
+    name: str
+    module: Optional[str]
+    magic: bytes
+    # fname, mode ("rb"/"wb") -> binary file object
+    open: Callable[[str, str], IO[bytes]]
+
+
+def _gzip(fname: str, mode: str) -> IO[bytes]:
+    # level 6 is zlib's own default, 9 costs twice the time for a few percent
+    return gz.open(fname, mode, compresslevel=6) if "w" in mode else gz.open(fname, mode)
+
+def _zstd(fname: str, mode: str) -> IO[bytes]:
+    import zstandard
+
+    if "w" in mode:
+        return zstandard.open(fname, mode, cctx=zstandard.ZstdCompressor(level=3, threads=-1))
+    return zstandard.open(fname, mode)
+
+def _lz4(fname: str, mode: str) -> IO[bytes]:
+    import lz4.frame
+
+    return lz4.frame.open(fname, mode)
+
+def _raw(fname: str, mode: str) -> IO[bytes]:
+    return builtins.open(fname, mode)
+
+gzip = Codec("gzip", None, b"\x1f\x8b", _gzip)
+zstd = Codec("zstd", "zstandard", b"\x28\xb5\x2f\xfd", _zstd)
+lz4 = Codec("lz4", "lz4.frame", b"\x04\x22\x4d\x18", _lz4)
+raw = Codec("none", None, b"", _raw)
+
+codecs: Dict[str, Codec] = {codec.name: codec for codec in [zstd, lz4, gzip, raw]}
+
+# cache namespace -> codecs by preference, the first installed one is used.
+# Metadata payloads are written once and read by every cold worker: zstd
+# reads faster than gzip at a better ratio. tmpcache results are written on
+# the request path, lz4 writes fastest.
+preferences: Dict[str, List[str]] = {
+    "metadata": ["zstd", "lz4", "gzip"],
+    "tmpcache": ["lz4", "zstd", "gzip"],
+}
+default = ["zstd", "lz4", "gzip"]
+_installed: Dict[str, bool] = {}
+
+
+def installed(name: str) -> bool:
+    """Whether the package behind codec `name` can be imported"""
+    codec = codecs[name]
+    if codec.module is None:
+        return True
+    if name not in _installed:
+        try:
+            importlib.import_module(codec.module)
+            _installed[name] = True
+        except ImportError:
+            _installed[name] = False
+    return _installed[name]
+
+def configure(namespace: str, *names: str):
+    """Prefer the codecs `names` (in order) for the files written in `namespace`"""
+    unknown = [name for name in names if name not in codecs]
+    if unknown:
+        raise ValueError(f"codecs must be among {list(codecs)}, not {unknown}")
+    preferences[namespace] = list(names)
+
+def codec(namespace: Optional[str] = None) -> Codec:
+    """Codec used to write the files of `namespace`, gzip when none of its choices is installed"""
+    names = preferences.get(namespace, default)
+    return next((codecs[name] for name in names if installed(name)), gzip)
+
+def detect(fname: str) -> Codec:
+    """Codec a file was written with, from its first bytes (uncompressed when none matches)"""
+    with builtins.open(fname, "rb") as f:
+        head = f.read(4)
+    return next((c for c in codecs.values() if c.magic and head.startswith(c.magic)), raw)
+
+def open(fname: str, mode: str = "rb", namespace: Optional[str] = None) -> IO[bytes]:
+    """
+    Open a compressed cache file: written with the codec of `namespace`,
+    read with whatever codec it was written with.
+    """
+    if "r" in mode:
+        return detect(fname).open(fname, mode)
+    return codec(namespace).open(fname, mode)
@@ -0,0 +1,141 @@
+import pickle
+import os
+
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+from pathlib import Path
+
+from eupol.download.cache.lock import atomic_write
+from eupol.download.cache import codecs
+
+
+class Serializer(NamedTuple):
+    """How results of a type are written to and read from the cache"""
+    suffix: str
+    # writes the object to the file name, returns False when it can't hold that object
+    dump: Callable[[Any, str], Optional[bool]]
+    load: Callable[[str], Any]
+
+
+def _dump_frame(df: Any, fname: str) -> bool:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        # mixed object columns and the like
+        return False
+    # uncompressed, so that reads can be memory-mapped
+    feather.write_feather(table, fname, compression="uncompressed")
+    return True
+
+def _load_frame(fname: str) -> Any:
+    import pyarrow as pa
+
+    with pa.memory_map(fname) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+def _dump_geoframe(gdf: Any, fname: str) -> bool:
+    try:
+        gdf.to_parquet(fname)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+def _load_geoframe(fname: str) -> Any:
+    import geopandas as gpd
+
+    return gpd.read_parquet(fname)
+
+def _dump_pickle(obj: Any, fname: str):
+    with open(fname, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _load_pickle(fname: str) -> Any:
+    with open(fname, "rb") as f:
+        return pickle.load(f)
+
+def _dump_bytes(obj: bytes, fname: str):
+    with open(fname, "wb") as f:
+        f.write(obj)
+
+def _load_bytes(fname: str) -> bytes:
+    with open(fname, "rb") as f:
+        return f.read()
+
+def _dump_compressed_pickle(obj: Any, fname: str):
+    with codecs.open(fname, "wb", "tmpcache") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+def _load_compressed_pickle(fname: str) -> Any:
+    with codecs.open(fname, "rb") as f:
+        return pickle.load(f)
+
+arrow = Serializer(".arrow", _dump_frame, _load_frame)
+geoparquet = Serializer(".geoparquet", _dump_geoframe, _load_geoframe)
+binary = Serializer(".pickle", _dump_pickle, _load_pickle)
+raw = Serializer(".bin", _dump_bytes, _load_bytes)
+# anything without a serializer of its own, compressed with the tmpcache codec whatever the suffix says
+fallback = Serializer(".pkl.gz", _dump_compressed_pickle, _load_compressed_pickle)
+
+# types by "module.qualname" as the class reports it, so that registering them doesn't
+# import their package. DataFrame says "pandas.core.frame" before pandas 3.0, "pandas" since.
+registry: Dict[str, Serializer] = {
+    "pandas.core.frame.DataFrame": arrow,
+    "pandas.DataFrame": arrow,
+    "geopandas.geodataframe.GeoDataFrame": geoparquet,
+    "builtins.dict": binary,
+    "builtins.list": binary,
+    "builtins.bytes": raw,
+}
+suffixes: Dict[str, Serializer] = {s.suffix: s for s in [arrow, geoparquet, binary, raw, fallback]}
+# type -> serializer resolved along its MRO
+_resolved: Dict[type, Serializer] = {}
+
+
+def _name(cls: type) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+def register(cls: Union[type, str], serializer: Serializer):
+    """
+    Serialize the results of type `cls` (or "module.qualname") with
+    `serializer`. Subclasses use the serializer of their closest
+    registered parent unless they are registered themselves.
+    """
+    registry[cls if isinstance(cls, str) else _name(cls)] = serializer
+    suffixes[serializer.suffix] = serializer
+    _resolved.clear()
+
+def serializer(obj: Any) -> Serializer:
+    """The serializer of `obj`, a dict lookup once its type has been seen"""
+    cls = type(obj)
+    try:
+        return _resolved[cls]
+    except KeyError:
+        found = next((registry[_name(parent)] for parent in cls.__mro__ if _name(parent) in registry), fallback)
+        _resolved[cls] = found
+        return found
+
+def dump(obj: Any, path: Path) -> str:
+    """
+    Write `obj` to `path` + the suffix of its serializer and return the file name.
+    The file is written under a temporary name then renamed into place.
+    """
+    chosen = serializer(obj)
+    fname = str(path) + chosen.suffix
+    with atomic_write(fname) as tmp:
+        written = chosen.dump(obj, tmp) is not False
+        if not written and os.path.exists(tmp):
+            os.remove(tmp)
+    if not written:
+        fname = str(path) + fallback.suffix
+        with atomic_write(fname) as tmp:
+            fallback.dump(obj, tmp)
+    return fname
+
+def load(fname: str) -> Any:
+    """Read back a file written by `dump`"""
+    for suffix, chosen in suffixes.items():
+        if fname.endswith(suffix):
+            return chosen.load(fname)
+    raise ValueError(f"no serializer reads {fname}")
@@ -0,0 +1,109 @@
+import threading
+import tempfile
+import sqlite3
+import json
+import time
+import os
+
+from typing import Any, Dict, List, Optional
+from hashlib import sha256
+
+
+def digest(function: str, args: tuple, kwargs: dict) -> str:
+    """
+    Content-addressed key of a call: the sha256 of the function name and of
+    a canonical dump of its arguments (keyword order doesn't matter).
+    """
+    canonical = json.dumps([list(args), kwargs], sort_keys=True, default=repr)
+    return sha256(f"{function}\0{canonical}".encode()).hexdigest()
+
+
+class CacheIndex:
+    """
+    sqlite index of the `tmpcache` entries, one row per key with the
+    function, human-readable arguments, path, size, creation time, hit
+    count and last access of the cached result.
+
+    Lookups are a primary key query instead of probing the file system,
+    and the cache can be listed without scanning its directories. Every
+    thread gets its own connection, the database is in WAL mode so that
+    processes sharing the cache don't block each other's reads.
+    """
+    columns = ["key", "function", "args", "path", "size", "created", "hits", "last_access"]
+    schema = """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        function TEXT NOT NULL,
+        args TEXT,
+        path TEXT NOT NULL,
+        size INTEGER,
+        created REAL,
+        hits INTEGER NOT NULL DEFAULT 0,
+        last_access REAL
+    );
+    CREATE INDEX IF NOT EXISTS entries_function ON entries (function);
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._local = threading.local()
+
+    @property
+    def path(self) -> str:
+        if self._path is not None:
+            return self._path
+        return os.path.join(tempfile.gettempdir(), "eupol", "cache-index.sqlite")
+
+    def _connection(self) -> sqlite3.Connection:
+        connections = self._local.__dict__.setdefault("connections", {})
+        path = self.path
+        if path not in connections:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(self.schema)
+            connections[path] = connection
+        return connections[path]
+
+    def _rows(self, cursor: sqlite3.Cursor) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, row)) for row in cursor.fetchall()]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        rows = self._rows(self._connection().execute(
+            f"SELECT {', '.join(self.columns)} FROM entries WHERE key = ?", (key,)
+        ))
+        return rows[0] if rows else None
+
+    def put(self, key: str, function: str, args: str, path: str, size: int):
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (key, function, args, path, size, created, hits, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0, ?)",
+            (key, function, args, path, size, now, now),
+        )
+
+    def hit(self, key: str):
+        self._connection().execute(
+            "UPDATE entries SET hits = hits + 1, last_access = ? WHERE key = ?", (time.time(), key)
+        )
+
+    def remove(self, key: str):
+        self._connection().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def entries(self, function: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every entry (of `function`), most recently used first"""
+        query = f"SELECT {', '.join(self.columns)} FROM entries"
+        params = ()
+        if function is not None:
+            query, params = query + " WHERE function = ?", (function,)
+        return self._rows(self._connection().execute(query + " ORDER BY last_access DESC", params))
+
+    def clear(self, function: Optional[str] = None):
+        """Forget the entries of `function`, or all of them (the files are left as is)"""
+        if function is None:
+            self._connection().execute("DELETE FROM entries")
+        else:
+            self._connection().execute("DELETE FROM entries WHERE function = ?", (function,))
+
+index = CacheIndex()
@@ -0,0 +1,91 @@
+import threading
+import time
+import os
+
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union
+from pathlib import Path
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """
+    Exclusive lock held on a file, between processes as well as between
+    threads (every `acquire` opens the lock file anew, and `flock`/`msvcrt`
+    locks conflict across open files, even within a process).
+
+    Used for single-flight caching: the first caller computes, the others
+    wait on the lock and then read what it wrote. The lock files are left
+    in place, removing them would let two processes lock different files.
+    """
+    poll = 0.05
+
+    def __init__(self, path: Union[str, Path], timeout: Optional[float] = None):
+        self.path = str(path)
+        self.timeout = timeout
+        self._fd: Optional[int] = None
+
+    def _trylock(self, fd: int, blocking: bool) -> bool:
+        try:
+            if os.name == "nt":
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self) -> "FileLock":
+        """Wait for the lock, at most `timeout` seconds (forever by default)"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        # msvcrt has no blocking lock without a retry limit, poll instead
+        blocking = self.timeout is None and os.name != "nt"
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while not self._trylock(fd, blocking):
+            if deadline is not None and time.monotonic() > deadline:
+                os.close(fd)
+                raise TimeoutError(f"could not lock {self.path} within {self.timeout}s")
+            time.sleep(self.poll)
+        self._fd = fd
+        return self
+
+    def release(self):
+        if self._fd is None:
+            return
+        if os.name == "nt":
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+    def __enter__(self) -> "FileLock":
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+def lockfile(path: Union[str, Path]) -> str:
+    """Lock file guarding `path`"""
+    return f"{path}.lock"
+
+@contextmanager
+def atomic_write(path: Union[str, Path]) -> Iterator[str]:
+    """
+    Yield a temporary file name next to `path`, moved over `path` once
+    the block succeeds, so that readers never see a partially written file.
+    When the block writes nothing, `path` is left as is.
+    """
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        yield tmp
+        if os.path.exists(tmp):
+            os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
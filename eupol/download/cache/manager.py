@@ -0,0 +1,220 @@
+import threading
+import tempfile
+import shutil
+import time
+import os
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from pathlib import Path
+
+from eupol.download.cache.index import index as tmpindex, CacheIndex
+
+day = 24 * 3600
+
+# namespace -> directory under `$TMP/eupol` holding one entry per file or subdirectory
+directories = {
+    "searches": "dataframes",
+    "toc-snapshots": os.path.join("sdmx", "toc-snapshots"),
+    "downloads": "download",
+    "metadata": os.path.join("sdmx", "metadata-cache"),
+}
+
+def parse_size(size: str) -> int:
+    """`"500M"`, `"2G"`, `"1024"` -> bytes"""
+    units = {"K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+    size = size.strip().upper().rstrip("B")
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+def human(size: float) -> str:
+    """bytes -> `"1.5 MiB"`"""
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TiB"
+
+def _stat(path: Path) -> Dict[str, Any]:
+    """Size and newest modification time of a file or of a directory tree"""
+    if path.is_file():
+        st = path.stat()
+        return {"size": st.st_size, "created": st.st_mtime, "last_access": max(st.st_mtime, st.st_atime)}
+    size, newest = 0, path.stat().st_mtime
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                st = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            size += st.st_size
+            newest = max(newest, st.st_mtime)
+    return {"size": size, "created": newest, "last_access": newest}
+
+class CacheManager:
+    """
+    Size budget, per-namespace TTLs and eviction for the caches under `$TMP/eupol`:
+    `tmpcache` results (tracked by the cache index), search results, topic
+    tree snapshots, downloads (NUTS archives, ...) and SDMX metadata.
+
+    Entries older than the TTL of their namespace go first, then the least
+    recently (`lru`) or least frequently (`lfu`) used ones until the total
+    fits in the budget. Outside of `tmpcache` there are no hit counts and
+    `lfu` orders by last use. `written()` is meant to be called after each
+    write: it only scans the caches once every `interval` seconds, and not
+    at all within `hold()`, so that a batch doesn't evict its own files.
+    The table of contents and codelist stores are not caches and are left alone.
+    """
+    budget = 2 * 2**30
+    policy = "lru"
+    interval = 60.0
+    ttls: Dict[str, Optional[float]] = {
+        "tmpcache": None,
+        "searches": 7 * day,
+        "toc-snapshots": 30 * day,
+        "downloads": 90 * day,
+        # revalidated against the agency, expiring it buys nothing
+        "metadata": None,
+    }
+
+    def __init__(self, root: Optional[str] = None, index: Optional[CacheIndex] = None):
+        self._root = root
+        self._index = index
+        self.ttls = dict(self.ttls)
+        self._last = 0.0
+        self._holds = 0
+        self._pending = False
+        self._lock = threading.Lock()
+
+    @property
+    def root(self) -> Path:
+        return Path(self._root if self._root is not None else os.path.join(tempfile.gettempdir(), "eupol"))
+
+    @property
+    def index(self) -> CacheIndex:
+        return tmpindex if self._index is None else self._index
+
+    @property
+    def namespaces(self) -> List[str]:
+        return ["tmpcache", *directories]
+
+    def configure(
+        self,
+        budget: Optional[int] = None,
+        ttls: Optional[Dict[str, Optional[float]]] = None,
+        policy: Optional[str] = None,
+        interval: Optional[float] = None,
+        ):
+        if policy is not None and policy not in ("lru", "lfu"):
+            raise ValueError(f"policy must be 'lru' or 'lfu', not {policy!r}")
+        if ttls is not None and set(ttls) - set(self.namespaces):
+            raise ValueError(f"namespaces must be among {self.namespaces}, not {sorted(set(ttls) - set(self.namespaces))}")
+        self.budget = self.budget if budget is None else budget
+        self.ttls.update(ttls or {})
+        self.policy = self.policy if policy is None else policy
+        self.interval = self.interval if interval is None else interval
+
+    def entries(self, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every cache entry (of `namespace`) with its size, creation, last access and hits"""
+        namespaces = self.namespaces if namespace is None else [namespace]
+        entries = []
+        if "tmpcache" in namespaces:
+            for entry in self.index.entries():
+                entries.append({**entry, "namespace": "tmpcache"})
+        for name in namespaces:
+            if name == "tmpcache":
+                continue
+            directory = self.root.joinpath(directories[name])
+            if not directory.exists():
+                continue
+            for path in directory.iterdir():
+                # files being written and lock files aren't entries
+                if path.name.endswith((".tmp", ".lock")):
+                    continue
+                try:
+                    stat = _stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append({"namespace": name, "key": path.name, "path": str(path), "hits": 0, **stat})
+        return entries
+
+    def usage(self) -> Dict[str, Dict[str, int]]:
+        """Entries and bytes per namespace, and in total"""
+        usage = {name: {"entries": 0, "bytes": 0} for name in self.namespaces}
+        for entry in self.entries():
+            usage[entry["namespace"]]["entries"] += 1
+            usage[entry["namespace"]]["bytes"] += entry["size"] or 0
+        usage["total"] = {
+            "entries": sum(u["entries"] for u in usage.values()),
+            "bytes": sum(u["bytes"] for u in usage.values()),
+        }
+        return usage
+
+    def remove(self, entry: Dict[str, Any]):
+        path = Path(entry["path"])
+        if entry["namespace"] == "tmpcache":
+            self.index.remove(entry["key"])
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        elif path.exists():
+            path.unlink()
+        # a downloaded archive and the directory it was unpacked to go together
+        if entry["namespace"] == "downloads" and path.suffix == ".zip":
+            shutil.rmtree(path.with_suffix(""), ignore_errors=True)
+
+    def evict(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Drop the expired entries, then the least used ones over the budget; return what was removed"""
+        now = time.time() if now is None else now
+        removed, kept = [], []
+        for entry in self.entries():
+            ttl = self.ttls.get(entry["namespace"])
+            (removed if ttl is not None and now - (entry["created"] or 0) > ttl else kept).append(entry)
+        if self.policy == "lfu":
+            kept.sort(key=lambda entry: (entry["hits"] or 0, entry["last_access"] or 0))
+        else:
+            kept.sort(key=lambda entry: entry["last_access"] or 0)
+        total = sum(entry["size"] or 0 for entry in kept)
+        for entry in kept:
+            if total <= self.budget:
+                break
+            removed.append(entry)
+            total -= entry["size"] or 0
+        for entry in removed:
+            self.remove(entry)
+        return removed
+
+    def written(self):
+        """Evict if the caches weren't checked in the last `interval` seconds"""
+        now = time.time()
+        with self._lock:
+            if self._holds:
+                self._pending = True
+                return
+            if now - self._last < self.interval:
+                return
+            self._last = now
+        self.evict(now)
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """
+        Defer eviction to the end of the block (of the outermost one when
+        nested or concurrent), for batches that need all of their files at
+        once. Only this process holds off, others may still evict.
+        """
+        with self._lock:
+            self._holds += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._holds -= 1
+                pending = self._pending and not self._holds
+                if pending:
+                    self._pending = False
+                    self._last = time.time()
+            if pending:
+                self.evict()
+
+manager = CacheManager()
@@ -0,0 +1,72 @@
+import threading
+import sys
+
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+
+def _copy(value: Any) -> Any:
+    # callers often add columns to the frames they get, keep the cached one as is
+    pd = sys.modules.get("pandas")
+    if pd is not None and isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    return value
+
+class MemoryCache:
+    """
+    In-process LRU tier in front of the `tmpcache` files, bounded in
+    number of entries and in bytes. The size of an entry is the size of
+    its file, which is close to its size in memory for the Arrow tier.
+    DataFrames are handed out as shallow copies; other results are shared,
+    so they must not be mutated in place.
+    """
+    def __init__(self, max_bytes: int = 256 * 2**20, max_entries: int = 1024):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.nbytes = 0
+        self._entries: "OrderedDict[str, Tuple[Any, int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def configure(self, max_bytes: Optional[int] = None, max_entries: Optional[int] = None):
+        """Change the bounds, evicting what goes over them (0 disables the tier)"""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_entries is not None:
+                self.max_entries = max_entries
+            self._evict()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """`(True, value)` on a hit, `(False, None)` otherwise"""
+        with self._lock:
+            if key not in self._entries:
+                return False, None
+            self._entries.move_to_end(key)
+            value = self._entries[key][0]
+        return True, _copy(value)
+
+    def put(self, key: str, value: Any, function: str, size: int):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key)[1]
+            self._entries[key] = (_copy(value), size, function)
+            self.nbytes += size
+            self._evict()
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self.nbytes -= size
+
+    def invalidate(self, function: Optional[str] = None):
+        """Drop the entries of `function`, or all of them"""
+        with self._lock:
+            for key in [key for key, (_, _, fname) in self._entries.items() if function is None or fname == function]:
+                self.nbytes -= self._entries.pop(key)[1]
+
+memory = MemoryCache()
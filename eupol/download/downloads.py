@@ -0,0 +1,116 @@
+import rich.progress as rprog
+import threading
+import tempfile
+import os
+
+from typing import Dict, Iterable, List, Optional
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from eupol.download.utils import download, rc, rlog
+from eupol.download.cache.manager import human, manager
+
+
+class DownloadManager:
+    """
+    Batches of files downloaded `max_workers` at a time into one directory
+    (the `utils.download` one by default).
+
+    URLs are de-duplicated and the files already on disk are skipped, so
+    running the same batch again only fetches what is missing or failed.
+    Each file goes through `utils.download`, hence resumes its `.part`
+    file and, with `segments` > 1, fetches large files in parallel ranges.
+    The cache is only evicted once the batch is over; wrap the use of the
+    files in `manager.hold()` to keep them until then.
+    """
+    def __init__(self, directory: Optional[str] = None, max_workers: int = 4, segments: int = 1):
+        self._directory = directory
+        self.max_workers = max_workers
+        self.segments = segments
+        self.errors: Dict[str, Exception] = {}
+
+    @property
+    def directory(self) -> str:
+        if self._directory is not None:
+            return self._directory
+        return os.path.join(tempfile.gettempdir(), "eupol", "download")
+
+    def path(self, url: str) -> str:
+        """Where `url` is stored"""
+        return str(Path(self.directory).joinpath(url.split("/")[-1]))
+
+    def fetch(
+        self,
+        urls: Iterable[str],
+        force: Optional[bool] = False,
+        show_progress: Optional[bool] = True,
+        ) -> Dict[str, str]:
+        """
+        Download `urls`, skipping the files already on disk unless `force`,
+        and return the url -> path mapping of every file available.
+        The URLs that failed are logged and kept in `errors`, the files
+        evicted once the batch is over (the cache budget is too small for
+        it) are left out with a warning.
+        """
+        urls = list(dict.fromkeys(urls))
+        paths = {url: self.path(url) for url in urls}
+        pending = [url for url in urls if force or not os.path.exists(paths[url])]
+        names: Dict[str, List[str]] = {}
+        for url in pending:
+            names.setdefault(paths[url], []).append(url)
+        clashes = {path: clashing for path, clashing in names.items() if len(clashing) > 1}
+        if clashes:
+            raise ValueError(f"URLs would overwrite each other's file: {clashes}")
+        self.errors = {}
+        if not pending:
+            return paths
+
+        with manager.hold():
+            self._fetch(pending, paths, show_progress)
+        evicted = [url for url in paths if not os.path.exists(paths[url])]
+        for url in evicted:
+            rlog(f"> ⚠ {paths[url]} was evicted from the cache, raise the budget of `manager.configure` to keep it", style="purple")
+            del paths[url]
+        return paths
+
+    def _fetch(self, pending: List[str], paths: Dict[str, str], show_progress: bool):
+        """Download `pending`, dropping the URLs that failed from `paths`"""
+        progress = rprog.Progress(
+            rprog.SpinnerColumn(),
+            rprog.BarColumn(),
+            rprog.TextColumn("{task.completed}/{task.total} files, {task.fields[size]}"),
+            rprog.TextColumn("{task.description}"),
+            rprog.TimeElapsedColumn(),
+            console=rc,
+            disable=not show_progress,
+        )
+        received = [0]
+        lock = threading.Lock()
+        with progress, ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="eupol-downloads") as pool:
+            task = progress.add_task(f"[purple] >> ⤓ downloading {len(pending)} files", total=len(pending), size=human(0))
+
+            def update(nbytes: int):
+                with lock:
+                    received[0] += nbytes
+                    progress.update(task, size=human(received[0]))
+
+            futures = {
+                pool.submit(download, url, directory=self.directory, segments=self.segments, progress=False, callback=update): url
+                for url in pending
+            }
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    future.result()
+                except Exception as err:
+                    self.errors[url] = err
+                    del paths[url]
+                progress.update(task, advance=1)
+            if self.errors:
+                progress.update(task, description=f"[red] >> ❌ {len(self.errors)} out of {len(pending)} files failed")
+            else:
+                progress.update(task, description=f"[green] >> ✅ Done ! {len(pending)} files downloaded")
+        for url, err in self.errors.items():
+            rlog(f"> ❌ {url}: {err}", style="red")
+
+downloads = DownloadManager()
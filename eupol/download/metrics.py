@@ -0,0 +1,187 @@
+"""
+Counters and latency histograms of the caches and downloads, and the
+events they log.
+
+    from eupol.download.metrics import metrics
+    metrics.snapshot()        # {"counters": [...], "histograms": [...]}
+    metrics.to_prometheus()   # text exposition format
+    metrics.configure(console=False)   # no more rich log lines
+
+Events (cache hits, misses, writes, ...) go to the registered sinks; the
+console sink prints them to the rich console as before and can be turned
+off, in which case their messages aren't even formatted.
+"""
+import threading
+import bisect
+import time
+import json
+
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+prefix = "eupol_"
+# seconds, from a memory-mapped Arrow read to a cold ESTAT document
+buckets = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+descriptions = {
+    "cache_hits_total": "tmpcache hits by function and tier (memory or disk)",
+    "cache_misses_total": "tmpcache misses by function",
+    "cache_read_bytes_total": "bytes read back from the tmpcache files",
+    "cache_written_bytes_total": "bytes written to the tmpcache files",
+    "cache_load_seconds": "time to deserialize a tmpcache file",
+    "cache_dump_seconds": "time to serialize a tmpcache result",
+    "metadata_requests_total": "metadata cache lookups by outcome (fresh, not_modified, fetched)",
+    "http_requests_total": "HTTP requests by host and status",
+    "http_request_seconds": "time to the response headers by host",
+    "downloaded_bytes_total": "bytes downloaded by host",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Event(NamedTuple):
+    """Something worth logging: `message` is formatted with `fields` by the sinks that print it"""
+    name: str
+    message: str
+    style: str
+    fields: Dict[str, Any]
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus wants it"""
+    def __init__(self):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, out = 0, []
+        for bound, count in zip([*map(str, buckets), "+Inf"], self.counts):
+            total += count
+            out.append((bound, total))
+        return out
+
+def console_sink(event: Event):
+    """Sink printing events to the rich console of `eupol.download.utils`"""
+    from eupol.download.utils import rlog
+
+    rlog(event.message.format(**event.fields), style=event.style)
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _render(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [*labels, extra] if extra else list(labels)
+    if not pairs:
+        return ""
+    escape = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in pairs) + "}"
+
+
+class Metrics:
+    """
+    Thread-safe in-process metrics: counters (`inc`) and histograms
+    (`observe`, `timer`) keyed by name and labels, plus the event sinks.
+    """
+    def __init__(self, sinks: Optional[List[Callable[[Event], None]]] = None):
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.sinks: List[Callable[[Event], None]] = [console_sink] if sinks is None else list(sinks)
+        self._lock = threading.Lock()
+
+    def configure(self, console: Optional[bool] = None, sinks: Optional[List[Callable[[Event], None]]] = None):
+        """Replace the sinks, and/or turn the console sink on or off"""
+        if sinks is not None:
+            self.sinks = list(sinks)
+        if console is True and console_sink not in self.sinks:
+            self.sinks.append(console_sink)
+        elif console is False:
+            self.sinks = [sink for sink in self.sinks if sink is not console_sink]
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        """Observe the time spent in the block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def event(self, name: str, message: str, style: str = "", **fields):
+        """Hand an event to the sinks, if any"""
+        if not self.sinks:
+            return
+        event = Event(name, message, style, fields)
+        for sink in self.sinks:
+            sink(event)
+
+    def value(self, name: str, **labels) -> float:
+        """Current value of a counter (0 when never incremented)"""
+        return self.counters.get((name, _labels(labels)), 0)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Every counter and histogram with its labels, JSON serializable"""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), "count": h.count, "sum": h.sum, "buckets": dict(h.cumulative())}
+                for (name, labels), h in sorted(self.histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self) -> str:
+        """The metrics in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines, typed = [], set()
+
+        def header(name: str, kind: str):
+            if name not in typed:
+                typed.add(name)
+                if name in descriptions:
+                    lines.append(f"# HELP {prefix}{name} {descriptions[name]}")
+                lines.append(f"# TYPE {prefix}{name} {kind}")
+
+        for counter in snapshot["counters"]:
+            header(counter["name"], "counter")
+            lines.append(f"{prefix}{counter['name']}{_render(_labels(counter['labels']))} {_number(counter['value'])}")
+        for histogram in snapshot["histograms"]:
+            name, labels = histogram["name"], _labels(histogram["labels"])
+            header(name, "histogram")
+            for bound, count in histogram["buckets"].items():
+                lines.append(f"{prefix}{name}_bucket{_render(labels, ('le', bound))} {count}")
+            lines.append(f"{prefix}{name}_sum{_render(labels)} {_number(histogram['sum'])}")
+            lines.append(f"{prefix}{name}_count{_render(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
@@ -1,14 +1,17 @@
 import pandas as pd
-import geopandas as gpd
 import tempfile
 import shutil
 import re
+import io
 import os
 
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, Iterable, Tuple
 
 from eupol.download.utils import download, funtmpdir
+from eupol.download.downloads import DownloadManager
+from eupol.download.cache import atomic_write, manager
+from eupol.download import session
 
 formats = ["geojson", "topojson", "shp", "svg", "pbf"]
 geometries = ["RG", "LB", "LN"]
@@ -23,7 +26,9 @@ def metadata(year, directory=None):
     if year not in years:
         raise ValueError(f"Year must be one of {years}")
     
-    dfm = pd.read_json("https://gisco-services.ec.europa.eu/distribution/v2/nuts/nuts-2021-files.json")
+    response = session.get("https://gisco-services.ec.europa.eu/distribution/v2/nuts/nuts-2021-files.json")
+    response.raise_for_status()
+    dfm = pd.read_json(io.StringIO(response.text))
     dfm.reset_index(inplace=True)
     dfm.rename(columns={"index": "filename"}, inplace=True)
     dfm['raw'] = pd.concat(
@@ -65,36 +70,59 @@ def metadata(year, directory=None):
     )
     metadata.drop(columns=["raw"], inplace=True)
 
-    if directory is not None:
-        Path(directory).mkdir(parents=True, exist_ok=True)
-        metadata.to_parquet(Path(directory).joinpath("metadata.parquet"))
-    else:
-        tmpdir = Path(tempfile.gettempdir()).joinpath("eupol", "metadata")
-        tmpdir.mkdir(parents=True, exist_ok=True)
-        metadata.to_parquet(tmpdir.joinpath("metadata.parquet"))
+    if directory is None:
+        directory = Path(tempfile.gettempdir()).joinpath("eupol", "metadata")
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    with atomic_write(Path(directory).joinpath("metadata.parquet")) as tmp:
+        metadata.to_parquet(tmp)
     return metadata
 
-def dl(year: str, scale: str, extension: str, directory: str = None):
-    """Download NUTS file."""
+def url(year: str, scale: str, extension: str) -> str:
+    """URL of the NUTS archive of a year, scale and format."""
     if year not in years:
         raise ValueError(f"Year must be one of {years}")
     if scale not in scales:
         raise ValueError(f"Scale must be one of {scales}")
     if extension not in formats:
         raise ValueError(f"Extension must be one of {formats}")
-    
-    url = (
+    return (
         baseurl + "/download/" + "ref-nuts-" +
         year + "-" +
         scale.lower() + "." +
         extension + ".zip"
     )
-    fname = download(url, directory=directory)
+
+def dl(year: str, scale: str, extension: str, directory: str = None):
+    """Download NUTS file."""
+    fname = download(url(year, scale, extension), directory=directory)
 
     if fname.endswith(".zip"):
         shutil.unpack_archive(fname, fname.replace(".zip", ""))
     return fname
 
+def mirror(
+    years: Iterable[str] = years,
+    scales: Iterable[str] = scales,
+    extensions: Iterable[str] = formats,
+    directory: str = None,
+    max_workers: int = 8,
+    ) -> Dict[Tuple[str, str, str], str]:
+    """
+    Download (and unpack) every year x scale x format NUTS archive at once,
+    `max_workers` at a time. Archives already on disk are not downloaded
+    again. Returns the path of each (year, scale, format) archive.
+    """
+    combinations = [(year, scale, extension) for year in years for scale in scales for extension in extensions]
+    urls = {combination: url(*combination) for combination in combinations}
+    # the archives downloaded first must still be there to be unpacked
+    with manager.hold():
+        paths = DownloadManager(directory, max_workers=max_workers).fetch(urls.values())
+        archives = {combination: paths[u] for combination, u in urls.items() if u in paths}
+        for fname in archives.values():
+            if fname.endswith(".zip") and not os.path.exists(fname.replace(".zip", "")):
+                shutil.unpack_archive(fname, fname.replace(".zip", ""))
+    return archives
+
 def path(year: str, fmt: str, geom: str, scale:str, crs: str = "3857", level:str = None) -> str:
     """Return path to NUTS file. If file does not exist, download it first."""
     if year not in years:
@@ -119,6 +147,9 @@ def path(year: str, fmt: str, geom: str, scale:str, crs: str = "3857", level:str
         return geodir.joinpath(f"NUTS_{geom}_{scale}_{year}_{crs}_LEVL_{level}.{fmt}")
 
 def as_geodf(year: str, fmt: str, geom: str, scale:str, crs:str = "3857", level:str = None) -> Any:
+    # the geo stack is only loaded by the functions that need it
+    import geopandas as gpd
+
     p = path(year=year, fmt=fmt, geom=geom, scale=scale, crs=crs, level=level)
     return gpd.read_file(p)
 
@@ -1 +1,19 @@
-from .base import sdmxBase, ConceptScheme, DataFlow, Descendants, Model, to_snake_case
\ No newline at end of file
+from typing import TYPE_CHECKING
+
+from eupol.lazy import attributes
+
+exports = {
+    "sdmxBase": (".base", "sdmxBase"),
+    "ConceptScheme": (".base", "ConceptScheme"),
+    "DataFlow": (".base", "DataFlow"),
+    "Descendants": (".base", "Descendants"),
+    "Model": (".base", "Model"),
+    "to_snake_case": (".base", "to_snake_case"),
+    "Federation": (".federated", "Federation"),
+}
+__all__ = list(exports)
+__getattr__, __dir__ = attributes(__name__, exports)
+
+if TYPE_CHECKING:
+    from .base import sdmxBase, ConceptScheme, DataFlow, Descendants, Model, to_snake_case
+    from .federated import Federation
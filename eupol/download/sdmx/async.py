@@ -5,12 +5,20 @@ from pandasdmx.reader.sdmxml import Reader
 from typing import List, Dict, Tuple, Callable, Iterable, Union, Optional
 import gzip as gz
 
-from eupol.download.utils import rlog, rc
+from eupol.download.utils import rlog, rc, tmpcache
+from eupol.download import session
 from eupol.download.sdmx.tprogress import TimeBarColumn
 
 sdmxl = Reader()
 
 
+@tmpcache
+async def fetch(url: str) -> bytes:
+    """Body of `url`, cached on disk; concurrent fetches of the same url share one request"""
+    response = await AsyncHTTPClient().fetch(url)
+    session.downloaded(url, len(response.body))
+    return response.body
+
 @gen.coroutine
 def fetch_and_handle(urls):
     """Fetches the urls and handles/processes the response"""
@@ -1,7 +1,7 @@
 import rich.progress as rprog
 import xmltodict as xtd
 import pandas as pd
-import requests
+import threading
 import tempfile
 import pickle
 import shutil
@@ -9,6 +9,7 @@ import json
 import os
 
 from typing import Union, Optional, List, Dict, Any, Tuple, Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from rich.progress_bar import ProgressBar
 from hashlib import sha512 as sha
 from rich import print as rprint
@@ -16,6 +17,11 @@ from rich.tree import Tree
 
 from eupol.download.utils import tmpcache, rmcache, rc, rlog, download as dl
 from eupol.download.paths import data_dir
+from eupol.download import session
+from eupol.download.sdmx import streaming
+from eupol.download.sdmx.metacache import metadata as metacache
+from eupol.download.sdmx.codestore import CodelistStore, codelists
+from eupol.download.cache import manager, FileLock, atomic_write, lockfile
 
 def to_snake_case(funcname: str) -> str:
     uppercases = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
@@ -65,6 +71,9 @@ class sdmxBase:
     category = "s:Category"
     annotations = 'c:Annotations'
     annotation = 'c:Annotation'
+    annotation_type = 'c:AnnotationType'
+    annotation_title = 'c:AnnotationTitle'
+    annotation_text = 'c:AnnotationText'
     codelists = "s:Codelists"
     codelist = "s:Codelist"
     name = 'c:Name'
@@ -82,6 +91,7 @@ class sdmxBase:
     "GROW" : "https://webgate.ec.europa.eu/grow/redisstat/api/dissemination/sdmx/2.1"
     }
 
+    @staticmethod
     def structural_metadata_url(
         agency_id: str, resource: str,
         all : Optional[bool] = False,
@@ -99,8 +109,25 @@ class sdmxBase:
         smurl = f"{baseurl}/{resource}/{agency_id}/{_all}{details}"
         return smurl
 
-    _cleantxt = lambda x: to_snake_case(x.replace("s:", "").replace("c:", "").replace("@", "").replace("m:", ""))
-
+    # memoized key translation table, the same few dozen keys come up millions of times
+    keys: Dict[str, Tuple[str, bool]] = {}
+
+    @staticmethod
+    def translate(key: str) -> Tuple[str, bool]:
+        """Snake case version of an xmltodict key, and whether it holds multilingual text"""
+        try:
+            return sdmxBase.keys[key]
+        except KeyError:
+            clean = to_snake_case(key.replace("s:", "").replace("c:", "").replace("@", "").replace("m:", ""))
+            multi = sdmxBase.name in key or sdmxBase.description in key
+            sdmxBase.keys[key] = (clean, multi)
+            return clean, multi
+
+    @staticmethod
+    def _cleantxt(key: str) -> str:
+        return sdmxBase.translate(key)[0]
+
+    @staticmethod
     def multilang(data: Union[str, int, float, List, Dict]):
         if isinstance(data, (str, int, float)):
             return data
@@ -113,270 +140,396 @@ class sdmxBase:
         else:
             return data
 
-    def recurlang(data: Union[str, int, float, List, Dict]):
-        if isinstance(data, (str, int, float)):
-            return data
-        elif isinstance(data, list):
-            return [sdmxBase.recurlang(o) for o in data]
-        elif isinstance(data, dict):
-            for k in data.keys():
-                if sdmxBase.name in k or sdmxBase.description in k:
-                    data[k] = sdmxBase.multilang(data[k])
+    @staticmethod
+    def normalize(data: Union[str, int, float, List, Dict], lang: bool = True, clean: bool = True):
+        """
+        Pick the english text of names/descriptions (`lang`) and snake case
+        the keys (`clean`) of a parsed document, without recursion: an
+        explicit stack walks the tree, so deep category hierarchies can't
+        hit the recursion limit. A new tree is built, `data` is left as is.
+        """
+        if not isinstance(data, (list, dict)):
+            return data if isinstance(data, (str, int, float)) else None
+        translate = sdmxBase.translate
+        multilang = sdmxBase.multilang
+        root = {} if isinstance(data, dict) else []
+        stack = [(data, root)]
+        while stack:
+            source, target = stack.pop()
+            if isinstance(source, dict):
+                for key, value in source.items():
+                    newkey, multi = translate(key)
+                    newkey = newkey if clean else key
+                    if lang and multi:
+                        value = multilang(value)
+                    if isinstance(value, dict):
+                        target[newkey] = child = {}
+                        stack.append((value, child))
+                    elif isinstance(value, list):
+                        target[newkey] = child = []
+                        stack.append((value, child))
+                    else:
+                        target[newkey] = value if isinstance(value, (str, int, float)) else None
+            else:
+                for value in source:
+                    if isinstance(value, dict):
+                        child = {}
+                        stack.append((value, child))
+                    elif isinstance(value, list):
+                        child = []
+                        stack.append((value, child))
+                    else:
+                        child = value if isinstance(value, (str, int, float)) else None
+                    target.append(child)
+        return root
+
+    @staticmethod
+    def flatten(obj):
+        """Generic flattening of a normalized document, lists items become `key.i0.subkey` columns"""
+        if isinstance(obj, (str, int, float)):
+            return obj
+        elif isinstance(obj, list):
+            return [sdmxBase.flatten(item) for item in obj]
+        elif isinstance(obj, dict):
+            flatobj = {}
+            for key, val in obj.items():
+                if isinstance(val, list):
+                    for i, item in enumerate(val):
+                        if not isinstance(item, dict):
+                            flatobj[key + '.i' + str(i)] = sdmxBase.flatten(item)
+                        else:
+                            for subkey, subval in sdmxBase.flatten(item).items():
+                                flatobj[key + '.i' + str(i) + '.' + subkey] = subval
+                elif not isinstance(val, dict):
+                    flatobj[key] = sdmxBase.flatten(val)
                 else:
-                    data[k] = sdmxBase.recurlang(data[k])
-            return data
-        else:
-            return data
+                    for subkey, subval in sdmxBase.flatten(val).items():
+                        flatobj[key + '.' + subkey] = subval
+            return flatobj
 
+    @staticmethod
+    def pick(data: Any, path: Tuple[str, ...]) -> Any:
+        """
+        Follow a path of local names (as in `streaming.extract`) through a
+        parsed document, whatever the prefix of its keys, e.g.
+        `("Target", "Ref", "maintainableParentID")`. Names come in english.
+        """
+        for part in path:
+            if not isinstance(data, dict):
+                return None
+            for prefix in ("@", "s:", "c:", "m:", ""):
+                if prefix + part in data:
+                    data = data[prefix + part]
+                    break
+            else:
+                return None
+        return sdmxBase.multilang(data)
+
+    @staticmethod
+    def recurlang(data: Union[str, int, float, List, Dict]):
+        return sdmxBase.normalize(data, clean=False)
+
+    @staticmethod
     def rclean(data: Union[str, int, float, List, Dict]):
-        if isinstance(data, (str, int, float)):
-            return data
-        elif isinstance(data, list):
-            return [Descendants.rclean(o) for o in data]
-        elif isinstance(data, dict):
-            return { sdmxBase._cleantxt(k) : sdmxBase.rclean(v) for k, v in data.items()}
+        return sdmxBase.normalize(data, lang=False)
 
 
 
 class ConceptScheme(sdmxBase):
-    def __new__(cls, agency_id: str = "ESTAT"):
-        cls.url = sdmxBase.structural_metadata_url(agency_id, "conceptscheme", stubs=True, all=True)
-        return cls
-    
-    @classmethod
+    def __init__(self, agency_id: str = "ESTAT"):
+        self.agency_id = agency_id
+        self.url = sdmxBase.structural_metadata_url(agency_id, "conceptscheme", stubs=True, all=True)
+
     @tmpcache
-    def download(cls, agency_id: str = "ESTAT"):
-        cls.response = requests.get(cls.url)
-        return xtd.parse(cls.response.text)
-    @classmethod
-    def parse(cls, data: Union[str, Dict]):
+    def download(self, url: str = None):
+        # the url is always passed so that it keys the cache
+        self.response = session.get(self.url if url is None else url)
+        return xtd.parse(self.response.text)
+    def parse(self, data: Union[str, Dict]):
         if isinstance(data, str):
-            cls.data = xtd.parse(data)
+            self.data = xtd.parse(data)
         elif isinstance(data, dict):
-            cls.data = data
-            return cls.data[sdmxBase.structure][sdmxBase.structures][sdmxBase.concepts][sdmxBase.conceptscheme]
+            self.data = data
+            return self.data[sdmxBase.structure][sdmxBase.structures][sdmxBase.concepts][sdmxBase.conceptscheme]
         elif isinstance(data, list):
-            cls.data = data
-            return cls.data
+            self.data = data
+            return self.data
         else:
             raise TypeError("data must be a string or a dictionary, not a {}".format(type(data)))
-        return cls.data
-    @classmethod
-    def df(cls, data: Union[str, Dict] = None):
+        return self.data
+    def df(self, data: Union[str, Dict] = None):
         if data is None:
-            cls.data = cls.parse(cls.download())
+            self.data = self.parse(self.download(self.url))
         elif data.startswith("https://") or data.startswith("http://"):
-            cls.data = cls.parse(cls.download(data))
+            self.data = self.parse(self.download(data))
         else:
-            cls.data = cls.parse(data)
-        cls.asdict = sdmxBase.rclean(sdmxBase.recurlang(cls.data))
-        return pd.DataFrame.from_records(cls.asdict)
+            self.data = self.parse(data)
+        self.asdict = sdmxBase.normalize(self.data)
+        return pd.DataFrame.from_records(self.asdict)
 
 class DataFlow(sdmxBase):
-    def __new__(cls, agency_id: str = "ESTAT"):
-        cls.url = sdmxBase.structural_metadata_url(agency_id, "dataflow", stubs=True, all=True)
-        return cls
-    @classmethod
-    def parse(cls, dxml):
+    def __init__(self, agency_id: str = "ESTAT"):
+        self.agency_id = agency_id
+        self.url = sdmxBase.structural_metadata_url(agency_id, "dataflow", stubs=True, all=True)
+    def parse(self, dxml):
         return dxml[sdmxBase.structure][sdmxBase.structures][sdmxBase.dataflows][sdmxBase.dataflow]
-    @classmethod
     @tmpcache
-    def download(cls, url: str = None):
-        if url is None:
-            cls.response = requests.get(cls.url)
-        else:
-            cls.response = requests.get(url)
-        cls.data = xtd.parse(cls.response.text)
-        return cls.data
-    @classmethod
-    def flows(cls, data: Union[str, Dict] = None):
+    def download(self, url: str = None):
+        self.response = session.get(self.url if url is None else url)
+        return xtd.parse(self.response.text)
+    def records(self, url: str = None, ttl: Optional[float] = None):
+        """Stream-parse the dataflows straight into column buffers"""
+        def parse(response):
+            self.response = response
+            return streaming.columns(streaming.flows(response.raw, key=sdmxBase._cleantxt))
+        return metacache.fetch(self.url if url is None else url, parse, ttl=ttl)
+    def flows(self, data: Union[str, Dict] = None):
         if data is None:
-            if not hasattr(cls, 'data'):
-                cls.data = cls.parse(cls.download())
-            else:
-                cls.data = cls.parse(cls.data)
+            self.data = self.parse(self.download(self.url))
         elif data.startswith("https://") or data.startswith("http://"):
-            cls.data = cls.parse(cls.download(data))
+            self.data = self.parse(self.download(data))
         else:
-            cls.data = cls.parse(data)
+            self.data = self.parse(data)
 
-        cls.flows_aslist = sdmxBase.recurlang(cls.data)
-        cls.flows_aslist = sdmxBase.rclean(data=cls.flows_aslist)
-        return cls.flows_aslist
+        self.flows_aslist = sdmxBase.normalize(self.data)
+        return self.flows_aslist
 
-    @classmethod
-    def df(cls, data: Union[str, Dict] = None):
-        flows = cls.flows(data)
+    def df(self, data: Union[str, Dict] = None, stream: bool = False, ttl: Optional[float] = None):
+        if stream:
+            return pd.DataFrame(self.records(data, ttl=ttl))
+        flows = self.flows(data)
         return pd.DataFrame.from_records(flows)
 class Descendants(ConceptScheme):
-    def __new__(cls, agency_id: str) -> str:
-        cls.agency_id = agency_id
-        cls.url = sdmxBase.structural_metadata_url(cls.agency_id, "dataflow", all=False)
-        return cls
-    @classmethod
-    def download(cls, scheme_id):
-        cls.scheme_id = scheme_id
-        cls.response = requests.get(cls.url + cls.scheme_id + "?references=descendants")
-        cls.data = xtd.parse(cls.response.text)
-        return cls.data
-
-    @classmethod
+    def __init__(self, agency_id: str):
+        self.agency_id = agency_id
+        self.url = sdmxBase.structural_metadata_url(self.agency_id, "dataflow", all=False)
+    def download(self, scheme_id):
+        self.response = session.get(self.url + scheme_id + "?references=descendants")
+        return xtd.parse(self.response.text)
+
+    @staticmethod
     def flatten(dxml):
         return list(pd.json_normalize(dxml).T.to_dict().values())[0]
-    @classmethod
-    def flatcodes(cls, _codelist):
+    def flatcodes(self, _codelist, scheme_id: Optional[str] = None):
         flatcodes = []
         for _code in _codelist:
             if not "code" in _code:
-                _code["agency"] = cls.agency_id
-                _code["scheme"] = cls.scheme_id if hasattr(cls, "scheme_id") else None
+                _code["agency"] = self.agency_id
+                _code["scheme"] = scheme_id
                 flatcodes.append(_code)
             else:
                 if not isinstance(_code["code"], list):
                     c = _code["code"]
                     c["parent"] = _code["id"]
-                    c["agency"] = cls.agency_id
-                    c["scheme"] = cls.scheme_id if hasattr(cls, "scheme_id") else None
+                    c["agency"] = self.agency_id
+                    c["scheme"] = scheme_id
                 
                     flatcodes.append(c)
                 else:
                     for c in _code["code"]:
                         c["parent"] = _code["id"]
-                        c["agency"] = cls.agency_id
-                        c["scheme"] = cls.scheme_id if hasattr(cls, "scheme_id") else None
+                        c["agency"] = self.agency_id
+                        c["scheme"] = scheme_id
                         flatcodes.append(c)
         return flatcodes
-    @classmethod
-    def codes(cls, data: Union[str, dict]):
+    def codes(self, data: Union[str, dict]):
         """Either a string equal to the scheme id or a dictionary of the parsed xml"""
         if isinstance(data, str):
-            dxml = cls.download(data)
+            scheme_id, dxml = data, self.download(data)
         elif isinstance(data, dict):
-            dxml = data
+            scheme_id, dxml = None, data
         else:
             raise TypeError("data must be a string or a dictionary")
 
         _codelist = dxml[sdmxBase.structure][sdmxBase.structures][sdmxBase.codelists][sdmxBase.codelist]
-        _codelist = sdmxBase.rclean(sdmxBase.recurlang(_codelist))
-        cls.codes_aslist = cls.flatcodes(_codelist)    
-        return cls.codes_aslist
-    @classmethod
-    def df(cls, data: Union[str, dict]):
+        _codelist = sdmxBase.normalize(_codelist)
+        return self.flatcodes(_codelist, scheme_id)
+    def df(self, data: Union[str, dict]):
         """Either a string equal to the scheme id or a dictionary of the parsed xml"""
-        _codes = cls.codes(data)
-        df = pd.DataFrame.from_records(_codes)
-        cls.codedf = df
-        return df
+        return pd.DataFrame.from_records(self.codes(data))
+
+    def structure(self, flow_id: str, ttl: Optional[float] = None) -> Dict[str, List]:
+        """Coded dimensions of a dataflow, with the codelist reference of each one"""
+        def parse(response):
+            return streaming.columns(streaming.dimensions(response.raw, key=sdmxBase._cleantxt))
+        return metacache.fetch(self.url + flow_id + "?references=children", parse, ttl=ttl)
+
+    @staticmethod
+    def codelist(agency_id: str, codelist_id: str, version: Optional[str], store: Optional[CodelistStore] = codelists) -> pd.DataFrame:
+        """
+        Codes of one version of a codelist, in the layout of `Descendants.df`.
+        A codelist version never changes, so once in `store` it is read from disk.
+        Unversioned references get the latest version, which is never stored.
+        """
+        if version is None:
+            store = None
+        if store is not None and (agency_id, codelist_id, version) in store:
+            return store.get(agency_id, codelist_id, version).assign(parent=codelist_id)
+        url = sdmxBase.structural_metadata_url(agency_id, "codelist") + f"{codelist_id}/{version or 'latest'}"
+        response = session.get(url, stream=True)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        df = pd.DataFrame(streaming.columns(streaming.codes(response.raw, key=sdmxBase._cleantxt)))
+        df = df.rename(columns={"parent.ref.id": "parent_code"})
+        if store is not None:
+            store.put(agency_id, codelist_id, version, df)
+        return df.assign(parent=codelist_id, agency=agency_id, codelist=codelist_id, version=version)
+
+    def batch(
+        self,
+        flow_ids: List[str],
+        max_workers: Optional[int] = 8,
+        ttl: Optional[float] = None,
+        store: Optional[CodelistStore] = codelists,
+        ) -> Dict[str, Dict[str, pd.DataFrame]]:
+        """
+        Codes of many dataflows at once, as a dataflow -> dimension -> codes mapping.
+
+        The data structures are fetched concurrently (at most `max_workers`
+        requests in flight), then every distinct codelist id + version is
+        downloaded and parsed exactly once: dataflows sharing GEO, FREQ, ...
+        share the same codes frame, and codelists already in `store` are not
+        downloaded at all. Dataflows that fail are logged and left out.
+        """
+        flow_ids = list(dict.fromkeys(flow_ids))
+        progress = rprog.Progress(
+            rprog.SpinnerColumn(),
+            rprog.BarColumn(),
+            rprog.TextColumn("[progress.percentage]{task.completed} / {task.total}"),
+            rprog.TextColumn("{task.description}"),
+            rprog.TimeElapsedColumn(),
+            console=rc,
+        )
+        structures = {}
+        frames = {}
+        with progress, ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="eupol-codelists") as pool:
+            flowtask = progress.add_task(f"[purple] >> ƒ() ⟶ Downloading {len(flow_ids)} data structures from agency {self.agency_id}", total=len(flow_ids))
+            futures = {pool.submit(self.structure, flow_id, ttl=ttl): flow_id for flow_id in flow_ids}
+            for future in as_completed(futures):
+                try:
+                    structures[futures[future]] = future.result()
+                except Exception as err:
+                    rlog(f"> ❌ could not fetch the structure of {futures[future]}: {err}", style="red")
+                progress.update(flowtask, advance=1)
+
+            refs = {
+                (agency or self.agency_id, codelist, version)
+                for structure in structures.values()
+                for agency, codelist, version in zip(structure.get("agency", []), structure.get("codelist", []), structure.get("version", []))
+            }
+            listtask = progress.add_task(f"[purple] >> ƒ() ⟶ Downloading {len(refs)} distinct codelists", total=len(refs))
+            futures = {pool.submit(self.codelist, *ref, store=store): ref for ref in refs}
+            for future in as_completed(futures):
+                try:
+                    frames[futures[future]] = future.result()
+                except Exception as err:
+                    rlog(f"> ❌ could not fetch codelist {futures[future]}: {err}", style="red")
+                progress.update(listtask, advance=1)
+
+        self.codelists = frames
+        return {
+            flow_id: {
+                dimension: frames[(agency or self.agency_id, codelist, version)]
+                for dimension, agency, codelist, version in zip(
+                    structure.get("dimension", []), structure.get("agency", []),
+                    structure.get("codelist", []), structure.get("version", []),
+                )
+                if (agency or self.agency_id, codelist, version) in frames
+            }
+            for flow_id in flow_ids if flow_id in structures
+            for structure in [structures[flow_id]]
+        }
 
 class Categorisation(sdmxBase):
-    def __new__(cls, agency_id: str = "ESTAT"):
-        cls.url = sdmxBase.structural_metadata_url(agency_id, "categorisation", stubs=False, all=True)
-        return cls
+    # the fields the table of contents needs, as paths of local names
+    fields = {
+        "id": ("id",),
+        "agency_id": ("agencyID",),
+        "version": ("version",),
+        "name": ("Name",),
+        "source.ref.id": ("Source", "Ref", "id"),
+        "target.ref.id": ("Target", "Ref", "id"),
+        "target.ref.maintainable_parent_id": ("Target", "Ref", "maintainableParentID"),
+    }
 
-    @classmethod
-    def flatten(cls, obj):
-        if isinstance(obj, (str, int, float)):
-            return obj
-        elif isinstance(obj, list):
-            return [cls.flatten(item) for item in obj]
-        elif isinstance(obj, dict):
-            flatobj = {}
-            for key, val in obj.items():
-                if isinstance(val, list):
-                    for i, item in enumerate(val):
-                        if not isinstance(item, dict):
-                            flatobj[key + '.i' + str(i)] = cls.flatten(item)
-                        else:
-                            for subkey, subval in cls.flatten(item).items():
-                                flatobj[key + '.i' + str(i) + '.' + subkey] = subval
-                elif not isinstance(val, dict):
-                    flatobj[key] = cls.flatten(val)
-                else:
-                    for subkey, subval in cls.flatten(val).items():
-                        flatobj[key + '.' + subkey] = subval
-            return flatobj
-    
-    @classmethod
-    def parse(cls, dxml):
+    def __init__(self, agency_id: str = "ESTAT"):
+        self.agency_id = agency_id
+        self.url = sdmxBase.structural_metadata_url(agency_id, "categorisation", stubs=False, all=True)
+
+    def parse(self, dxml):
         cats = dxml[sdmxBase.structure][sdmxBase.structures][sdmxBase.categorisations]
-        cls.data = cats[sdmxBase.categorisation]
-        return cls.data
-    @classmethod
+        self.data = cats[sdmxBase.categorisation]
+        return self.data
     @tmpcache
-    def download(cls, url: str = None):
-        if url is None:
-            cls.response = requests.get(cls.url)
-        else:
-            cls.response = requests.get(url)
-        cls.data = xtd.parse(cls.response.text)
-        return cls.data
-    @classmethod
-    def categories(cls, data: Union[str, Dict] = None):
+    def download(self, url: str = None):
+        self.response = session.get(self.url if url is None else url)
+        return xtd.parse(self.response.text)
+    def records(self, url: str = None, ttl: Optional[float] = None, annotations: bool = False):
+        """Stream-parse the `fields` of the categorisations straight into column buffers"""
+        def parse(response):
+            self.response = response
+            return streaming.columns(streaming.categorisations(response.raw, fields=self.fields, annotated=annotations))
+        variant = "annotations" if annotations else "fields"
+        return metacache.fetch(self.url if url is None else url, parse, ttl=ttl, variant=variant)
+    def load(self, data: Union[str, Dict] = None):
         if data is None:
-            if not hasattr(cls, 'data'):
-                cls.data = cls.parse(cls.download())
-            else:
-                cls.data = cls.parse(cls.data)
+            self.data = self.parse(self.download(self.url))
         elif data.startswith("https://") or data.startswith("http://"):
-            cls.data = cls.parse(cls.download(data))
+            self.data = self.parse(self.download(data))
         else:
-            cls.data = cls.parse(data)
-
-        cls.categories_aslist = sdmxBase.recurlang(cls.data)
-        cls.categories_aslist = sdmxBase.rclean(data=cls.categories_aslist)
-        return cls.categories_aslist
-
-    @classmethod
-    def df(cls, data: Union[str, Dict] = None, annotations: bool = False):
-        cats = cls.categories(data)
-        cats = cls.flatten(cats)
-        df = pd.DataFrame.from_records(cats)
-        if not annotations:
-            df = df.drop(columns=[col for col in df.columns if ".annotations" in col])
-        return df
+            self.data = self.parse(data)
+        return self.data
+    def categories(self, data: Union[str, Dict] = None):
+        self.categories_aslist = sdmxBase.normalize(self.load(data))
+        return self.categories_aslist
+
+    @staticmethod
+    def annotated(categorisation: Dict) -> Dict[str, Any]:
+        """The `annotations.<type>` columns of a parsed categorisation"""
+        annotations = (categorisation.get(sdmxBase.annotations) or {}).get(sdmxBase.annotation) or []
+        record = {}
+        for annotation in annotations if isinstance(annotations, list) else [annotations]:
+            if annotation and annotation.get(sdmxBase.annotation_type):
+                value = annotation.get(sdmxBase.annotation_title, annotation.get(sdmxBase.annotation_text))
+                record["annotations." + annotation[sdmxBase.annotation_type].lower()] = sdmxBase.multilang(value)
+        return record
+
+    def extract(self, data: Union[Dict, List[Dict]], annotations: bool = False) -> Dict[str, List]:
+        """
+        Column buffers of the `fields` of parsed categorisations, read
+        straight from the document instead of flattening whole records;
+        annotations are only read when asked for.
+        """
+        data = data if isinstance(data, list) else [data]
+        columns = {name: [sdmxBase.pick(record, path) for record in data] for name, path in self.fields.items()}
+        if annotations:
+            columns.update(streaming.columns(self.annotated(record) for record in data))
+        return columns
+
+    def df(self, data: Union[str, Dict] = None, annotations: bool = False, stream: bool = False, ttl: Optional[float] = None):
+        if stream:
+            return pd.DataFrame(self.records(data, ttl=ttl, annotations=annotations))
+        return pd.DataFrame(self.extract(self.load(data), annotations=annotations))
 
 class CategoryScheme(sdmxBase):
-    def __new__(cls, agency_id: str = "ESTAT"):
-        cls.url = sdmxBase.structural_metadata_url(agency_id, "categoryscheme", stubs=False, all=True)
-        return cls
+    def __init__(self, agency_id: str = "ESTAT"):
+        self.agency_id = agency_id
+        self.url = sdmxBase.structural_metadata_url(agency_id, "categoryscheme", stubs=False, all=True)
 
-    @classmethod
-    def flatten(cls, obj):
-        if isinstance(obj, (str, int, float)):
-            return obj
-        elif isinstance(obj, list):
-            return [cls.flatten(item) for item in obj]
-        elif isinstance(obj, dict):
-            flatobj = {}
-            for key, val in obj.items():
-                if isinstance(val, list):
-                    for i, item in enumerate(val):
-                        if not isinstance(item, dict):
-                            flatobj[key + '.i' + str(i)] = cls.flatten(item)
-                        else:
-                            for subkey, subval in cls.flatten(item).items():
-                                flatobj[key + '.i' + str(i) + '.' + subkey] = subval
-                elif not isinstance(val, dict):
-                    flatobj[key] = cls.flatten(val)
-                else:
-                    for subkey, subval in cls.flatten(val).items():
-                        flatobj[key + '.' + subkey] = subval
-            return flatobj
-    
-    @classmethod
-    def parse(cls, dxml):
+    def parse(self, dxml):
         catschemes = dxml[sdmxBase.structure][sdmxBase.structures][sdmxBase.categoryschemes][sdmxBase.categoryscheme]
-        cls.data = catschemes
-        return cls.data
-    @classmethod
+        self.data = catschemes
+        return self.data
     @tmpcache
-    def download(cls, url: str = None):
-        if url is None:
-            cls.response = requests.get(cls.url)
-        else:
-            cls.response = requests.get(url)
-        cls.data = xtd.parse(cls.response.text)
-        return cls.data
+    def download(self, url: str = None):
+        self.response = session.get(self.url if url is None else url)
+        return xtd.parse(self.response.text)
+    def records(self, url: str = None, ttl: Optional[float] = None):
+        """Stream-parse the category schemes into column buffers, one row per leaf category"""
+        def parse(response):
+            self.response = response
+            return streaming.columns(streaming.categories(response.raw))
+        return metacache.fetch(self.url if url is None else url, parse, ttl=ttl)
 
     @classmethod
     def flatcats(cls, categories: List[Dict], level: int = 0):
@@ -395,68 +548,76 @@ class CategoryScheme(sdmxBase):
                 rows.append(row)
         return rows
 
-    @classmethod
-    def categoryschemes(cls, data: Union[str, Dict] = None):
+    def categoryschemes(self, data: Union[str, Dict] = None):
         if data is None:
-            if not hasattr(cls, 'data'):
-                cls.data = cls.parse(cls.download())
-            else:
-                cls.data = cls.parse(data)
+            self.data = self.parse(self.download(self.url))
         elif data.startswith("https://") or data.startswith("http://"):
-            cls.data = cls.parse(cls.download(data))
+            self.data = self.parse(self.download(data))
         else:
-            cls.data = cls.parse(data)
+            self.data = self.parse(data)
 
-        cls.categoryschemes_aslist = sdmxBase.recurlang(cls.data)
-        
-        cls.categoryschemes_aslist = sdmxBase.rclean(data=cls.categoryschemes_aslist)
-        cls.categoryschemes_aslist = cls.flatcats(cls.categoryschemes_aslist)
-        return cls.categoryschemes_aslist
+        self.categoryschemes_aslist = sdmxBase.normalize(self.data)
+        self.categoryschemes_aslist = self.flatcats(self.categoryschemes_aslist)
+        return self.categoryschemes_aslist
 
-    @classmethod
-    def df(cls, data: Union[str, Dict] = None, annotations: bool = False):
-        catschemes = cls.categoryschemes(data)
-        # catschemes = cls.flatten(catschemes)
+    def df(self, data: Union[str, Dict] = None, annotations: bool = False, stream: bool = False, ttl: Optional[float] = None):
+        if stream:
+            return pd.DataFrame(self.records(data, ttl=ttl))
+        catschemes = self.categoryschemes(data)
+        # catschemes = self.flatten(catschemes)
         df = pd.DataFrame.from_records(catschemes)
         return df
 
 class TableOfContents(sdmxBase):
-    def __new__(
-        cls,
+    # dataflow fields that tell whether a dataflow changed since the table was built
+    flow_updates = ["version", "update_data", "update_structure"]
+    flow_columns = {
+        "id": "dataflow.id",
+        "name": "dataflow.name",
+        "description": "dataflow.description",
+        **{col: "dataflow." + col for col in flow_updates},
+    }
+    # pickled trees kept by `toc_tree`
+    max_snapshots = 8
+
+    def __init__(
+        self,
         dflows: pd.DataFrame,
         dfcategories: pd.DataFrame,
         dfcatschemes: pd.DataFrame
         ):
-        
-        dfcatschemes['nested_id'] = dfcatschemes.apply(
-            func=lambda row : ".".join([
-                row[col]
-                    for col in dfcatschemes.columns if "id" in str(col) and isinstance(row[col],str)
-                    ]),
-                    axis=1
-                )
-
+        """
+        Join the dataflows to their category through the categorisations.
+        Every step is a column operation; join keys are turned into
+        categoricals sharing the same categories so that both merges
+        compare integer codes instead of hashing python strings.
+        """
+        dfcatschemes = dfcatschemes.assign(nested_id=self.nested_ids(dfcatschemes))
         dfcatschemes.columns = ["category_scheme." + str(col) for col in dfcatschemes.columns]
 
-        categories = dfcategories[[
+        categories = dfcategories.reindex(columns=[
             'source.ref.id', 'target.ref.id',
             'target.ref.maintainable_parent_id',
-        ]].drop_duplicates().rename(columns={
+        ]).drop_duplicates().rename(columns={
             'source.ref.id': 'dataflow.id',
             'target.ref.id': 'category.id',
             'target.ref.maintainable_parent_id': 'category.parent.id',
         })
 
 
-        flows = dflows[["id", "name", "description"]].rename(columns={
-            "id": "dataflow.id",
-            "name": "dataflow.name",
-            "description": "dataflow.description",
-        })
-
+        flows = dflows.reindex(columns=[
+            "id", "name", "description",
+            *[col for col in self.flow_updates if col in dflows.columns],
+        ]).rename(columns=self.flow_columns)
 
+        categories["dataflow.id"], flows["dataflow.id"] = self.categorical(
+            categories["dataflow.id"], flows["dataflow.id"]
+        )
         toc = pd.merge(categories, flows, left_on="dataflow.id", right_on="dataflow.id")
-        toc["category.nested_id"] = toc["category.parent.id"] + "." + toc["category.id"]
+        toc["category.nested_id"], dfcatschemes["category_scheme.nested_id"] = self.categorical(
+            toc["category.parent.id"] + "." + toc["category.id"],
+            dfcatschemes["category_scheme.nested_id"],
+        )
 
         toc = pd.merge(
             dfcatschemes,
@@ -464,19 +625,101 @@ class TableOfContents(sdmxBase):
             left_on="category_scheme.nested_id",
             right_on="category.nested_id",
         )
+        # the keys go back to plain strings for the consumers of the table
+        for col in ["category_scheme.nested_id", "dataflow.id", "category.nested_id"]:
+            toc[col] = toc[col].astype(object)
 
-        cls.df = toc
-        cls.state = toc
-        return cls
+        self.df = self.state = self.toc = toc
 
     @classmethod
-    def from_parquet(cls, path: str):
-        cls.toc = pd.read_parquet(path)
-        return cls
-    
+    def nested_ids(cls, dfcatschemes: pd.DataFrame) -> pd.Series:
+        """Dot-join the `id`, `level1.id`, ... columns of each row, skipping the missing levels"""
+        nested = pd.Series("", index=dfcatschemes.index, dtype=object)
+        for col in [col for col in dfcatschemes.columns if "id" in str(col)]:
+            ids = dfcatschemes[col]
+            nested = nested.mask(ids.notna(), nested + "." + ids.astype(str))
+        return nested.str[1:]
+
     @classmethod
-    def toc_tree(cls, table: Optional[pd.DataFrame] = None):
-        """Create a tree of the table of contents at the current state of the class"""
+    def categorical(cls, *keys: pd.Series) -> Tuple[pd.Series, ...]:
+        """Encode join keys as categoricals with one shared set of categories"""
+        dtype = pd.CategoricalDtype(pd.unique(pd.concat(keys, ignore_index=True).dropna()))
+        return tuple(key.astype(dtype) for key in keys)
+
+    @classmethod
+    def from_parquet(cls, path: str) -> "TableOfContents":
+        return cls.from_frame(pd.read_parquet(path))
+
+    @classmethod
+    def from_frame(cls, toc: pd.DataFrame) -> "TableOfContents":
+        """A table of contents around an already joined frame"""
+        self = cls.__new__(cls)
+        self.df = self.state = self.toc = toc
+        return self
+
+    @classmethod
+    def to_parquet(cls, toc: pd.DataFrame, path: str):
+        """Write through a temporary file so readers never see a partial table"""
+        with atomic_write(path) as tmp:
+            toc.to_parquet(tmp)
+
+    @classmethod
+    def changes(
+        cls,
+        stored: pd.DataFrame,
+        dflows: pd.DataFrame,
+        dfcategories: pd.DataFrame,
+        dfcatschemes: pd.DataFrame,
+        ) -> Tuple[Optional[pd.Index], Optional[pd.Index]]:
+        """
+        Ids of the new or changed dataflows and of the removed ones, between a
+        stored table of contents and fresh metadata frames.
+        A dataflow changed when one of its fields, its categories or the
+        category path it is filed under differ. `None, None` means the layouts
+        can't be compared and the table has to be rebuilt.
+        """
+        fresh_schemes = dfcatschemes.assign(nested_id=cls.nested_ids(dfcatschemes))
+        fresh_schemes.columns = ["category_scheme." + str(col) for col in fresh_schemes.columns]
+        flowcols = [col for col in ["id", "name", "description", *cls.flow_updates] if col in dflows.columns]
+        fresh_flows = dflows[flowcols].rename(columns=cls.flow_columns).drop_duplicates("dataflow.id")
+        schemecols = [col for col in stored.columns if col.startswith("category_scheme.")]
+        if set(schemecols) != set(fresh_schemes.columns) or not set(fresh_flows.columns) <= set(stored.columns):
+            return None, None
+
+        # dataflow fields, uncategorised dataflows are not in the table
+        stored_flows = stored[list(fresh_flows.columns)].drop_duplicates("dataflow.id")
+        fresh_flows = fresh_flows[fresh_flows["dataflow.id"].isin(stored_flows["dataflow.id"])]
+        flows = pd.merge(fresh_flows, stored_flows, on=list(fresh_flows.columns), how="left", indicator=True)
+        changed = set(flows.loc[flows["_merge"] == "left_only", "dataflow.id"])
+        removed = set(stored_flows["dataflow.id"]) - set(dflows["id"])
+
+        # categorisations, restricted to the categories that exist in the schemes
+        pairs = pd.DataFrame({
+            "dataflow.id": dfcategories["source.ref.id"],
+            "category.nested_id": dfcategories["target.ref.maintainable_parent_id"] + "." + dfcategories["target.ref.id"],
+        }).drop_duplicates()
+        pairs = pairs[pairs["category.nested_id"].isin(fresh_schemes["category_scheme.nested_id"])]
+        # and to listed dataflows, the others never make it to the table
+        pairs = pairs[pairs["dataflow.id"].isin(dflows["id"])]
+        pairs = pd.merge(
+            pairs, stored[["dataflow.id", "category.nested_id"]].drop_duplicates(),
+            how="outer", indicator=True,
+        )
+        changed |= set(pairs.loc[pairs["_merge"] != "both", "dataflow.id"])
+
+        # category paths (renamed or moved categories)
+        paths = pd.merge(
+            stored[schemecols + ["dataflow.id"]],
+            fresh_schemes[schemecols].drop_duplicates(),
+            on=schemecols, how="left", indicator=True,
+        )
+        changed |= set(paths.loc[paths["_merge"] == "left_only", "dataflow.id"])
+
+        changed -= removed
+        return pd.Index(sorted(changed)), pd.Index(sorted(removed))
+    
+    def toc_tree(self, table: Optional[pd.DataFrame] = None):
+        """Create a tree of the table of contents (or of a selection of it)"""
         
         styles = {
             'category_scheme.name': "bold purple",
@@ -494,128 +737,229 @@ class TableOfContents(sdmxBase):
             **{key.replace(".", "_"):val for key,val in styles.items()}
         }
 
-        toc = cls.toc if table is None else table    
+        toc = self.toc if table is None else table
         tocnames = [col for col in toc.columns if "name" in col]
-        # capture snapshot of current df through hash
-        filename = "toc-snapshot-"
-        for col in tocnames:
-            filename += f"@col={col}@values{'-'.join(toc[col].dropna().unique())}"
-        filename = sha(filename.encode()).hexdigest() + ".pkl"
-        filename = os.path.join(tempfile.gettempdir(), "eupol", "sdmx", filename)
+        # the hierarchy once per distinct path, parents sorted before their children
+        paths = toc[tocnames].drop_duplicates().sort_values(tocnames, na_position="first")
+        # capture snapshot of the selected rows through a fingerprint of their hashes
+        fingerprint = sha(" ".join(tocnames).encode())
+        fingerprint.update(pd.util.hash_pandas_object(paths, index=False).to_numpy().tobytes())
+        directory = os.path.join(tempfile.gettempdir(), "eupol", "sdmx", "toc-snapshots")
+        filename = os.path.join(directory, fingerprint.hexdigest()[:32] + ".pkl")
         # check if snapshot exists
         if os.path.exists(filename):
             with open(filename, "rb") as f:
-                cls.tree = pickle.load(f)
-            return cls.tree
-        # create tree
-        cls.tree = Tree("Table of Contents Topics", style="bold blue")
-        nodes = {
-            "categories": {
-                "visited": {
-                    col : [] for col in tocnames
-                }
-            },
-        }
-        for idx, row in toc.iterrows():
-            rootname = tocnames[0]
-            if row[rootname] not in nodes["categories"]["visited"][rootname]:
-                nodes["categories"][row[rootname]] = cls.tree.add(row[rootname], style=styles[rootname])
-                nodes["categories"]["visited"][rootname].append(row[rootname])
-                root = nodes["categories"][row[rootname]]
-            else:
-                root = nodes["categories"][row[rootname]]
-            for col in tocnames[1:]:
-                if row[col] is not None:
-                    if row[col] not in nodes["categories"]["visited"][col]:
-                        nodes["categories"][row[col]] = root.add(row[col], style=styles[col])
-                        nodes["categories"]["visited"][col].append(row[col])
-                    root = nodes["categories"][row[col]]
-
-        # save tree
-        os.makedirs(os.path.dirname(filename), exist_ok=True)
-        with open(filename, "wb+") as f:
-            pickle.dump(cls.tree, f)
-        return cls.tree
+                self.tree = pickle.load(f)
+            os.utime(filename)
+            return self.tree
+        # create tree, nodes are keyed by their full path so that namesakes under different parents stay apart
+        self.tree = Tree("Table of Contents Topics", style="bold blue")
+        nodes = {(): self.tree}
+        for row in paths.itertuples(index=False, name=None):
+            path = ()
+            for col, name in zip(tocnames, row):
+                if pd.isna(name):
+                    continue
+                parent, path = nodes[path], (*path, name)
+                if path not in nodes:
+                    nodes[path] = parent.add(name, style=styles.get(col, ""))
+
+        # save tree, keeping only the most recently used snapshots
+        os.makedirs(directory, exist_ok=True)
+        with atomic_write(filename) as tmp, open(tmp, "wb+") as f:
+            pickle.dump(self.tree, f)
+        # another process may be trimming at the same time
+        snapshots = []
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    snapshots.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    continue
+        for _, path in sorted(snapshots, reverse=True)[self.max_snapshots:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        manager.written()
+        return self.tree
     
-    @classmethod
-    def allcodes(cls):
+    @staticmethod
+    def allcodes():
         bulk_url = "https://ec.europa.eu/eurostat/estat-navtree-portlet-prod/BulkDownloadListing?sort=1&file=dic%2Fall_dic.zip"
         fname = dl(bulk_url)
         shutil.unpack_archive(fname, fname.replace(".zip", ""))
         return fname.replace(".zip", "")
 
 class Model:
-    def __new__(cls, agency_id: str, *args, **kwargs):
-        cls.base = sdmxBase
-        cls.concept = ConceptScheme(agency_id)
-        cls.dataflow = DataFlow(agency_id)
-        cls.descendants = Descendants(agency_id)
-        cls.categories = Categorisation(agency_id)
-        cls.categoryscheme = CategoryScheme(agency_id)
-        cls.ftoc = None
-
-        cls.agency_id = agency_id
-        # store the agency_id in the class
-        return cls
+    def __init__(self, agency_id: str, *args, **kwargs):
+        self.base = sdmxBase
+        self.concept = ConceptScheme(agency_id)
+        self.dataflow = DataFlow(agency_id)
+        self.descendants = Descendants(agency_id)
+        self.categories = Categorisation(agency_id)
+        self.categoryscheme = CategoryScheme(agency_id)
+        self.ftoc = None
+
+        self.agency_id = agency_id
+        self.toc = None
+        # one build or refresh of this agency's table at a time
+        self._lock = threading.RLock()
     
-    @classmethod
-    def init(cls, directory: Optional[str] = None):
+    def tocfile(self, directory: Optional[str] = None) -> str:
         if directory is None:
             tmp = tempfile.gettempdir()
-            directory = os.path.join(tmp, "eupol", "sdmx", cls.agency_id, "metadata", "TOC")
+            directory = os.path.join(tmp, "eupol", "sdmx", self.agency_id, "metadata", "TOC")
             os.makedirs(directory, exist_ok=True)
-        cls.directory = directory
-        filename = os.path.join(directory, f"{cls.agency_id}_toc.parquet")
-        if os.path.exists(filename):
-            cls.ftoc = TableOfContents.from_parquet(filename)
-            cls.toc = cls.ftoc.toc
-            return cls.toc
-        # else download the data
-        progress = rprog.Progress(
+        self.directory = directory
+        return os.path.join(directory, f"{self.agency_id}_toc.parquet")
+
+    @staticmethod
+    def progress(show_progress: Optional[bool] = True) -> rprog.Progress:
+        return rprog.Progress(
         rprog.SpinnerColumn(),
         rprog.BarColumn(),
         rprog.TextColumn("[progress.percentage]{task.percentage:>3.1f}%"),
         rprog.TextColumn("{task.description}"),
         rprog.TimeElapsedColumn(),
         console=rc,
+        disable=not show_progress,
         )
 
-        with progress:
-            general = progress.add_task(f"> 🚀🚀 Initializing Metadata for agency {cls.agency_id}", total = 4)
-            flowtask = progress.add_task(description=f"[purple] >> ƒ() ⟶  Downloading DataFlow metadata from agency {cls.agency_id}", total=None)
-            dflows = cls.dataflow.df()
-            progress.update(flowtask, advance=100, description=f"[green] >> ✅ Done ! DataFlow metadata acquired.")
+    def metadata(
+        self,
+        progress: rprog.Progress,
+        general: rprog.TaskID,
+        stream: Optional[bool] = True,
+        concurrent: Optional[bool] = True,
+        ttl: Optional[float] = None,
+        ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """The DataFlow, Categorisation and CategoryScheme frames the table of contents is built from"""
+        fetches = [
+            ("DataFlow", self.dataflow),
+            ("Categorisation", self.categories),
+            ("CategoryScheme", self.categoryscheme),
+        ]
+
+        def fetch(name: str, metadata: sdmxBase) -> pd.DataFrame:
+            task = progress.add_task(description=f"[purple] >> ƒ() ⟶  Downloading {name} metadata from agency {self.agency_id}", total=None)
+            df = metadata.df(stream=stream, ttl=ttl)
+            progress.update(task, advance=100, description=f"[green] >> ✅ Done ! {name} metadata acquired.")
             progress.update(general, advance=1)
-            catstask = progress.add_task(description=f"[purple] >> ƒ() ⟶ Downloading Categorisation metadata from agency {cls.agency_id}", total=None)
-            dfcategories = cls.categories.df()
-            progress.update(catstask, advance=100, description=f"[green] >> ✅ Done ! Categorisation metadata acquired.")
-            progress.update(general, advance=1)
-            catschemetask = progress.add_task(description=f"[purple] >> ƒ() ⟶  Downloading CategoryScheme metadata from agency {cls.agency_id}", total=None)
-            dfcatschemes = cls.categoryscheme.df()
-            progress.update(catschemetask, advance=100, description=f"[green] >> ✅ Done ! CategoryScheme metadata acquired.")
-            progress.update(general, advance=1)
-            toc = progress.add_task(description=f"[purple] >> ƒ() ⟶ Building Table of Contents from agency {cls.agency_id}", total=None)
-
-            cls.ftoc = TableOfContents(
-                dflows,
-                dfcategories,
-                dfcatschemes,
-            )
-            cls.toc = cls.ftoc.df
-            progress.update(toc, advance=100, description=f"[green] >> ✅ Done ! Table of Contents built.")
-            progress.update(general, advance=1)
-            cls.toc.to_parquet(filename)
-            rlog(f"> 📁 ⭳⭳ saving result to {directory} as parquet (for lightning fast IO ⚡⚡)", style="blue")
-        return cls.toc
-
-    @classmethod
-    def rm_cache(cls):
-        rmcache(cls.dataflow.download)
-        rmcache(cls.categories.download)
-        rmcache(cls.categoryscheme.download)
-        rmcache(cls.concept.download)
-        rmcache(cls.descendants.download)
-        rmcache(cls.init)
+            return df
+
+        if concurrent:
+            with ThreadPoolExecutor(max_workers=len(fetches), thread_name_prefix="eupol-init") as pool:
+                futures = [pool.submit(fetch, name, metadata) for name, metadata in fetches]
+                return tuple(future.result() for future in futures)
+        return tuple(fetch(name, metadata) for name, metadata in fetches)
+
+    def init(
+        self,
+        directory: Optional[str] = None,
+        stream: Optional[bool] = True,
+        concurrent: Optional[bool] = True,
+        ttl: Optional[float] = None,
+        show_progress: Optional[bool] = True,
+        ):
+        """
+        Load the table of contents of the agency, building it on a cold cache.
+        With `concurrent`, the DataFlow, Categorisation and CategoryScheme
+        documents are fetched and parsed at the same time, one thread each.
+        In streaming mode the parsed documents are revalidated with a
+        conditional GET once they are older than `ttl` seconds.
+        On a cold cache, the first process builds the table while the
+        others wait on a lock file, then read it.
+        """
+        filename = self.tocfile(directory)
+        with self._lock, FileLock(lockfile(filename)):
+            if os.path.exists(filename):
+                self.ftoc = TableOfContents.from_parquet(filename)
+                self.toc = self.ftoc.toc
+                return self.toc
+            # else download the data
+            progress = self.progress(show_progress)
+
+            with progress:
+                general = progress.add_task(f"> 🚀🚀 Initializing Metadata for agency {self.agency_id}", total = 4)
+                dflows, dfcategories, dfcatschemes = self.metadata(progress, general, stream=stream, concurrent=concurrent, ttl=ttl)
+
+                toc = progress.add_task(description=f"[purple] >> ƒ() ⟶ Building Table of Contents from agency {self.agency_id}", total=None)
+
+                self.ftoc = TableOfContents(
+                    dflows,
+                    dfcategories,
+                    dfcatschemes,
+                )
+                self.toc = self.ftoc.df
+                progress.update(toc, advance=100, description=f"[green] >> ✅ Done ! Table of Contents built.")
+                progress.update(general, advance=1)
+                TableOfContents.to_parquet(self.toc, filename)
+                rlog(f"> 📁 ⭳⭳ saving result to {self.directory} as parquet (for lightning fast IO ⚡⚡)", style="blue")
+            return self.toc
+
+    def refresh(
+        self,
+        directory: Optional[str] = None,
+        ttl: Optional[float] = None,
+        show_progress: Optional[bool] = True,
+        ):
+        """
+        Bring the stored table of contents up to date without rebuilding it.
+
+        The fresh dataflows (ids, versions, names and update dates) and
+        their categorisations are compared with the stored table: only
+        new or changed dataflows are joined again, removed ones are dropped,
+        and the parquet file is replaced atomically. With the revalidating
+        metadata cache, an unchanged agency costs three `304`s.
+        """
+        filename = self.tocfile(directory)
+        if not os.path.exists(filename):
+            return self.init(directory=directory, ttl=ttl, show_progress=show_progress)
+        with self._lock, FileLock(lockfile(filename)):
+            stored = pd.read_parquet(filename)
+            progress = self.progress(show_progress)
+
+            with progress:
+                general = progress.add_task(f"> 🔄 Refreshing Metadata for agency {self.agency_id}", total = 4)
+                dflows, dfcategories, dfcatschemes = self.metadata(progress, general, stream=True, ttl=ttl)
+                task = progress.add_task(description=f"[purple] >> ƒ() ⟶ Comparing with the stored Table of Contents", total=None)
+                changed, removed = TableOfContents.changes(stored, dflows, dfcategories, dfcatschemes)
+                if changed is None:
+                    rlog(f"> ⚠ stored table of contents has another layout, rebuilding it", style="purple")
+                    toc = TableOfContents(dflows, dfcategories, dfcatschemes).df
+                elif not len(changed) and not len(removed):
+                    progress.update(task, advance=100, description=f"[green] >> ✅ Done ! Table of Contents is up to date.")
+                    progress.update(general, advance=1)
+                    self.ftoc = TableOfContents.from_frame(stored)
+                    self.toc = stored
+                    return self.toc
+                else:
+                    rlog(f"> 🔄 {len(changed)} new or changed, {len(removed)} removed dataflows", style="blue")
+                    partial = TableOfContents(
+                        dflows[dflows["id"].isin(changed)],
+                        dfcategories[dfcategories["source.ref.id"].isin(changed)],
+                        dfcatschemes,
+                    ).df
+                    keep = stored[~stored["dataflow.id"].isin(changed.union(removed))]
+                    toc = pd.concat([keep, partial], ignore_index=True)[partial.columns]
+                progress.update(task, advance=100, description=f"[green] >> ✅ Done ! Table of Contents refreshed.")
+                progress.update(general, advance=1)
+                TableOfContents.to_parquet(toc, filename)
+            self.ftoc = TableOfContents.from_frame(toc)
+            self.toc = toc
+            return self.toc
+
+    def rm_cache(self):
+        rmcache(self.dataflow.download)
+        rmcache(self.categories.download)
+        rmcache(self.categoryscheme.download)
+        metacache.clear(self.dataflow.url)
+        metacache.clear(self.categories.url)
+        metacache.clear(self.categoryscheme.url)
+        rmcache(self.concept.download)
+        rmcache(self.descendants.download)
+        rmcache(self.init)
     
 if __name__ == '__main__':
     estat = Model("ESTAT")
@@ -0,0 +1,99 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as pds
+import pandas as pd
+import threading
+import tempfile
+import os
+
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+
+partitioning = ["agency", "codelist", "version"]
+schema = pa.schema([(col, pa.string()) for col in partitioning])
+
+
+class CodelistStore:
+    """
+    Codelists on disk as one hive-partitioned parquet dataset,
+    `agency=ESTAT/codelist=GEO/version=13.0/codes.parquet`.
+
+    Each codelist version is stored once whatever the number of dataflows
+    using it. Reads are memory-mapped and the code -> label tables built
+    from them are kept in memory, so repeated lookups are dict lookups.
+    """
+    def __init__(self, directory: Optional[str] = None):
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(), "eupol", "sdmx", "codelists")
+        self.directory = Path(directory)
+        self._labels: Dict[Tuple[str, str, str], Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def path(self, agency: str, codelist: str, version: str) -> Path:
+        return self.directory.joinpath(f"agency={agency}", f"codelist={codelist}", f"version={version}", "codes.parquet")
+
+    def __contains__(self, ref: Tuple[str, str, str]) -> bool:
+        return self.path(*ref).exists()
+
+    def versions(self, agency: str, codelist: str) -> List[str]:
+        """Stored versions of a codelist, oldest first"""
+        directory = self.directory.joinpath(f"agency={agency}", f"codelist={codelist}")
+        if not directory.exists():
+            return []
+        versions = [p.name.split("=", 1)[1] for p in directory.iterdir() if p.name.startswith("version=")]
+        return sorted(versions, key=lambda v: [int(n) if n.isdigit() else n for n in v.split(".")])
+
+    def _version(self, agency: str, codelist: str, version: Optional[str]) -> str:
+        if version is not None:
+            return version
+        versions = self.versions(agency, codelist)
+        if not versions:
+            raise KeyError(f"codelist {agency}:{codelist} is not in the store")
+        return versions[-1]
+
+    def put(self, agency: str, codelist: str, version: str, codes: pd.DataFrame) -> Path:
+        """Store the codes of a codelist version (partition columns are dropped from the file)"""
+        path = self.path(agency, codelist, version)
+        os.makedirs(path.parent, exist_ok=True)
+        codes = codes.drop(columns=[col for col in partitioning if col in codes.columns])
+        # dot-prefixed files are ignored by dataset discovery
+        tmp = path.parent.joinpath(f".codes.parquet.{os.getpid()}.{threading.get_ident()}.tmp")
+        codes.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        with self._lock:
+            self._labels.pop((agency, codelist, version), None)
+        return path
+
+    def get(self, agency: str, codelist: str, version: Optional[str] = None) -> pd.DataFrame:
+        """Codes of a codelist version (the latest stored one by default)"""
+        version = self._version(agency, codelist, version)
+        path = self.path(agency, codelist, version)
+        if not path.exists():
+            raise KeyError(f"codelist {agency}:{codelist}({version}) is not in the store")
+        codes = pq.read_table(path, memory_map=True).to_pandas()
+        return codes.assign(agency=agency, codelist=codelist, version=version)
+
+    def labels(self, agency: str, codelist: str, version: Optional[str] = None) -> Dict[str, str]:
+        """Code id -> english label table of a codelist version"""
+        version = self._version(agency, codelist, version)
+        ref = (agency, codelist, version)
+        labels = self._labels.get(ref)
+        if labels is None:
+            table = pq.read_table(self.path(*ref), columns=["id", "name"], memory_map=True)
+            labels = dict(zip(table.column("id").to_pylist(), table.column("name").to_pylist()))
+            with self._lock:
+                self._labels[ref] = labels
+        return labels
+
+    def lookup(self, code_id: str, agency: str, codelist: str, version: Optional[str] = None) -> Optional[str]:
+        """Label of a single code"""
+        return self.labels(agency, codelist, version).get(code_id)
+
+    def find(self, code_id: str) -> pd.DataFrame:
+        """Every stored codelist version holding `code_id`"""
+        if not self.directory.exists():
+            return pd.DataFrame(columns=["id", "name", *partitioning])
+        dataset = pds.dataset(self.directory, format="parquet", partitioning=pds.partitioning(schema, flavor="hive"))
+        return dataset.to_table(filter=pds.field("id") == code_id).to_pandas()
+
+codelists = CodelistStore()
@@ -5,31 +5,27 @@ from rich.tree import Tree
 from eupol.download.sdmx.base import Model, sdmxBase
 
 class DataSet(sdmxBase):
-    def __new__(cls, model):
-        cls.model = model
-        cls.toc = cls.model.init()
-        cls.query = sdmx.Request(cls.model.agency_id)
-        return cls
-    @classmethod
-    def set(cls, dataflow: str):
-        cls.dataflow = toc[toc['dataflow.id'] == dataflow]
-        cls.codes = cls.model.descendants.df(data=cls.dataflow['dataflow.id'].values[0])
-        return cls
-    @classmethod
-    def tree(cls):
-        if not hasattr(cls, 'codes'):
+    def __init__(self, model):
+        self.model = model
+        self.toc = self.model.init()
+        self.request = sdmx.Request(self.model.agency_id)
+    def set(self, dataflow: str):
+        self.dataflow = self.toc[self.toc['dataflow.id'] == dataflow]
+        self.codes = self.model.descendants.df(data=self.dataflow['dataflow.id'].values[0])
+        return self
+    def tree(self):
+        if not hasattr(self, 'codes'):
             return "No dataflow selected"
-        tree = Tree(f"[bold blue]> 🔎 The dataflow {first['dataflow.id']} has {len(cls.codes.parent.unique())} parameters to filter by:[/]")
-        for code in cls.codes.parent.unique():
+        tree = Tree(f"[bold blue]> 🔎 The dataflow {self.dataflow['dataflow.id'].values[0]} has {len(self.codes.parent.unique())} parameters to filter by:[/]")
+        for code in self.codes.parent.unique():
             codetree = tree.add(f"[bold red]{code} =[/]")
-            for subcode in cls.codes[cls.codes.parent == code].id.unique():
-                codetree.add(f"[bold yellow]{subcode}[/] [dim yellow]({cls.codes[cls.codes.id == subcode].name.values[0]})[/]")
-        cls.tree_repr = tree
+            for subcode in self.codes[self.codes.parent == code].id.unique():
+                codetree.add(f"[bold yellow]{subcode}[/] [dim yellow]({self.codes[self.codes.id == subcode].name.values[0]})[/]")
+        self.tree_repr = tree
         return tree
-    @classmethod
-    def query(cls, **kwargs):
-        return cls.query.data(
-            cls.dataflow['dataflow.id'].values[0].lower(),
+    def query(self, **kwargs):
+        return self.request.data(
+            self.dataflow['dataflow.id'].values[0].lower(),
             key=kwargs
             )
 
@@ -44,7 +40,7 @@ if __name__ == "__main__":
     dataset = DataSet(estat).set(first['dataflow.id'])
     rprint(dataset.tree())
     # # Get the first dataflow
-    response = dataset.query.data(
+    response = dataset.request.data(
         first["dataflow.id"].lower(),
         key={
             # "FREQ": "A",
@@ -0,0 +1,95 @@
+import rich.progress as rprog
+import pandas as pd
+import tempfile
+import os
+
+from typing import Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from eupol.download.utils import rc, rlog
+from eupol.download.cache import FileLock, lockfile
+from eupol.download.sdmx.base import sdmxBase, Model, TableOfContents
+
+
+class Federation:
+    """
+    Table of contents of several agencies at once.
+
+    The agencies are initialized concurrently, one `Model` per thread, and
+    their tables are unioned with an `agency` column into a single parquet
+    file. A `Federation` quacks like a `Model`, so it can be handed to
+    `TopicFilter` to search every agency at once.
+    """
+    def __init__(
+        self,
+        agencies: Optional[Iterable[str]] = None,
+        directory: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        ):
+        self.agencies: List[str] = list(sdmxBase.urls) if agencies is None else list(agencies)
+        unknown = [agency for agency in self.agencies if agency not in sdmxBase.urls]
+        if unknown:
+            raise ValueError(f"Agencies must be among {list(sdmxBase.urls)}, not {unknown}")
+        self.agency_id = "+".join(self.agencies)
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(), "eupol", "sdmx", "federated", "metadata", "TOC")
+        self.directory = directory
+        self.max_workers = max_workers if max_workers else len(self.agencies)
+        self.ftoc = None
+
+    @property
+    def filename(self) -> str:
+        return os.path.join(self.directory, f"{'-'.join(sorted(self.agencies))}_toc.parquet")
+
+    def init(self, ttl: Optional[float] = None, rebuild: Optional[bool] = False) -> pd.DataFrame:
+        """Load the federated table of contents, building every agency in parallel on a cold cache"""
+        os.makedirs(self.directory, exist_ok=True)
+        with FileLock(lockfile(self.filename)):
+            if os.path.exists(self.filename) and not rebuild:
+                self.ftoc = TableOfContents.from_parquet(self.filename)
+                self.toc = self.ftoc.toc
+                return self.toc
+            return self._build(ttl)
+
+    def _build(self, ttl: Optional[float] = None) -> pd.DataFrame:
+        progress = rprog.Progress(
+            rprog.SpinnerColumn(),
+            rprog.BarColumn(),
+            rprog.TextColumn("{task.description}"),
+            rprog.TimeElapsedColumn(),
+            console=rc,
+        )
+        tocs = {}
+        with progress, ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="eupol-federation") as pool:
+            tasks = {
+                agency: progress.add_task(f"[purple] >> ƒ() ⟶ Building Table of Contents from agency {agency}", total=1)
+                for agency in self.agencies
+            }
+            self.models = {agency: Model(agency) for agency in self.agencies}
+            futures = {
+                pool.submit(self.models[agency].init, ttl=ttl, show_progress=False): agency
+                for agency in self.agencies
+            }
+            for future in as_completed(futures):
+                agency = futures[future]
+                try:
+                    tocs[agency] = future.result()
+                    progress.update(tasks[agency], advance=1, description=f"[green] >> ✅ Done ! Table of Contents of {agency} built.")
+                except Exception as err:
+                    progress.update(tasks[agency], advance=1, description=f"[red] >> ❌ {agency} failed: {err}")
+        if not tocs:
+            raise RuntimeError(f"Could not build the table of contents of any of {self.agencies}")
+
+        self.toc = pd.concat(
+            [tocs[agency].assign(agency=agency) for agency in self.agencies if agency in tocs],
+            ignore_index=True,
+        )
+        if len(tocs) < len(self.agencies):
+            # don't cache an incomplete federation
+            rlog(f"> ⚠ only {list(tocs)} out of {self.agencies} could be built", style="red")
+            self.ftoc = TableOfContents.from_frame(self.toc)
+            return self.toc
+        TableOfContents.to_parquet(self.toc, self.filename)
+        rlog(f"> 📁 ⭳⭳ saving federated result to {self.filename}", style="blue")
+        self.ftoc = TableOfContents.from_frame(self.toc)
+        return self.toc
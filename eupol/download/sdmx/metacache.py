@@ -0,0 +1,117 @@
+import requests
+import tempfile
+import shutil
+import json
+import time
+import os
+
+from typing import Any, Callable, Dict, Optional
+from hashlib import sha256
+from pathlib import Path
+
+from eupol.download.utils import rlog, to_gzip_json, from_gzip_json
+from eupol.download import session
+from eupol.download.cache import atomic_write
+from eupol.download.metrics import metrics
+
+
+class MetadataCache:
+    """
+    Cache of parsed structural metadata, revalidated against the agency.
+
+    Every URL gets a directory holding the parsed payload and the
+    `ETag`/`Last-Modified` validators of the response it was parsed from,
+    with one subdirectory per `variant` when a document is parsed in
+    several ways.
+    Within `ttl` seconds the payload is served as is; after that a
+    conditional GET is sent and a `304 Not Modified` only refreshes the
+    timestamp, without downloading or parsing the document again.
+    """
+    ttl = 24 * 3600
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None):
+        if directory is None:
+            directory = os.path.join(tempfile.gettempdir(), "eupol", "sdmx", "metadata-cache")
+        self.directory = Path(directory)
+        if ttl is not None:
+            self.ttl = ttl
+
+    def path(self, url: str, variant: Optional[str] = None) -> Path:
+        directory = self.directory.joinpath(sha256(url.encode()).hexdigest())
+        return directory if variant is None else directory.joinpath(variant)
+
+    def headers(self, url: str, variant: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The stored validators of `url`, if any"""
+        fname = self.path(url, variant).joinpath("headers.json")
+        if not fname.exists():
+            return None
+        with open(fname, "r", encoding="UTF-8") as f:
+            return json.load(f)
+
+    def _store(self, url: str, response: requests.Response, payload: Any, variant: Optional[str] = None):
+        directory = self.path(url, variant)
+        to_gzip_json(payload, directory.joinpath("payload"), namespace="metadata")
+        self._touch(url, {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }, variant)
+
+    def _touch(self, url: str, headers: Dict[str, Any], variant: Optional[str] = None):
+        headers["checked_at"] = time.time()
+        fname = self.path(url, variant).joinpath("headers.json")
+        with atomic_write(fname) as tmp, open(tmp, "w", encoding="UTF-8") as f:
+            json.dump(headers, f)
+
+    def fetch(
+        self,
+        url: str,
+        parse: Callable[[requests.Response], Any],
+        ttl: Optional[float] = None,
+        variant: Optional[str] = None,
+        ) -> Any:
+        """
+        Return `parse(response)` for `url`, from cache when it is still fresh.
+        `parse` receives the streamed response and must return JSON serializable data,
+        different parsings of the same document are told apart by `variant`.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        headers = self.headers(url, variant)
+        payload = self.path(url, variant).joinpath("payload.json.gz")
+        if headers is not None and payload.exists():
+            if time.time() - headers["checked_at"] < ttl:
+                metrics.inc("metadata_requests_total", outcome="fresh")
+                metrics.event("metadata.hit", "> 📁✅ found {url} in metadata cache", "green", url=url)
+                return from_gzip_json(str(payload))
+            conditions = {}
+            if headers["etag"]:
+                conditions["If-None-Match"] = headers["etag"]
+            if headers["last_modified"]:
+                conditions["If-Modified-Since"] = headers["last_modified"]
+            response = session.get(url, headers=conditions, stream=True)
+            if response.status_code == 304:
+                response.close()
+                metrics.inc("metadata_requests_total", outcome="not_modified")
+                metrics.event("metadata.not_modified", "> 📁✅ {url} not modified since last check", "green", url=url)
+                self._touch(url, headers, variant)
+                return from_gzip_json(str(payload))
+        else:
+            response = session.get(url, stream=True)
+        response.raise_for_status()
+        response.raw.decode_content = True
+        metrics.inc("metadata_requests_total", outcome="fetched")
+        metrics.event("metadata.fetch", "> ƒ() parsing {url} ...", "blue", url=url)
+        result = parse(response)
+        # bytes pulled off the wire by the streaming parser
+        session.downloaded(url, response.raw.tell())
+        self._store(url, response, result, variant)
+        return result
+
+    def clear(self, url: Optional[str] = None):
+        """Forget `url` (all its variants), or every URL when none is given"""
+        directory = self.directory if url is None else self.path(url)
+        if directory.exists():
+            shutil.rmtree(directory)
+            rlog(f"> ✓ removed metadata cache {directory}", style="blue")
+
+metadata = MetadataCache()
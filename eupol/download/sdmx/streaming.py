@@ -0,0 +1,223 @@
+import xml.etree.ElementTree as ET
+
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, Optional, Tuple, Union
+
+# `xml:lang` as exposed by ElementTree
+XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+multilang_tags = ("Name", "Description")
+skipped_tags = ("Annotations",)
+# annotations telling when a dataflow last changed
+update_annotations = ("UPDATE_DATA", "UPDATE_STRUCTURE")
+
+
+def localname(tag: str) -> str:
+    """Strip the `{namespace}` part of an ElementTree tag."""
+    return tag.rsplit("}", 1)[-1]
+
+def _identity(name: str) -> str:
+    return name
+
+def _setlang(record: Dict[str, Any], key: str, elem: ET.Element):
+    """English text wins, otherwise keep the first language we met."""
+    if elem.get(XML_LANG) == "en" or key not in record:
+        record[key] = elem.text
+
+def annotations(elem: ET.Element, types: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Title (or text) of the `c:Annotation`s of the given types (all by default), keyed by lower case type"""
+    record = {}
+    for annotation in elem:
+        fields = {localname(field.tag): field for field in annotation}
+        if "AnnotationType" not in fields or (types is not None and fields["AnnotationType"].text not in types):
+            continue
+        value = fields.get("AnnotationTitle", fields.get("AnnotationText"))
+        record[fields["AnnotationType"].text.lower()] = value.text if value is not None else None
+    return record
+
+def flatten(
+    elem: ET.Element,
+    key: Optional[Callable[[str], str]] = None,
+    prefix: Optional[str] = "",
+    skip: Optional[Iterable[str]] = skipped_tags,
+    keep: Optional[Iterable[str]] = (),
+    ) -> Dict[str, Any]:
+    """
+    Flatten a (small) element into a single record.
+    Attributes become columns, `Name`/`Description` keep their english text
+    and nested elements are joined with dots, e.g. `source.ref.id`.
+    Annotations are skipped, except for the types listed in `keep`.
+    """
+    key = _identity if key is None else key
+    record = {}
+    for attr, value in elem.attrib.items():
+        record[prefix + key(attr)] = value
+    for child in elem:
+        tag = localname(child.tag)
+        if tag == "Annotations" and keep:
+            record.update({prefix + k: v for k, v in annotations(child, keep).items()})
+            continue
+        if tag in skip:
+            continue
+        if tag in multilang_tags:
+            _setlang(record, prefix + key(tag), child)
+        else:
+            record.update(flatten(child, key=key, prefix=prefix + key(tag) + ".", skip=skip, keep=keep))
+    return record
+
+def extract(
+    elem: ET.Element,
+    fields: Dict[str, Tuple[str, ...]],
+    annotated: Optional[bool] = False,
+    ) -> Dict[str, Any]:
+    """
+    Pick only `fields` out of an element. Each field is a path of local
+    names, e.g. `("Target", "Ref", "maintainableParentID")`: the last one is
+    an attribute, or a child whose (english) text is taken. With `annotated`,
+    the annotations are added as `annotations.<type>` columns.
+    """
+    record = {}
+    for name, path in fields.items():
+        node = elem
+        for part in path[:-1]:
+            node = next((child for child in node if localname(child.tag) == part), None)
+            if node is None:
+                break
+        if node is None:
+            record[name] = None
+        elif path[-1] in node.attrib:
+            record[name] = node.get(path[-1])
+        else:
+            record[name] = None
+            for child in node:
+                if localname(child.tag) == path[-1] and (record[name] is None or child.get(XML_LANG) == "en"):
+                    record[name] = child.text
+    if annotated:
+        for child in elem:
+            if localname(child.tag) == "Annotations":
+                record.update({"annotations." + k: v for k, v in annotations(child).items()})
+    return record
+
+def iterrecords(
+    source: Union[str, IO[bytes]],
+    tag: str,
+    key: Optional[Callable[[str], str]] = None,
+    skip: Optional[Iterable[str]] = skipped_tags,
+    keep: Optional[Iterable[str]] = (),
+    record: Optional[Callable[[ET.Element], Dict[str, Any]]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+    """
+    Yield one flattened record per `tag` element of a structure message,
+    or whatever `record` builds out of the element.
+    Each element is detached from the tree once flattened, so memory stays
+    constant whatever the size of the document.
+    """
+    if record is None:
+        record = lambda elem: flatten(elem, key=key, skip=skip, keep=keep)
+    parents = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+        parents.pop()
+        if localname(elem.tag) == tag:
+            yield record(elem)
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+
+def flows(
+    source: Union[str, IO[bytes]],
+    key: Optional[Callable[[str], str]] = None,
+    keep: Optional[Iterable[str]] = update_annotations,
+    ) -> Iterator[Dict[str, Any]]:
+    """Stream the `s:Dataflow` records of a dataflow message, with their update dates."""
+    return iterrecords(source, "Dataflow", key=key, keep=keep)
+
+def categorisations(
+    source: Union[str, IO[bytes]],
+    key: Optional[Callable[[str], str]] = None,
+    fields: Optional[Dict[str, Tuple[str, ...]]] = None,
+    annotated: Optional[bool] = False,
+    ) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the `s:Categorisation` records of a categorisation message,
+    every field flattened or only the given `fields` (see `extract`).
+    """
+    if fields is None:
+        return iterrecords(source, "Categorisation", key=key)
+    return iterrecords(source, "Categorisation", record=lambda elem: extract(elem, fields, annotated))
+
+def dimensions(source: Union[str, IO[bytes]], key: Optional[Callable[[str], str]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the coded `s:Dimension`s of the data structures in a message,
+    with the reference of the codelist each one is enumerated by.
+    """
+    key = _identity if key is None else key
+    enumeration = ".".join(key(tag) for tag in ("LocalRepresentation", "Enumeration", "Ref")) + "."
+    for record in iterrecords(source, "Dimension", key=key):
+        if enumeration + key("id") not in record:
+            continue
+        yield {
+            "dimension": record[key("id")],
+            "position": record.get(key("position")),
+            "agency": record.get(enumeration + key("agencyID")),
+            "codelist": record[enumeration + key("id")],
+            "version": record.get(enumeration + key("version")),
+        }
+
+def codes(source: Union[str, IO[bytes]], key: Optional[Callable[[str], str]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream the `s:Code` records of a codelist message."""
+    return iterrecords(source, "Code", key=key)
+
+def categories(source: Union[str, IO[bytes]]) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the category schemes as one row per leaf category, with the same
+    layout as `CategoryScheme.flatcats`: `id`, `name` for the scheme then
+    `level1.id`, `level1.name`, ... down to the leaf.
+    """
+    path = []
+    parents = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        tag = localname(elem.tag)
+        if event == "start":
+            if tag in ("CategoryScheme", "Category"):
+                if path:
+                    path[-1]["leaf"] = False
+                path.append({"id": elem.get("id"), "name": None, "leaf": True})
+            parents.append(elem)
+            continue
+        parents.pop()
+        if tag == "Name" and parents and localname(parents[-1].tag) in ("CategoryScheme", "Category"):
+            node = path[-1]
+            if elem.get(XML_LANG) == "en" or node["name"] is None:
+                node["name"] = elem.text
+        elif tag in ("CategoryScheme", "Category"):
+            node = path.pop()
+            if node["leaf"]:
+                row = {}
+                for level, parent in enumerate([*path, node]):
+                    prefix = "level" + str(level) + "." if level > 0 else ""
+                    row[prefix + "id"] = parent["id"]
+                    row[prefix + "name"] = parent["name"]
+                yield row
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+
+def columns(records: Iterable[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """
+    Buffer records column-wise. Columns first seen mid-stream are
+    back-filled with `None` so that every column has the same length.
+    """
+    buffers = {}
+    nrows = 0
+    for record in records:
+        for k, v in record.items():
+            if k not in buffers:
+                buffers[k] = [None] * nrows
+            buffers[k].append(v)
+        nrows += 1
+        for buffer in buffers.values():
+            if len(buffer) < nrows:
+                buffer.append(None)
+    return buffers
@@ -12,9 +12,11 @@ from hashlib import md5
 
 
 from eupol.download.utils import rlog, rc, _hrdict
+from eupol.download.cache import manager, atomic_write
 from eupol.download.paths import data_dir
 from eupol.download.text import tokenize, tokens, parse
 from eupol.download.sdmx.base import Model
+from eupol.download.sdmx.federated import Federation
 
 def _search_tmp_hash(sentence: Union[List[str], str], **kwargs):
     if isinstance(sentence, list):
@@ -34,13 +36,15 @@ def search_to_tmp_parquet(
         df: pd.DataFrame,
         rootdir: Optional[str] = "eupol",
         **kwargs):
-    rootdir = rootdir if rootdir else "parquet"
+    rootdir = rootdir if rootdir else "eupol"
     tmp = tempfile.gettempdir()
     directory = os.path.join(tmp, rootdir, "dataframes")
     os.makedirs(directory, exist_ok=True)
     filename = _search_tmp_hash(sentence, **kwargs)
     filename = os.path.join(directory, filename)
-    df.to_parquet(filename)
+    with atomic_write(filename) as tmp:
+        df.to_parquet(tmp)
+    manager.written()
 
 def search_from_tmp_parquet(
         sentence: Union[List[str], str],
@@ -48,7 +52,7 @@ def search_from_tmp_parquet(
         **kwargs
         ):
     filename = _search_tmp_hash(sentence, **kwargs)
-    rootdir = rootdir if rootdir else "parquet"
+    rootdir = rootdir if rootdir else "eupol"
     tmp = tempfile.gettempdir()
     directory = os.path.join(tmp, rootdir, "dataframes")
     filename = os.path.join(directory, filename)
@@ -60,7 +64,7 @@ def search_from_tmp_parquet(
 
 class TopicFilter:
     def __init__(self,
-        model: Optional[Model],
+        model: Optional[Union[Model, Federation]],
         agency_id: Optional[str] = None,
         cache_dir: Optional[str] = None,
         ):
@@ -70,6 +74,12 @@ class TopicFilter:
         elif model and not agency_id:
             self.model = model
             self.agency_id = self.model.agency_id
+        elif model and agency_id and isinstance(model, Federation):
+            # a single agency out of the federation
+            if agency_id not in model.agencies:
+                raise ValueError(f"agency_id must be among {model.agencies}, not {agency_id}")
+            self.model = model
+            self.agency_id = agency_id
         elif model and agency_id:
             self.model = model
             self.agency_id = self.model.agency_id
@@ -77,6 +87,10 @@ class TopicFilter:
             raise ValueError("Either agency_id or model must be provided")
         
         self.state = self.model.init()
+        if "agency" in self.state.columns and self.agency_id != self.model.agency_id:
+            self.state = self.state[self.state["agency"] == self.agency_id]
+        # searches of one agency out of a federation keep the agency column, don't mix them with the agency's own
+        self._cache_agency = self.agency_id if self.agency_id == self.model.agency_id else f"{self.model.agency_id}:{self.agency_id}"
         self.searches = []
         self._old_state = None
         self._old_search = None
@@ -94,6 +108,7 @@ class TopicFilter:
         _sentences = sentence if self.searches is None else [*self.searches, sentence]
         found = search_from_tmp_parquet(
             _sentences,
+            agency=self._cache_agency,
             colname_substring=colname_substring,
             raw=raw,
             literal_match_bonus=literal_match_bonus,
@@ -166,10 +181,14 @@ class TopicFilter:
                 ).rename(columns={0: "reason_column", 1: "reason_value"})
             keep = keep.assign(reason_column=reason.reason_column, reason_value=reason.reason_value)
         
+        if "agency" in self.state.columns:
+            # federated tables: keep track of the agency of each match
+            keep = keep.assign(agency=self.state.loc[keep.index, "agency"])
         # save for further use
         search_to_tmp_parquet(
             _sentences,
             keep,
+            agency=self._cache_agency,
             colname_substring=colname_substring,
             raw=raw,
             literal_match_bonus=literal_match_bonus,
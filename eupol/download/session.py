@@ -0,0 +1,95 @@
+import threading
+import requests
+import time
+
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from eupol.download.metrics import metrics
+
+settings: Dict[str, Any] = {
+    # connections kept alive per host
+    "pool_size": 10,
+    # retries on connection errors and on the statuses below, with exponential backoff
+    "retries": 5,
+    "backoff": 0.5,
+    "statuses": (429, 500, 502, 503, 504),
+}
+headers = {"Accept-Encoding": "gzip, deflate"}
+
+_sessions: Dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+def configure(
+    pool_size: Optional[int] = None,
+    retries: Optional[int] = None,
+    backoff: Optional[float] = None,
+    statuses: Optional[Tuple[int, ...]] = None,
+    ):
+    """Change the pooling/retry settings; sessions are rebuilt on next use."""
+    for name, value in (("pool_size", pool_size), ("retries", retries), ("backoff", backoff), ("statuses", statuses)):
+        if value is not None:
+            settings[name] = value
+    close()
+
+def _host(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+def _session() -> requests.Session:
+    retry = Retry(
+        total=settings["retries"],
+        backoff_factor=settings["backoff"],
+        status_forcelist=settings["statuses"],
+        allowed_methods=frozenset(["HEAD", "GET"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings["pool_size"], max_retries=retry)
+    session = requests.Session()
+    session.headers.update(headers)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def for_url(url: str) -> requests.Session:
+    """The pooled session of the host serving `url` (one per agency/host)."""
+    host = _host(url)
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = _session()
+    return session
+
+def get(url: str, **kwargs) -> requests.Response:
+    """
+    `requests.get` over the pooled, retrying session of the host.
+    The bytes of a streamed response are counted by its reader (see `downloaded`).
+    """
+    start = time.perf_counter()
+    response = for_url(url).get(url, **kwargs)
+    host = _host(url)
+    metrics.observe("http_request_seconds", time.perf_counter() - start, host=host)
+    metrics.inc("http_requests_total", host=host, status=response.status_code)
+    if not kwargs.get("stream"):
+        downloaded(url, len(response.content))
+    return response
+
+def downloaded(url: str, nbytes: int):
+    """Count `nbytes` downloaded from the host of `url`"""
+    metrics.inc("downloaded_bytes_total", nbytes, host=_host(url))
+
+def head(url: str, **kwargs) -> requests.Response:
+    return for_url(url).head(url, **kwargs)
+
+def close():
+    """Close every pooled connection."""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
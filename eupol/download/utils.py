@@ -1,26 +1,28 @@
-import requests
 import tempfile
-import warnings
 import inspect
 import shutil
 import pickle
 import json
-import gzip
 import sys
+import threading
+import glob
+import io
 import os
 
-from tqdm import tqdm
+import requests
+
 from rich.console import Console
-from typing import Any, Callable
+from typing import Any, Callable, List
 from pathlib import Path
 from functools import wraps
 from collections.abc import Iterable
 
-import importlib as imp
-import inspect as ins
-
 import importlib.util
 
+from eupol.download import session
+from eupol.download.metrics import metrics
+from eupol.download.cache import digest, index, formats, codecs, memory, manager, FileLock, atomic_write, lockfile
+
 rc = Console()
 rlog = rc.log
 
@@ -53,124 +55,20 @@ def human_readable(*args, **kwargs):
     fname += "@kwargs-end"
     return fname
 
-def _jsupp(obj: Any) -> Any:
-    if hasattr(obj, 'from_json'):
-        return 'from_json'
-    elif hasattr(obj, 'read_json'):
-        return 'read_json'
-    elif hasattr(obj, 'load_json'):
-        return 'load_json'
-    return None
-
-def _find_io(module: Any, reclvl=0, maxrec=2) -> str:
-    # ignore some types of warnings
-    warnings.filterwarnings("ignore", category=DeprecationWarning)
-    warnings.filterwarnings("ignore", category=FutureWarning)
-
-    # buitins are not what we're looking for
-    builtins = [
-        *sys.builtin_module_names,
-        "os", "enum", "ast", "pathlib",
-        "warnings", "inspect", "importlib",
-        "abc", "re", "operator", "functools",
-        "numbers", "collections", "typing",
-        "contextlib", "types", "dataclasses",
-        "pickle", "platform", "sysconfig",
-        "textwrap", "json", "codecs"
-        ]
-    
-    # rprint(f"🔎 inspecting {module.__name__!r} (reclvl={reclvl})")
-    if not ins.ismodule(module):
-        raise TypeError(f"expected a module, got {type(module)}")
-    if reclvl > maxrec:
-        return None
-    else:
-        # check the filenames for "*io.py" pattern
-        # only if not built-in
-        if not module.__name__ in builtins:
-            modpath = Path(module.__file__).parent
-            modpath = modpath.pop() if isinstance(modpath, list) else modpath
-            if next(modpath.glob("*io.py"), None):
-                # we only want packages, not sort-of builtins
-                if module.__package__ != '':
-                    return module
-                return module        
-            elif ".io" in module.__name__:
-                return module
-            else:
-                candidates = ins.getmembers(module, ins.ismodule)
-                if not len(candidates):
-                    return None
-                else:
-                    results = []
-                    for name, _mod in candidates:
-                        if (_smod := _find_io(_mod, reclvl=reclvl+1, maxrec=maxrec)):
-                            # no fake builtins
-                            results.append(_smod) if _smod.__package__ != '' else None
-                    if len(results):
-                        # if there is an io module in the candidates, return it
-                        ios = [r for r in results if ".io" in r.__name__]
-                        if len(ios):
-                            rlog(f"Success ✅ found using recuring search {ios[0]}", style="green") if not reclvl else None
-                            return ios[0].__name__ if not reclvl else ios[0]
-                        # prefer the least nested module
-                        results.sort(key=lambda x: x.__name__.count('.'))
-                        if not reclvl:
-                            rlog(f"Success ✅ found using recuring search for root {module.__name__!r}", style="green")
-                            rlog("Out of the following candidates: ", [r.__name__ for r in results], style="blue")
-                            # change to [r for r in results] to get all candidates
-                            return results[0]
-                        return results[0]
-                    return None
-        
-def json_support(obj: Any) -> (str, Any):
+def to_gzip_json(data: Any, path: str, namespace: str = None):
     """
-    Check if an object has a `to_json` method and a `from_json` (or `read_json`, `load_json`) method.
-    This attempts to check withing the parent modules/packages as well.
-    If the first 3 layers of submodules withing the root package do not
-    have a `to_json` method, then the object is not considered to have
-    json support.
-
-    Parameters:
-    -----------
-    obj: Any
-
-    Returns:
-    --------
-    str: the name of the module that has the `to_json` and any of the 3 reading methods
+    Write `data` as compressed json, with the codec of the cache `namespace`
+    (see `cache.codecs`). The `.json.gz` name is kept whatever the codec.
     """
-    # check the simple case first
-    if is_jsonable(obj):
-        return json, "loads"
-    # bring out the big guns
-    mod = imp.import_module(obj.__module__)
-    # try on the module first
-    if funcname := _jsupp(mod):
-        return mod, funcname
-    # try on the package root if it exists
-    pkgroot = mod.__package__.split('.')
-    pkgroot = pkgroot.pop(0) if isinstance(pkgroot, list) else pkgroot
-    pkg = imp.import_module(pkgroot)
-    if funcname := _jsupp(pkg):
-        return pkg, funcname
-    else:
-        # try to find a .io submodule in the package
-        # don't attempt more than a few levels deep
-        if modname := _find_io(pkg, maxrec=2):
-            mod = imp.import_module(modname)
-            if funcname := _jsupp(mod):
-                return modname, funcname
-        return None
-
-def to_gzip_json(data: Any, path: str):
     jsonfilename = str(path) + ".json.gz" if not path.name.endswith(".json.gz") else str(path)
     os.makedirs(path.parent, exist_ok=True)
-    with gzip.open(jsonfilename, 'wt+', encoding='UTF-8') as zipfile:
+    with atomic_write(jsonfilename) as tmp, io.TextIOWrapper(codecs.open(tmp, 'wb', namespace), encoding='UTF-8') as zipfile:
         json.dump(data, zipfile)
 
 def from_gzip_json(path: str) -> Any:
+    """Read back `to_gzip_json`, the codec is detected from the file"""
     jsonfilename = str(path) + ".json.gz" if not path.endswith(".json.gz") else path
-    with gzip.open(jsonfilename, 'rt', encoding='UTF-8') as zipfile:
+    with io.TextIOWrapper(codecs.open(jsonfilename, 'rb'), encoding='UTF-8') as zipfile:
         try:
             return json.load(zipfile)
         except json.decoder.JSONDecodeError as err:
@@ -179,13 +77,6 @@ def from_gzip_json(path: str) -> Any:
             rlog(zipfile.read(), style="red")
             raise err
 
-def is_jsonable(x: Any) -> bool:
-    try:
-        json.dumps(x)
-        return True
-    except (TypeError, OverflowError) as err:
-        return False
-
 def check_dependency(name: str):
     if name in sys.modules:
         rlog(f"✅ {name!r} already in sys.modules", style="green")
@@ -200,8 +91,9 @@ def savetmp(function: Callable):
         if not 'directory' in kwargs or not kwargs['directory']:
             tmp = tempfile.gettempdir()
             kwargs['directory'] = str(Path(tmp).joinpath("eupol", function.__name__))
-            os.makedirs(kwargs['directory'], exist_ok=True)
-            result = function(*args, **kwargs)
+        os.makedirs(kwargs['directory'], exist_ok=True)
+        result = function(*args, **kwargs)
+        manager.written()
         return result
     return wrapper
 
@@ -218,7 +110,23 @@ def funtmpdir(function : Callable, mkdir=False):
             return None
 
 def tmpcache(function: Callable) -> Callable:
+    """
+    Cache the results of `function` in the temp directory.
+    Results are stored under a content-addressed key (see `cache.digest`),
+    and looked up through the cache index, which also keeps the
+    human-readable arguments, size and hit count of every entry.
+    The file format is picked by the type of the result (see
+    `cache.formats.register`): DataFrames are stored as Arrow files
+    memory-mapped on read, GeoDataFrames as GeoParquet, dicts and lists
+    pickled, bytes as is and anything else as a gzipped pickle. Recent
+    results are also kept in memory (see `cache.memory`).
+    Concurrent misses on the same call are computed once: the callers
+    wait on a lock file, across threads and processes, then read the result.
+    Coroutine functions get an async wrapper (see `_atmpcache`).
+    """
     directory = funtmpdir(function, mkdir=True)
+    if inspect.iscoroutinefunction(function) or getattr(function, "__tornado_coroutine__", False):
+        return _atmpcache(function, directory)
     
     @wraps(function)
     def wrapper(*args, **kwargs):
@@ -230,96 +138,290 @@ def tmpcache(function: Callable) -> Callable:
         
         # unless explicitly specified, use the temp directory to cache the result
         cache = False if 'cache' in kwargs and not kwargs['cache'] else True
-        if cache:
-            fvalsname = Path(directory).joinpath(human_readable(*_args, **kwargs))
-
-            if fvalsname.with_suffix(".json.gz").exists():
-                rlog(f"> 📁✅ found {fvalsname} in cache", style="green")
-                fvalspath = str(fvalsname.with_suffix(".json.gz"))
-                stored = from_gzip_json(fvalspath)
-                if modname := stored['json_support']["module"]:
-                    mod = imp.import_module(modname) if modname != "json" else json
-                    if funcname := stored['json_support']["loader"]:
-                        jsloader = getattr(mod, funcname)
-                        result = jsloader(stored['result'])
-                else:
-                    result = stored['result']
+        if not cache:
+            return function(*args, **kwargs)
+
+        key = digest(function.__qualname__, _args, kwargs)
+        found, result = memory.get(key)
+        if found:
+            metrics.inc("cache_hits_total", function=function.__qualname__, tier="memory")
+            return result
+        found, result = _from_index(function, key)
+        if found:
+            return result
+
+        # single flight: one caller (thread or process) computes, the others wait then read its result
+        os.makedirs(directory, exist_ok=True)
+        with FileLock(lockfile(Path(directory).joinpath(key))):
+            found, result = _from_index(function, key)
+            if found:
                 return result
+            _missed(function)
+            # give class instance in call
+            result = function(*args, **kwargs)
+            size = _to_index(function, key, directory, result, _args, kwargs)
+        memory.put(key, result, function.__qualname__, size)
+        manager.written()
+        return result
+    return wrapper
 
-            elif fvalsname.with_suffix(".pkl.gz").exists():
-                rlog(f"> 📁✅ found {fvalsname} in cache", style="green")
-                fvalspath = str(fvalsname.with_suffix(".pkl.gz"))
-                with gzip.open(fvalspath, 'rb') as f:
-                    return pickle.load(f)
-            else:
-                rlog(f"> 📁 ⦰ arguments not found in cache", style="purple")
-                rlog(f"> ƒ() computing function output ...", style="blue")
-                # give class instance in call
-                result = function(*args, **kwargs)
-                if (jsupp := json_support(result)):
-                    result_module, jsloader = jsupp
-                if jsupp:
-                    if hasattr(result, 'to_json'):
-                        serialized_result = result.to_json()
-                    elif hasattr(result, 'to_dict'):
-                        serialized_result = result.to_dict()
-                    elif hasattr(result, 'json'):
-                        serialized_result = result.json()
-                    else:
-                        serialized_result = json.dumps(result)
-
-                data = {
-                    "function": function.__name__,
-                    'args': _args,
-                    'kwargs': kwargs,
-                    'result': serialized_result,
-                    'json_support': {
-                        'module': result_module.__name__ if jsupp else None,
-                        'loader': jsloader if jsupp else None
-                    }
-                }
-                rlog(f"> 📁 ⭳⭳ saving result to {fvalsname}", style="blue")
-                try:
-                    to_gzip_json(data, fvalsname) # if serializable
-                except TypeError as err:
-                    rlog(f"> 📁 ❌ {fvalsname} is not serializable: {err}", style="red")
-                    rlog(data)
-                    rlog(f"> 📁 ⭳⭳ saving result to {fvalsname} as pickle (fallback)", style="blue")
-                    with gzip.open(fvalsname.with_suffix(".pkl.gz"), 'wb') as f:
-                        pickle.dump(result, f)
+def _atmpcache(function: Callable, directory: str) -> Callable:
+    """
+    `tmpcache` of a coroutine function. The index lookups, file reads and
+    writes and the lock file waits run in the default executor, off the
+    event loop. Identical calls awaited at the same time on a loop share
+    a single call of `function`.
+    """
+    import asyncio
+
+    inflight = {}
+
+    async def compute(key, args, kwargs, _args):
+        loop = asyncio.get_running_loop()
+        found, result = await loop.run_in_executor(None, _from_index, function, key)
+        if found:
+            return result
+        os.makedirs(directory, exist_ok=True)
+        lock = FileLock(lockfile(Path(directory).joinpath(key)))
+        await loop.run_in_executor(None, lock.acquire)
+        try:
+            # another process may have computed it while we waited
+            found, result = await loop.run_in_executor(None, _from_index, function, key)
+            if found:
+                return result
+            _missed(function)
+            result = await function(*args, **kwargs)
+            size = await loop.run_in_executor(None, _to_index, function, key, directory, result, _args, kwargs)
+        finally:
+            await loop.run_in_executor(None, lock.release)
+        memory.put(key, result, function.__qualname__, size)
+        # an eviction pass walks the cache directories, keep it off the loop
+        await loop.run_in_executor(None, manager.written)
         return result
+
+    @wraps(function)
+    async def wrapper(*args, **kwargs):
+        # if class method is called, ignore self
+        _args = args[1:] if '.' in function.__qualname__ else args
+        if 'cache' in kwargs and not kwargs['cache']:
+            return await function(*args, **kwargs)
+
+        key = digest(function.__qualname__, _args, kwargs)
+        found, result = memory.get(key)
+        if found:
+            metrics.inc("cache_hits_total", function=function.__qualname__, tier="memory")
+            return result
+        loop = asyncio.get_running_loop()
+        task = inflight.get((loop, key))
+        if task is None:
+            task = inflight[(loop, key)] = loop.create_task(compute(key, args, kwargs, _args))
+            task.add_done_callback(lambda _: inflight.pop((loop, key), None))
+        # a cancelled awaiter doesn't cancel the call the others are waiting on
+        return await asyncio.shield(task)
     return wrapper
 
+def _to_index(function: Callable, key: str, directory: str, result: Any, _args: tuple, kwargs: dict) -> int:
+    """Write a `tmpcache` result to disk and index it, returns its size"""
+    with metrics.timer("cache_dump_seconds", function=function.__qualname__):
+        fvalspath = formats.dump(result, Path(directory).joinpath(key))
+    size = os.path.getsize(fvalspath)
+    metrics.inc("cache_written_bytes_total", size, function=function.__qualname__)
+    metrics.event("cache.write", "> 📁 ⭳⭳ saving result to {path}", "blue", function=function.__qualname__, path=fvalspath, size=size)
+    index.put(key, function.__qualname__, human_readable(*_args, **kwargs), fvalspath, size)
+    return size
+
+def _missed(function: Callable):
+    metrics.inc("cache_misses_total", function=function.__qualname__)
+    metrics.event("cache.miss", "> 📁 ⦰ arguments not found in cache, ƒ() computing {function} ...", "purple", function=function.__qualname__)
+
+def _from_index(function: Callable, key: str):
+    """`(found, result)` of a `tmpcache` entry on disk"""
+    entry = index.get(key)
+    if entry is None:
+        return False, None
+    try:
+        with metrics.timer("cache_load_seconds", function=function.__qualname__):
+            result = formats.load(entry["path"])
+    except (FileNotFoundError, ValueError):
+        # the file went away behind the index's back, or no serializer reads it anymore
+        index.remove(key)
+        return False, None
+    metrics.inc("cache_hits_total", function=function.__qualname__, tier="disk")
+    metrics.inc("cache_read_bytes_total", entry["size"] or 0, function=function.__qualname__)
+    metrics.event("cache.hit", "> 📁✅ found {function}({args}) in cache", "green", function=function.__qualname__, args=entry["args"])
+    index.hit(key)
+    memory.put(key, result, function.__qualname__, entry["size"])
+    return True, result
+
 def rmcache(function: Callable):
     directory = funtmpdir(function, mkdir=False)
+    memory.invalidate(function.__qualname__)
+    index.clear(function.__qualname__)
     if directory:
         shutil.rmtree(directory)
-        rlog(f"> ✓ removed cache directory {directory}", style="blue")
+        metrics.event("cache.clear", "> ✓ removed cache directory {directory}", "blue", function=function.__qualname__, directory=directory)
         
+# bytes per read and per progress update
+chunk_size = 2**20
+# parallel segments are only used for files of at least `segments` times this size
+min_segment = 8 * 2**20
+# dropped connections survived by a download (or by each of its segments)
+attempts = 5
+# ranges are byte offsets in the file as stored, keep the server from re-encoding it
+identity = {"Accept-Encoding": "identity"}
+
+def _probe(url: str):
+    """
+    `(size, ranges, validator)`: the size of `url` (None if unknown), whether
+    the server serves byte ranges, and its strong ETag or Last-Modified date
+    (None if neither), which tells whether a `.part` file is still of this file
+    """
+    try:
+        resp = session.head(url, headers=identity, allow_redirects=True)
+        resp.raise_for_status()
+    except requests.RequestException:
+        return None, False, None
+    size = resp.headers.get("Content-Length")
+    etag = resp.headers.get("ETag")
+    # If-Range only takes strong validators
+    validator = etag if etag and not etag.startswith("W/") else resp.headers.get("Last-Modified")
+    return (int(size) if size else None), resp.headers.get("Accept-Ranges", "").lower() == "bytes", validator
+
+def _leftovers(part: str) -> List[str]:
+    """`part` and its segments, if any, but not the validator they were fetched with"""
+    return [fname for fname in glob.glob(glob.escape(part) + "*") if not fname.endswith(".validator")]
+
+def _stream(url: str, part: str, update: Callable[[int], Any], start: int = 0, end: int = None, validator: str = None):
+    """
+    Write bytes `start`..`end` (inclusive, to the end by default) of `url`
+    to `part`, resuming from what `part` already holds and retrying on
+    dropped connections. Ranges are sent with `If-Range: validator`, so that
+    a server whose file changed answers with the whole new file instead.
+    """
+    for attempt in range(attempts):
+        done = os.path.getsize(part) if os.path.exists(part) else 0
+        if end is not None and start + done > end:
+            return
+        headers = dict(identity)
+        if start + done or end is not None:
+            headers["Range"] = f"bytes={start + done}-{'' if end is None else end}"
+            if validator:
+                headers["If-Range"] = validator
+        try:
+            with session.get(url, stream=True, headers=headers) as resp:
+                if resp.status_code == 416 and end is None:
+                    # "bytes */<size>": we have more than the file now holds, start over
+                    total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+                    if total.isdigit() and int(total) != done:
+                        os.remove(part)
+                        update(-done)
+                        continue
+                    # nothing left past what we have
+                    return
+                resp.raise_for_status()
+                if "Range" in headers and resp.status_code != 206:
+                    if end is not None:
+                        raise RuntimeError(f"{url} ignored the range {headers['Range']}")
+                    # no range support, or the file changed: start over
+                    update(-done)
+                    done = 0
+                with open(part, "ab" if done else "wb") as file:
+                    for data in resp.iter_content(chunk_size=chunk_size):
+                        file.write(data)
+                        update(len(data))
+                        session.downloaded(url, len(data))
+            return
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as err:
+            if attempt == attempts - 1:
+                raise
+            rlog(f"> ⚠ {url} dropped ({err}), resuming from {os.path.getsize(part) if os.path.exists(part) else 0} bytes", style="purple")
+
+def _segmented(url: str, part: str, size: int, segments: int, update: Callable[[int], Any], validator: str = None):
+    """Download `segments` byte ranges of `url` at once into `part.<start>-<end>` files and join them into `part`"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    step = -(-size // segments)
+    bounds = [(start, min(size, start + step) - 1) for start in range(0, size, step)]
+    # named by their range, so that a resume with another number of segments doesn't mix them up
+    parts = [f"{part}.{start}-{end}" for start, end in bounds]
+    with ThreadPoolExecutor(max_workers=len(bounds), thread_name_prefix="eupol-download") as pool:
+        futures = [pool.submit(_stream, url, fname, update, start, end, validator) for fname, (start, end) in zip(parts, bounds)]
+        for future in futures:
+            future.result()
+    with open(part, "wb") as out:
+        for fname in parts:
+            with open(fname, "rb") as segment:
+                shutil.copyfileobj(segment, out, chunk_size)
+    for fname in parts:
+        os.remove(fname)
+
 @savetmp
-def download(url: str, directory: str = None):
-    """Download a file from a URL to a directory."""
+def download(
+    url: str,
+    directory: str = None,
+    segments: int = 1,
+    resume: bool = True,
+    progress: bool = True,
+    callback: Callable[[int], Any] = None,
+    ):
+    """
+    Download a file from a URL to a directory.
+
+    The file is written to `<name>.part` and renamed once complete. An
+    interrupted download is resumed from the `.part` file with an HTTP
+    Range request, unless `resume` is False or the remote file changed
+    since (another ETag or Last-Modified date, or a smaller size than the
+    `.part` file): the leftovers are then dropped. With `segments` > 1 and a
+    server accepting ranges, large files are fetched as that many byte
+    ranges in parallel. `callback` receives the number of bytes of every
+    chunk written (negative when a download starts over).
+    """
     fname = url.split("/")[-1]
     fname = str(Path(directory).joinpath(fname))
-    resp = requests.get(url, stream=True)
-    total = int(resp.headers.get('content-length', 0))
-    # Can also replace 'file' with a io.BytesIO object
-    with open(fname, 'wb') as file, tqdm(
-            desc=fname,
-            total=total,
-            unit='iB',
-            unit_scale=True,
-            unit_divisor=1024,
-            ) as bar:
-        for data in resp.iter_content(chunk_size=1024):
-            size = file.write(data)
-            bar.update(size)
-    return fname
+    part = fname + ".part"
+    with FileLock(lockfile(fname)):
+        size, ranges, validator = _probe(url)
+        stamp = part + ".validator"
+        kept = Path(stamp).read_text() if os.path.exists(stamp) else None
+        done = sum(os.path.getsize(leftover) for leftover in _leftovers(part))
+        if done and resume and (kept != validator or (size is not None and done > size)):
+            rlog(f"> ⚠ {url} changed since {part} was written, starting over", style="purple")
+            resume = False
+        if not resume:
+            for leftover in _leftovers(part):
+                os.remove(leftover)
+            done = 0
+        if validator:
+            Path(stamp).write_text(validator)
+        elif os.path.exists(stamp):
+            os.remove(stamp)
+        bar = None
+        if progress:
+            from tqdm import tqdm
+
+            bar = tqdm(desc=fname, total=size, initial=done, unit='iB', unit_scale=True, unit_divisor=1024)
+        lock = threading.Lock()
+
+        def update(nbytes: int):
+            # segments report from their own threads
+            with lock:
+                if bar is not None:
+                    bar.update(nbytes)
+                if callback is not None:
+                    callback(nbytes)
 
-if __name__ == "__main__":
-    import pandas, numpy
-    # _find_io(module=numpy)
-    # _find_io(module=pandas)
-    df = pandas.DataFrame({'a': [1, 2, 3], 'b': [4, 5, 6]})
-    jsupp = json_support(obj=df)
-    print(jsupp)
\ No newline at end of file
+        try:
+            if segments > 1 and ranges and size and size >= segments * min_segment and not os.path.exists(part):
+                _segmented(url, part, size, segments, update, validator)
+            else:
+                _stream(url, part, update, validator=validator)
+        finally:
+            if bar is not None:
+                bar.close()
+        if size is not None and os.path.getsize(part) != size:
+            raise IOError(f"{url}: got {os.path.getsize(part)} bytes out of {size}, {part} is kept to resume")
+        os.replace(part, fname)
+        # segments of an earlier attempt with other bounds, and the validator
+        for leftover in glob.glob(glob.escape(part) + ".*"):
+            os.remove(leftover)
+    return fname
@@ -0,0 +1,33 @@
+import importlib
+import sys
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+def attributes(
+    package: str,
+    exports: Dict[str, Tuple[str, Optional[str]]],
+    ) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """
+    Module `__getattr__` and `__dir__` (PEP 562) importing the public names of
+    a package on first access. `exports` maps each name to the relative module
+    it lives in and the attribute to take from it, `None` for the module itself.
+    """
+    # the package is still being initialized, it is already in `sys.modules` though
+    namespace = sys.modules[package].__dict__
+
+    def __getattr__(name: str) -> object:
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module, attribute = exports[name]
+        value = importlib.import_module(module, package)
+        if attribute is not None:
+            value = getattr(value, attribute)
+        # later accesses don't go through `__getattr__` any more
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted({*namespace, *exports})
+
+    return __getattr__, __dir__
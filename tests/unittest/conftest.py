@@ -0,0 +1,34 @@
+import threading
+import tempfile
+import pytest
+
+from http.server import ThreadingHTTPServer
+
+from eupol.download.cache import CacheIndex
+from eupol.download import utils
+from eupol.download.sdmx.metacache import metadata
+
+
+@pytest.fixture
+def cachedir(tmp_path, monkeypatch):
+    """A temp directory of its own for the test, with empty tmpcache and metadata caches"""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    monkeypatch.setattr(utils, "index", CacheIndex(str(tmp_path / "index.sqlite")))
+    monkeypatch.setattr(metadata, "directory", tmp_path / "eupol" / "sdmx" / "metadata-cache")
+    return tmp_path
+
+@pytest.fixture
+def serve():
+    """`serve(Handler)` starts a local server for the handler class and returns its base URL, shut down after the test"""
+    servers = []
+
+    def start(handler) -> str:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
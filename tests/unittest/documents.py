@@ -0,0 +1,79 @@
+"""SDMX 2.1 structure documents shared by the tests, one of each resource ESTAT serves."""
+
+header = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<m:Structure xmlns:m="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message"'
+    ' xmlns:s="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/structure"'
+    ' xmlns:c="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/common">'
+    '<m:Header><m:ID>IREF</m:ID></m:Header><m:Structures>'
+)
+footer = '</m:Structures></m:Structure>'
+
+dataflows = header + """
+<s:Dataflows>
+  <s:Dataflow id="MED_PS25" agencyID="ESTAT" version="1.0" isFinal="true">
+    <c:Annotations><c:Annotation><c:AnnotationTitle>2021-02-08T23:00:00+0100</c:AnnotationTitle><c:AnnotationType>UPDATE_DATA</c:AnnotationType></c:Annotation></c:Annotations>
+    <c:Name xml:lang="fr">Formation</c:Name>
+    <c:Name xml:lang="en">Technical and vocational education training (TVET)</c:Name>
+    <s:Structure><Ref id="MED_PS25" version="1.0" agencyID="ESTAT" package="datastructure" class="DataStructure"/></s:Structure>
+  </s:Dataflow>
+  <s:Dataflow id="MED_PS26" agencyID="ESTAT" version="1.0" isFinal="true">
+    <c:Name xml:lang="en">Public expenditure on education</c:Name>
+    <c:Description xml:lang="en">Expenditure</c:Description>
+  </s:Dataflow>
+</s:Dataflows>""" + footer
+
+categorisations = header + """
+<s:Categorisations>
+  <s:Categorisation id="MED_PS25_t_med" agencyID="ESTAT" version="1.0">
+    <c:Annotations><c:Annotation><c:AnnotationTitle>2021-02-08</c:AnnotationTitle><c:AnnotationType>DISSEMINATION</c:AnnotationType></c:Annotation></c:Annotations>
+    <c:Name xml:lang="fr">Catégorisation</c:Name>
+    <c:Name xml:lang="en">Categorisation</c:Name>
+    <s:Source><Ref id="MED_PS25" version="1.0" agencyID="ESTAT" package="datastructure" class="Dataflow"/></s:Source>
+    <s:Target><Ref id="t_na10.t_nama10" maintainableParentID="t_economy" maintainableParentVersion="1.0" agencyID="ESTAT" package="categoryscheme" class="Category"/></s:Target>
+  </s:Categorisation>
+</s:Categorisations>""" + footer
+
+categoryschemes = header + """
+<s:CategorySchemes>
+  <s:CategoryScheme id="t_economy" agencyID="ESTAT" version="1.0">
+    <c:Name xml:lang="en">Economy and finance</c:Name>
+    <s:Category id="t_na10">
+      <c:Name xml:lang="en">National accounts (including GDP)</c:Name>
+      <s:Category id="t_nama10"><c:Name xml:lang="en">Annual national accounts</c:Name></s:Category>
+      <s:Category id="t_namq10"><c:Name xml:lang="en">Quarterly national accounts</c:Name></s:Category>
+    </s:Category>
+    <s:Category id="t_gov"><c:Name xml:lang="en">Government statistics</c:Name></s:Category>
+  </s:CategoryScheme>
+  <s:CategoryScheme id="t_empty" agencyID="ESTAT" version="1.0">
+    <c:Name xml:lang="en">Empty scheme</c:Name>
+  </s:CategoryScheme>
+</s:CategorySchemes>""" + footer
+
+datastructure = header + """
+<s:DataStructures>
+  <s:DataStructure id="NAMA_10_GDP" agencyID="ESTAT" version="29.0">
+    <c:Name xml:lang="en">GDP and main components</c:Name>
+    <s:DataStructureComponents>
+      <s:DimensionList id="DimensionDescriptor">
+        <s:Dimension id="freq" position="1">
+          <s:ConceptIdentity><Ref id="freq" maintainableParentID="ESTAT_CS" maintainableParentVersion="1.0" agencyID="ESTAT" package="conceptscheme" class="Concept"/></s:ConceptIdentity>
+          <s:LocalRepresentation><s:Enumeration><Ref id="FREQ" version="3.0" agencyID="ESTAT" package="codelist" class="Codelist"/></s:Enumeration></s:LocalRepresentation>
+        </s:Dimension>
+        <s:Dimension id="geo" position="2">
+          <s:LocalRepresentation><s:Enumeration><Ref id="GEO" version="13.0" agencyID="ESTAT" package="codelist" class="Codelist"/></s:Enumeration></s:LocalRepresentation>
+        </s:Dimension>
+        <s:TimeDimension id="TIME_PERIOD" position="3"><s:LocalRepresentation><s:TextFormat textType="ObservationalTimePeriod"/></s:LocalRepresentation></s:TimeDimension>
+      </s:DimensionList>
+    </s:DataStructureComponents>
+  </s:DataStructure>
+</s:DataStructures>""" + footer
+
+codelist = header + """
+<s:Codelists>
+  <s:Codelist id="GEO" agencyID="ESTAT" version="13.0">
+    <c:Name xml:lang="en">Geopolitical entity</c:Name>
+    <s:Code id="EU27_2020"><c:Name xml:lang="en">European Union - 27 countries (from 2020)</c:Name></s:Code>
+    <s:Code id="BE"><c:Name xml:lang="en">Belgium</c:Name><s:Parent><Ref id="EU27_2020"/></s:Parent></s:Code>
+  </s:Codelist>
+</s:Codelists>""" + footer
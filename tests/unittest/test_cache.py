@@ -0,0 +1,209 @@
+import subprocess
+import asyncio
+import tempfile
+import sys
+import time
+import os
+import pandas as pd
+import pytest
+
+from pathlib import Path
+
+from concurrent.futures import ThreadPoolExecutor
+
+from eupol.download.cache import CacheIndex, CacheManager, MemoryCache, FileLock, digest, formats, codecs
+from eupol.download import utils
+
+calls = []
+
+def fetch(url, params=None):
+    calls.append(url)
+    return {"url": url, "params": params}
+
+def test_digest():
+    """Keys are fixed-size and don't depend on the keyword order."""
+    key = digest("fetch", ("https://example.org/" + "a/" * 200,), {"x": 1, "y": [1, 2]})
+    assert len(key) == 64
+    assert key == digest("fetch", ("https://example.org/" + "a/" * 200,), {"y": [1, 2], "x": 1})
+    assert key != digest("other", ("https://example.org/" + "a/" * 200,), {"x": 1, "y": [1, 2]})
+
+def test_tmpcache(cachedir):
+    """Long URL arguments are cached under their key and show up in the index."""
+    cached = utils.tmpcache(fetch)
+    calls.clear()
+    url = "https://example.org/sdmx/2.1/" + "/".join(["dataflow"] * 100) + "?detail=allstubs"
+    assert cached(url, params=[1, 2]) == cached(url, params=[1, 2]) == {"url": url, "params": [1, 2]}
+    assert calls == [url]
+    # the second call came from memory, this one from disk
+    utils.memory.invalidate("fetch")
+    assert cached(url, params=[1, 2]) == {"url": url, "params": [1, 2]}
+    [entry] = utils.index.entries("fetch")
+    assert entry["hits"] == 1 and entry["size"] > 0
+    assert url in entry["args"]
+    assert Path(entry["path"]).name.startswith(entry["key"])
+    utils.rmcache(cached)
+    assert utils.index.entries() == []
+
+def test_formats():
+    """DataFrames round trip through Arrow with their dtypes, other types through their serializer."""
+    df = pd.DataFrame({
+        "id": ["a", "b"], "n": [1, 2], "x": [0.5, None],
+        "when": pd.to_datetime(["2021-02-08", "2021-03-01"]),
+    }).set_index("id")
+    with tempfile.TemporaryDirectory() as directory:
+        fname = formats.dump(df, Path(directory, "frame"))
+        assert fname.endswith(formats.arrow.suffix)
+        # whatever the module pandas reports for DataFrame, before 3.0 or since
+        assert formats._name(pd.DataFrame) in formats.registry
+        for module in ["pandas.core.frame", "pandas"]:
+            older = type("DataFrame", (), {"__module__": module})
+            assert formats.serializer(older()) is formats.arrow
+        pd.testing.assert_frame_equal(formats.load(fname), df)
+        for name, obj, serializer in [
+            ("dict", {"a": [1, 2]}, formats.binary),
+            ("bytes", b"\x00zip", formats.raw),
+            ("text", "text", formats.fallback),
+            # Arrow can't hold mixed columns, the frame is pickled instead
+            ("mixed", pd.DataFrame({"mixed": [1, "a"]}), formats.fallback),
+        ]:
+            fname = formats.dump(obj, Path(directory, name))
+            assert fname.endswith(serializer.suffix)
+            loaded = formats.load(fname)
+            assert loaded.equals(obj) if isinstance(obj, pd.DataFrame) else loaded == obj
+
+def test_register():
+    """Registered types and their subclasses get their serializer, resolved once per type."""
+    class Table(dict):
+        pass
+    class Sub(Table):
+        pass
+    assert formats.serializer(Sub()) is formats.binary
+    text = formats.Serializer(".txt", lambda obj, fname: Path(fname).write_text(str(obj)), lambda fname: Path(fname).read_text())
+    formats.register(Table, text)
+    try:
+        assert formats.serializer(Sub()) is text and Sub in formats._resolved
+        with tempfile.TemporaryDirectory() as directory:
+            assert formats.load(formats.dump(Sub(a=1), Path(directory, "sub"))) == "{'a': 1}"
+    finally:
+        del formats.registry[f"{Table.__module__}.{Table.__qualname__}"]
+        formats._resolved.clear()
+
+def test_memory():
+    """The least recently used entries go first, frames are handed out as copies."""
+    memory = MemoryCache(max_bytes=100, max_entries=2)
+    df = pd.DataFrame({"a": [1, 2]})
+    memory.put("df", df, "f", 10)
+    memory.put("b", [1], "g", 10)
+    assert memory.get("df")[0]
+    memory.put("c", [2], "g", 10)
+    assert memory.get("b") == (False, None)
+    found, cached = memory.get("df")
+    cached["b"] = cached["a"] * 2
+    assert list(memory.get("df")[1].columns) == ["a"]
+    memory.put("big", [3], "g", 90)
+    assert memory.get("c") == (False, None) and memory.nbytes == 100
+    memory.put("bigger", [4], "g", 95)
+    assert memory.get("df") == (False, None) and memory.nbytes == 95
+    memory.invalidate("g")
+    assert len(memory) == 0 and memory.nbytes == 0
+
+def test_manager():
+    """Expired entries go first, then the least recently used ones over the budget."""
+    with tempfile.TemporaryDirectory() as directory:
+        index = CacheIndex(os.path.join(directory, "index.sqlite"))
+        manager = CacheManager(root=directory, index=index)
+        now = time.time()
+        searches = Path(directory, "dataframes")
+        searches.mkdir()
+        for name, age in [("old", 8), ("recent", 1)]:
+            Path(searches, name + ".parquet").write_bytes(b"x" * 100)
+            os.utime(Path(searches, name + ".parquet"), (now - age * 86400, now - age * 86400))
+        for key, size in [("a", 300), ("b", 300)]:
+            Path(directory, key).write_bytes(b"x" * size)
+            index.put(key, "f", "", str(Path(directory, key)), size)
+        index.hit("a")
+        assert manager.usage()["total"] == {"entries": 4, "bytes": 800}
+
+        manager.configure(budget=500)
+        removed = manager.evict()
+        assert [entry["key"] for entry in removed] == ["old.parquet", "recent.parquet", "b"]
+        assert [entry["key"] for entry in manager.entries()] == ["a"]
+        assert not Path(directory, "b").exists() and index.get("b") is None
+
+def test_codecs():
+    """Files are read back whatever codec wrote them, gzip stands in for missing packages."""
+    payload = {"id": ["nama_10_gdp"] * 100, "name": ["GDP"] * 100}
+    preferences, installed = dict(codecs.preferences), dict(codecs._installed)
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            for name in [name for name in codecs.codecs if codecs.installed(name)]:
+                codecs.configure("metadata", name)
+                utils.to_gzip_json(payload, Path(directory, name), namespace="metadata")
+                fname = str(Path(directory, name + ".json.gz"))
+                assert codecs.detect(fname).name == name
+                assert utils.from_gzip_json(fname) == payload
+            codecs._installed.update(zstd=False, lz4=False)
+            codecs.configure("metadata", "zstd", "lz4")
+            assert codecs.codec("metadata") is codecs.gzip
+        finally:
+            codecs.preferences.clear()
+            codecs.preferences.update(preferences)
+            codecs._installed.clear()
+            codecs._installed.update(installed)
+
+async def afetch(url):
+    calls.append(url)
+    await asyncio.sleep(0.1)
+    return {"url": url}
+
+def test_async(cachedir):
+    """Coroutines are cached, identical calls awaited together run once."""
+    cached = utils.tmpcache(afetch)
+    calls.clear()
+
+    async def run():
+        together = await asyncio.gather(*[cached("a") for _ in range(5)], cached("b"))
+        utils.memory.invalidate("afetch")
+        return together, await cached("a")
+
+    together, again = asyncio.run(run())
+    assert together == [{"url": "a"}] * 5 + [{"url": "b"}]
+    assert again == {"url": "a"} and sorted(calls) == ["a", "b"]
+    assert sorted(entry["hits"] for entry in utils.index.entries("afetch")) == [0, 1]
+    utils.rmcache(cached)
+
+def slow(x):
+    calls.append(x)
+    time.sleep(0.2)
+    return [x]
+
+def test_single_flight(cachedir):
+    """Concurrent misses compute once, and the lock holds across processes."""
+    cached = utils.tmpcache(slow)
+    calls.clear()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(lambda _: cached("x"), range(4)))
+    assert results == [["x"]] * 4 and calls == ["x"]
+    utils.rmcache(cached)
+
+    lock = cachedir / "toc.parquet.lock"
+    holder = subprocess.Popen([
+        sys.executable, "-c",
+        f"from eupol.download.cache import FileLock; import time\nwith FileLock({str(lock)!r}): print(flush=True); time.sleep(2)",
+    ], stdout=subprocess.PIPE)
+    try:
+        holder.stdout.readline()
+        try:
+            FileLock(lock, timeout=0.2).acquire()
+            raise AssertionError("the lock is held by another process")
+        except TimeoutError:
+            pass
+    finally:
+        holder.wait()
+    with FileLock(lock, timeout=0.2):
+        pass
+
+
+if __name__ == '__main__':
+    # some tests need the fixtures of conftest.py
+    sys.exit(pytest.main([__file__]))
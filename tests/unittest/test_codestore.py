@@ -0,0 +1,74 @@
+import tempfile
+import pytest
+import sys
+import pandas as pd
+
+from http.server import BaseHTTPRequestHandler
+
+from eupol.download.sdmx.base import sdmxBase, Descendants
+from eupol.download.sdmx.codestore import CodelistStore
+from documents import datastructure, codelist
+
+geo = pd.DataFrame({
+    "id": ["EU27_2020", "BE", "FR"],
+    "name": ["European Union - 27 countries (from 2020)", "Belgium", "France"],
+})
+
+def test_store():
+    """Codelist versions are stored once and looked up by code id."""
+    with tempfile.TemporaryDirectory() as directory:
+        store = CodelistStore(directory)
+        assert ("ESTAT", "GEO", "13.0") not in store
+        store.put("ESTAT", "GEO", "9.0", geo.head(2))
+        store.put("ESTAT", "GEO", "13.0", geo)
+        assert ("ESTAT", "GEO", "13.0") in store
+        assert store.versions("ESTAT", "GEO") == ["9.0", "13.0"]
+        assert store.lookup("FR", "ESTAT", "GEO") == "France"
+        assert store.lookup("FR", "ESTAT", "GEO", "9.0") is None
+        assert store.get("ESTAT", "GEO", "9.0").id.tolist() == ["EU27_2020", "BE"]
+        assert sorted(store.find("BE").version.tolist()) == ["13.0", "9.0"]
+
+class Structures(BaseHTTPRequestHandler):
+    """Data structures and codelists, counting the requests per path"""
+    requests = []
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        self.requests.append(path)
+        if "/codelist/" in path:
+            body = codelist
+        elif path.endswith("/unversioned"):
+            # FREQ is referenced without a version
+            body = datastructure.replace('id="FREQ" version="3.0"', 'id="FREQ"')
+        else:
+            body = datastructure
+        body = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_batch(cachedir, monkeypatch, serve):
+    """Codelists shared by several dataflows are fetched once, unversioned ones at their latest version."""
+    monkeypatch.setitem(sdmxBase.urls, "ESTAT", serve(Structures))
+    store = CodelistStore(str(cachedir / "codelists"))
+    Structures.requests = []
+    codes = Descendants("ESTAT").batch(["nama_10_gdp", "nama_10_a10", "unversioned"], store=store)
+    assert sorted(codes) == ["nama_10_a10", "nama_10_gdp", "unversioned"]
+    assert codes["nama_10_gdp"]["geo"] is codes["nama_10_a10"]["geo"] is codes["unversioned"]["geo"]
+    assert codes["unversioned"]["freq"]["version"].isna().all()
+    fetched = sorted(path for path in Structures.requests if "/codelist/" in path)
+    assert fetched == ["/codelist/ESTAT/FREQ/3.0", "/codelist/ESTAT/FREQ/latest", "/codelist/ESTAT/GEO/13.0"]
+
+    # versioned codelists now come from the store, the latest one is asked again
+    Structures.requests = []
+    Descendants("ESTAT").batch(["nama_10_gdp", "unversioned"], store=store)
+    assert [path for path in Structures.requests if "/codelist/" in path] == ["/codelist/ESTAT/FREQ/latest"]
+
+
+if __name__ == '__main__':
+    # test_batch needs the fixtures of conftest.py
+    sys.exit(pytest.main([__file__]))
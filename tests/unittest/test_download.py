@@ -0,0 +1,182 @@
+import tempfile
+import pytest
+import sys
+import os
+
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+from eupol.download import utils
+from eupol.download.cache import manager
+from eupol.download.downloads import DownloadManager
+
+body = os.urandom(3 * 2**20 + 123)
+
+
+class Handler(BaseHTTPRequestHandler):
+    ranges = []
+    # bytes sent before dropping the connection, once
+    drop = None
+    # the file served and its ETag (none by default)
+    body = body
+    etag = None
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.send_header("Accept-Ranges", "bytes")
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        self.end_headers()
+
+    def do_GET(self):
+        if "missing" in self.path:
+            self.send_error(404)
+            return
+        body = self.body
+        start, end = 0, len(body) - 1
+        requested = self.headers.get("Range")
+        self.ranges.append(requested)
+        if requested and self.headers.get("If-Range", self.etag) != self.etag:
+            # the client's copy is of another version, send this one whole
+            requested = None
+        if requested:
+            first, last = requested.split("=")[1].split("-")
+            start, end = int(first), int(last) if last else len(body) - 1
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        else:
+            self.send_response(200)
+        if self.etag:
+            self.send_header("ETag", self.etag)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        if Handler.drop is not None:
+            self.wfile.write(body[start:start + Handler.drop])
+            Handler.drop = None
+            self.close_connection = True
+            return
+        self.wfile.write(body[start:end + 1])
+
+    def log_message(self, *args):
+        pass
+
+def test_manager(serve):
+    """Batches skip duplicates and files on disk, and keep going past failures."""
+    base = serve(Handler)
+    urls = [f"{base}/ref-nuts-{year}-20m.geojson.zip" for year in ("2013", "2016", "2021")]
+    with tempfile.TemporaryDirectory() as directory:
+        Handler.ranges, Handler.drop = [], None
+        manager = DownloadManager(directory, max_workers=2)
+        Path(manager.path(urls[0])).write_bytes(b"already there")
+        paths = manager.fetch([*urls, urls[1], f"{base}/missing.zip"], show_progress=False)
+        assert list(paths) == urls
+        assert Path(paths[urls[0]]).read_bytes() == b"already there"
+        assert Path(paths[urls[2]]).read_bytes() == body
+        assert len(Handler.ranges) == 2 and list(manager.errors) == [f"{base}/missing.zip"]
+
+def test_budget(cachedir, monkeypatch, serve):
+    """A batch larger than the cache budget keeps its files until it is over."""
+    monkeypatch.setattr(manager, "budget", 5 * 2**20)
+    monkeypatch.setattr(manager, "interval", 0)
+    base = serve(Handler)
+    urls = [f"{base}/ref-nuts-{year}-20m.geojson.zip" for year in ("2010", "2013", "2016", "2021")]
+    Handler.ranges, Handler.drop = [], None
+    downloads = DownloadManager(max_workers=1)
+    assert downloads.directory.startswith(str(cachedir))
+    with manager.hold():
+        paths = downloads.fetch(urls, show_progress=False)
+        assert list(paths) == urls and all(os.path.exists(path) for path in paths.values())
+    # evicted down to the budget once released
+    assert sum(os.path.exists(path) for path in paths.values()) == 1
+
+    for path in paths.values():
+        if os.path.exists(path):
+            os.remove(path)
+    paths = downloads.fetch(urls, show_progress=False)
+    assert len(paths) == 1 and all(os.path.exists(path) for path in paths.values())
+    assert downloads.errors == {}
+
+def test_resume(serve):
+    """A dropped download and a leftover .part file resume with a Range request."""
+    url = serve(Handler) + "/ref-nuts-2021-01m.shp.zip"
+    with tempfile.TemporaryDirectory() as directory:
+        # the chunk being read when the connection drops is lost
+        Handler.ranges, Handler.drop = [], 2**20 + 5000
+        fname = utils.download(url, directory=directory, progress=False)
+        assert Path(fname).read_bytes() == body
+        assert Handler.ranges == [None, f"bytes={2**20}-"]
+        assert not Path(fname + ".part").exists()
+
+        Handler.ranges = []
+        Path(fname + ".part").write_bytes(body[:2**20])
+        assert Path(utils.download(url, directory=directory, progress=False)).read_bytes() == body
+        assert Handler.ranges == [f"bytes={2**20}-"]
+
+def test_changed(serve):
+    """A .part file of another version of the remote file is dropped, not resumed."""
+    url = serve(Handler) + "/ref-nuts-2021-01m.shp.zip"
+    with tempfile.TemporaryDirectory() as directory:
+        fname = str(Path(directory) / url.split("/")[-1])
+        try:
+            # interrupted while the server had version 1
+            Handler.ranges, Handler.drop, Handler.etag = [], None, '"v1"'
+            Path(fname + ".part").write_bytes(body[:2**20])
+            Path(fname + ".part.validator").write_text('"v1"')
+
+            # same size, new ETag: start over
+            Handler.body, Handler.etag = body[::-1], '"v2"'
+            assert Path(utils.download(url, directory=directory, progress=False)).read_bytes() == body[::-1]
+            assert Handler.ranges == [None]
+            assert sorted(os.listdir(directory)) == [Path(fname).name, Path(fname).name + ".lock"]
+
+            # changed between the HEAD and the GET: If-Range gets the whole new file
+            Handler.ranges, received = [], []
+            Path(fname + ".part").write_bytes(body[:2**20])
+            utils._stream(url, fname + ".part", received.append, validator='"v1"')
+            assert Path(fname + ".part").read_bytes() == body[::-1]
+            assert Handler.ranges == [f"bytes={2**20}-"] and sum(received) == len(body) - 2**20
+
+            # a .part larger than the file, with no validator to tell
+            os.remove(fname + ".part")
+            Handler.ranges, Handler.body, Handler.etag = [], body[:2**20], None
+            Path(fname + ".part").write_bytes(body[:2**20 + 10])
+            assert Path(utils.download(url, directory=directory, progress=False)).read_bytes() == body[:2**20]
+            assert Handler.ranges == [None]
+
+            # and when the size isn't known beforehand, the 416 tells
+            Handler.ranges = []
+            Path(fname + ".part").write_bytes(body[:2**20 + 10])
+            utils._stream(url, fname + ".part", received.append)
+            assert Path(fname + ".part").read_bytes() == body[:2**20]
+            assert Handler.ranges == [f"bytes={2**20 + 10}-", None]
+        finally:
+            Handler.body, Handler.etag, Handler.drop = body, None, None
+
+def test_segments(serve):
+    """Large files come as parallel byte ranges, counted by the callback."""
+    url = serve(Handler) + "/ref-nuts-2021-01m.shp.zip"
+    min_segment = utils.min_segment
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            utils.min_segment = 2**20
+            Handler.ranges, Handler.drop = [], None
+            received = []
+            fname = utils.download(url, directory=directory, segments=3, progress=False, callback=received.append)
+            assert Path(fname).read_bytes() == body
+            assert sorted(Handler.ranges) == ["bytes=0-1048616", "bytes=1048617-2097233", "bytes=2097234-3145850"]
+            assert sum(received) == len(body)
+            assert sorted(os.listdir(directory)) == [Path(fname).name, Path(fname).name + ".lock"]
+        finally:
+            utils.min_segment = min_segment
+
+
+if __name__ == '__main__':
+    # the tests need the fixtures of conftest.py
+    sys.exit(pytest.main([__file__]))
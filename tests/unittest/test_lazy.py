@@ -0,0 +1,34 @@
+import subprocess
+import sys
+
+import eupol
+
+
+def test_import_is_lazy():
+    """`import eupol` loads none of the heavy dependencies."""
+    heavy = ["pandas", "geopandas", "xmltodict", "requests", "rich"]
+    loaded = subprocess.run(
+        [sys.executable, "-c", f"import sys, eupol, eupol.download; print([m for m in {heavy} if m in sys.modules])"],
+        check=True, capture_output=True, text=True,
+    ).stdout.strip()
+    assert loaded == "[]"
+
+def test_attributes():
+    """Exported names resolve on first access."""
+    from eupol.download.text import tokens
+    from eupol.download.sdmx.base import Model
+
+    assert eupol.tokens is tokens
+    assert eupol.download.sdmx.Model is Model
+    assert "as_geodf" in dir(eupol)
+    try:
+        eupol.nothing
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("eupol.nothing should not exist")
+
+
+if __name__ == '__main__':
+    test_import_is_lazy()
+    test_attributes()
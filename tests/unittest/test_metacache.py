@@ -0,0 +1,50 @@
+import tempfile
+import pytest
+import sys
+
+from http.server import BaseHTTPRequestHandler
+
+from eupol.download.sdmx.metacache import MetadataCache
+
+
+class Handler(BaseHTTPRequestHandler):
+    statuses = []
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.statuses.append(304)
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.statuses.append(200)
+        body = b"<m:Structure/>"
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_revalidate(serve):
+    """Fresh entries skip the network, stale ones cost a single 304 and no parse."""
+    url = serve(Handler) + "/dataflow/ESTAT/all"
+    parsed = []
+    def parse(response):
+        parsed.append(response.status_code)
+        return {"body": response.raw.read().decode()}
+    with tempfile.TemporaryDirectory() as directory:
+        cache = MetadataCache(directory, ttl=3600)
+        assert cache.fetch(url, parse) == {"body": "<m:Structure/>"}
+        assert cache.fetch(url, parse) == {"body": "<m:Structure/>"}
+        assert Handler.statuses == [200]
+        assert cache.fetch(url, parse, ttl=0) == {"body": "<m:Structure/>"}
+        assert Handler.statuses == [200, 304]
+        assert parsed == [200]
+        assert cache.headers(url)["etag"] == '"v1"'
+
+
+if __name__ == '__main__':
+    # the tests need the fixtures of conftest.py
+    sys.exit(pytest.main([__file__]))
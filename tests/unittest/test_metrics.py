@@ -0,0 +1,52 @@
+import pytest
+import sys
+
+from eupol.download.metrics import Metrics, metrics
+from eupol.download import utils
+
+
+def test_export():
+    """Counters and histograms come out as JSON and Prometheus text."""
+    m = Metrics(sinks=[])
+    m.inc("cache_hits_total", function="fetch", tier="disk")
+    m.inc("downloaded_bytes_total", 123456789, host="https://ec.europa.eu")
+    m.observe("cache_load_seconds", 0.003, function="fetch")
+    m.observe("cache_load_seconds", 2.0, function="fetch")
+    snapshot = m.snapshot()
+    assert snapshot["counters"][0] == {"name": "cache_hits_total", "labels": {"function": "fetch", "tier": "disk"}, "value": 1}
+    [histogram] = snapshot["histograms"]
+    assert histogram["count"] == 2 and histogram["buckets"]["0.005"] == 1 and histogram["buckets"]["+Inf"] == 2
+    text = m.to_prometheus()
+    assert '# TYPE eupol_cache_hits_total counter' in text
+    assert 'eupol_downloaded_bytes_total{host="https://ec.europa.eu"} 123456789' in text
+    assert 'eupol_cache_load_seconds_bucket{function="fetch",le="2.5"} 2' in text
+    assert 'eupol_cache_load_seconds_count{function="fetch"} 2' in text
+
+def loader(name):
+    return {"name": name}
+
+def test_tmpcache_metrics(cachedir):
+    """tmpcache counts its hits and misses and logs through the sinks only."""
+    events = []
+    sinks = metrics.sinks
+    try:
+        metrics.configure(sinks=[events.append])
+        cached = utils.tmpcache(loader)
+        before = {tier: metrics.value("cache_hits_total", function="loader", tier=tier) for tier in ("memory", "disk")}
+        misses = metrics.value("cache_misses_total", function="loader")
+        cached("a"), cached("a")
+        utils.memory.invalidate("loader")
+        cached("a")
+        assert metrics.value("cache_misses_total", function="loader") == misses + 1
+        assert metrics.value("cache_hits_total", function="loader", tier="memory") == before["memory"] + 1
+        assert metrics.value("cache_hits_total", function="loader", tier="disk") == before["disk"] + 1
+        assert [event.name for event in events] == ["cache.miss", "cache.write", "cache.hit"]
+        assert events[-1].fields["function"] == "loader"
+        utils.rmcache(cached)
+    finally:
+        metrics.configure(sinks=sinks)
+
+
+if __name__ == '__main__':
+    # test_tmpcache_metrics needs the fixtures of conftest.py
+    sys.exit(pytest.main([__file__]))
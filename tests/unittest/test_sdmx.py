@@ -0,0 +1,255 @@
+import pytest
+import sys
+import io
+import os
+import pandas as pd
+import xmltodict as xtd
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+
+from eupol.download.sdmx import streaming
+from eupol.download.sdmx.base import sdmxBase, Model, TableOfContents, Categorisation
+from documents import dataflows, categorisations, categoryschemes
+
+sample = {
+    "@id": "MED_PS25",
+    "@agencyID": "ESTAT",
+    "c:Name": [
+        {"@xml:lang": "fr", "#text": "Formation"},
+        {"@xml:lang": "en", "#text": "Training"},
+    ],
+    "c:Description": {"@xml:lang": "en", "#text": "Vocational training"},
+    "s:Structure": {"Ref": {"@id": "MED_PS25", "@maintainableParentID": "t_economy"}},
+    "c:Annotations": {"c:Annotation": [{"c:AnnotationType": "UPDATE_DATA"}, None]},
+}
+
+def test_normalize():
+    """Names pick their english text and keys are snake cased, without touching the input."""
+    assert sdmxBase.normalize(sample) == {
+        "id": "MED_PS25",
+        "agency_id": "ESTAT",
+        "name": "Training",
+        "description": "Vocational training",
+        "structure": {"ref": {"id": "MED_PS25", "maintainable_parent_id": "t_economy"}},
+        "annotations": {"annotation": [{"annotation_type": "UPDATE_DATA"}, None]},
+    }
+    assert sample["c:Name"][1]["#text"] == "Training"
+    assert sdmxBase.rclean(sample)["name"] == [
+        {"xml:lang": "fr", "#text": "Formation"},
+        {"xml:lang": "en", "#text": "Training"},
+    ]
+    assert sdmxBase.recurlang(sample)["c:Name"] == "Training"
+
+def test_normalize_deep():
+    """Category trees deeper than the recursion limit are fine."""
+    tree = {"@id": "leaf"}
+    for level in range(10000):
+        tree = {"@id": f"level{level}", "s:Category": [tree]}
+    depth, node = 0, sdmxBase.normalize(tree)
+    while "category" in node:
+        node = node["category"][0]
+        depth += 1
+    assert depth == 10000
+    assert node == {"id": "leaf"}
+
+def test_categorisation_extract():
+    """The parsed document and the streaming parser give the same columns."""
+    categorisation = Categorisation("ESTAT")
+    parsed = categorisation.extract(categorisation.parse(xtd.parse(categorisations)), annotations=True)
+    streamed = streaming.columns(streaming.categorisations(
+        io.BytesIO(categorisations.encode()), fields=Categorisation.fields, annotated=True,
+    ))
+    assert parsed == streamed
+    assert parsed["target.ref.maintainable_parent_id"] == ["t_economy"]
+    assert parsed["annotations.dissemination"] == ["2021-02-08"]
+    assert "annotations.dissemination" not in categorisation.extract(categorisation.parse(xtd.parse(categorisations)))
+
+def test_models():
+    """Every model keeps its own agency state."""
+    estat, comp = Model("ESTAT"), Model("COMP")
+    assert estat.dataflow.url.startswith(sdmxBase.urls["ESTAT"])
+    assert comp.dataflow.url.startswith(sdmxBase.urls["COMP"])
+    assert estat.descendants.agency_id == "ESTAT" and comp.descendants.agency_id == "COMP"
+
+class Agencies(BaseHTTPRequestHandler):
+    """The ESTAT documents, served under /<agency>/ as if that agency published them"""
+    documents = {"dataflow": dataflows, "categorisation": categorisations, "categoryscheme": categoryschemes}
+
+    def do_GET(self):
+        agency, resource = self.path.split("/")[1:3]
+        if resource not in self.documents:
+            self.send_error(404)
+            return
+        body = self.documents[resource].replace("ESTAT", agency).replace("Technical", f"{agency} technical").encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def test_models_concurrent(cachedir, monkeypatch, serve):
+    """Models of two agencies built on the same thread pool don't share their documents."""
+    base = serve(Agencies)
+    agencies = ["ESTAT", "COMP"]
+    for agency in agencies:
+        monkeypatch.setitem(sdmxBase.urls, agency, f"{base}/{agency}")
+    for stream in (True, False):
+        models = [Model(agency) for agency in agencies]
+        with ThreadPoolExecutor(max_workers=len(models)) as pool:
+            futures = [pool.submit(model.init, directory=str(cachedir / f"{stream}-{model.agency_id}"), stream=stream, show_progress=False) for model in models]
+            tocs = [future.result() for future in futures]
+        for model, toc in zip(models, tocs):
+            assert toc is model.toc
+            assert list(toc["dataflow.name"]) == [f"{model.agency_id} technical and vocational education training (TVET)"]
+            assert model.dataflow.response.url.startswith(f"{base}/{model.agency_id}/")
+            assert model.categories.response.url.startswith(f"{base}/{model.agency_id}/")
+            if not stream:
+                assert model.dataflow.data[0]["@agencyID"] == model.agency_id
+                assert model.categories.data["@agencyID"] == model.agency_id
+
+flows = pd.DataFrame({
+    "id": ["nama_10_gdp", "nama_10_a10", "une_rt_m"],
+    "name": ["GDP", "Gross value added", "Unemployment"],
+    "description": [None] * 3,
+    "update_data": ["2021-02-08", "2021-02-08", "2021-03-01"],
+})
+categories = pd.DataFrame({
+    "source.ref.id": ["nama_10_gdp", "nama_10_a10", "une_rt_m", "ghost"],
+    "target.ref.id": ["t_nama10", "t_nama10", "t_une", "t_une"],
+    "target.ref.maintainable_parent_id": ["t_na10", "t_na10", "t_lab", "t_lab"],
+})
+schemes = pd.DataFrame({"id": ["t_na10", "t_lab"], "level1.id": ["t_nama10", "t_une"]})
+
+def updated():
+    """The metadata frames a month later: GDP updated, une_rt_m replaced by lfsa_urgan"""
+    fresh = flows.drop(index=2).assign(update_data=["2021-04-01", "2021-02-08"])
+    fresh.loc[len(flows)] = ["lfsa_urgan", "Unemployment rates", None, "2021-04-01"]
+    fresh_categories = categories.copy()
+    fresh_categories.loc[2, "source.ref.id"] = "lfsa_urgan"
+    return fresh, fresh_categories, schemes
+
+def test_toc_changes():
+    """Only the dataflows whose fields or categories moved are rebuilt."""
+    stored = TableOfContents(flows, categories, schemes).df
+
+    # the categorisation of an unlisted dataflow never makes it to the table, nor to the changes
+    changed, removed = TableOfContents.changes(stored, flows, categories, schemes)
+    assert changed.empty and removed.empty
+
+    changed, removed = TableOfContents.changes(stored, *updated())
+    assert changed.tolist() == ["lfsa_urgan", "nama_10_gdp"]
+    assert removed.tolist() == ["une_rt_m"]
+
+    assert TableOfContents.changes(stored, flows.drop(columns="update_data").assign(version="1.0"), categories, schemes) == (None, None)
+
+def test_refresh(cachedir):
+    """Only the changed dataflows are joined again, and the stored table is replaced whole."""
+    model = Model("ESTAT")
+    frames = [(flows, categories, schemes)]
+    model.metadata = lambda progress, general, **kwargs: frames[-1]
+    directory = str(cachedir / "toc")
+    model.init(directory=directory, show_progress=False)
+    filename = model.tocfile(directory)
+    written = os.stat(filename).st_mtime_ns
+
+    # up to date: the stored table is kept as is
+    assert model.refresh(directory=directory, show_progress=False) is model.toc
+    pd.testing.assert_frame_equal(model.toc, pd.read_parquet(filename))
+    assert os.stat(filename).st_mtime_ns == written
+
+    frames.append(updated())
+    toc = model.refresh(directory=directory, show_progress=False)
+    rebuilt = TableOfContents(*frames[-1]).df
+    # parquet reads back strings and missing values in their own dtypes
+    plain = lambda df: df.astype(object).where(df.notna(), None)
+    bykey = lambda df: plain(df).sort_values("dataflow.id").reset_index(drop=True)
+    pd.testing.assert_frame_equal(bykey(toc), bykey(rebuilt[toc.columns]))
+    # the untouched dataflow is kept from the stored table
+    assert toc["dataflow.id"].tolist()[0] == "nama_10_a10"
+    pd.testing.assert_frame_equal(plain(pd.read_parquet(filename)), plain(toc))
+    assert sorted(os.listdir(directory)) == ["ESTAT_toc.parquet", "ESTAT_toc.parquet.lock"]
+
+def test_toc_join():
+    """The column-wise join gives the table of the former row-wise one, namesakes and missing levels included."""
+    schemes = pd.DataFrame({
+        "id": ["t_economy", "t_economy", "t_economy", "t_population", "t_empty"],
+        "name": ["Economy", "Economy", "Economy", "Population", "Empty"],
+        "level1.id": ["t_na10", "t_na10", "t_gov", "t_gov", None],
+        "level1.name": ["National accounts", "National accounts", "Government", "Government", None],
+        "level2.id": ["t_nama10", "t_namq10", None, None, None],
+        "level2.name": ["Annual", "Quarterly", None, None, None],
+    })
+    categorisations = pd.DataFrame({
+        "source.ref.id": ["nama_10_gdp", "namq_10_gdp", "gov_10a_main", "demo_pop", "demo_pop"],
+        "target.ref.id": ["t_na10.t_nama10", "t_na10.t_namq10", "t_gov", "t_gov", "t_gov"],
+        "target.ref.maintainable_parent_id": ["t_economy", "t_economy", "t_economy", "t_population", "t_population"],
+    })
+    flows = pd.DataFrame({
+        "id": ["nama_10_gdp", "namq_10_gdp", "gov_10a_main", "demo_pop", "uncategorised"],
+        "name": ["GDP", "Quarterly GDP", "Government finance", "Population", "Nowhere"],
+        "description": [None, "Quarterly", None, None, None],
+    })
+    # the row-wise implementation the join replaced
+    nested = schemes.apply(lambda row: ".".join(row[col] for col in schemes.columns if "id" in col and isinstance(row[col], str)), axis=1)
+    reference = schemes.assign(nested_id=nested)
+    reference.columns = ["category_scheme." + col for col in reference.columns]
+    categories = categorisations.drop_duplicates().rename(columns={
+        "source.ref.id": "dataflow.id", "target.ref.id": "category.id", "target.ref.maintainable_parent_id": "category.parent.id",
+    })
+    joined = pd.merge(categories, flows.rename(columns=lambda col: "dataflow." + col), on="dataflow.id")
+    joined["category.nested_id"] = joined["category.parent.id"] + "." + joined["category.id"]
+    reference = pd.merge(reference, joined, left_on="category_scheme.nested_id", right_on="category.nested_id")
+
+    assert TableOfContents.nested_ids(schemes).tolist() == nested.tolist() == [
+        "t_economy.t_na10.t_nama10", "t_economy.t_na10.t_namq10", "t_economy.t_gov", "t_population.t_gov", "t_empty",
+    ]
+    left, right = TableOfContents.categorical(pd.Series(["a", "b", None]), pd.Series(["b", "c"]))
+    assert left.dtype == right.dtype and list(left.cat.categories) == ["a", "b", "c"]
+    assert left.isna().tolist() == [False, False, True] and right.cat.codes.tolist() == [1, 2]
+    toc = TableOfContents(flows, categorisations, schemes).df
+    pd.testing.assert_frame_equal(toc.astype(object), reference.astype(object))
+    assert toc.groupby("category_scheme.id")["dataflow.id"].apply(list).to_dict() == {
+        "t_economy": ["nama_10_gdp", "namq_10_gdp", "gov_10a_main"],
+        "t_population": ["demo_pop"],
+    }
+
+def test_toc_tree(cachedir, monkeypatch):
+    """Namesake categories under different parents are kept apart, and trees are snapshot."""
+    toc = pd.DataFrame({
+        "category_scheme.name": ["Economy", "Economy", "Population"],
+        "category_scheme.level1.name": ["Regional", "National", "Regional"],
+        "dataflow.name": ["GDP", "GDP", "Deaths"],
+    })
+    snapshots = lambda: sorted((cachedir / "eupol" / "sdmx" / "toc-snapshots").glob("*.pkl"))
+    labels = lambda node: [child.label for child in node.children]
+    tree = TableOfContents.from_frame(toc).toc_tree()
+    assert labels(tree) == ["Economy", "Population"]
+    assert labels(tree.children[0]) == ["National", "Regional"]
+    assert [labels(child) for child in tree.children[0].children] == [["GDP"], ["GDP"]]
+    assert labels(tree.children[1].children[0]) == ["Deaths"]
+
+    # the same rows in another order reuse the snapshot
+    first = snapshots()
+    assert len(first) == 1
+    again = TableOfContents.from_frame(toc.iloc[::-1]).toc_tree()
+    assert snapshots() == first
+    assert labels(again) == labels(tree) and labels(again.children[0]) == labels(tree.children[0])
+
+    # only the most recently used ones are kept
+    for i in range(TableOfContents.max_snapshots + 2):
+        TableOfContents.from_frame(toc.assign(**{"dataflow.name": f"GDP {i}"})).toc_tree()
+    assert len(snapshots()) == TableOfContents.max_snapshots
+
+    # snapshots removed by another process meanwhile: a vanished one, then a lost race
+    (cachedir / "eupol" / "sdmx" / "toc-snapshots" / "gone.pkl").symlink_to(cachedir / "missing.pkl")
+    def remove(path):
+        raise FileNotFoundError(path)
+    monkeypatch.setattr(os, "remove", remove)
+    TableOfContents.from_frame(toc.assign(**{"dataflow.name": "GDP again"})).toc_tree()
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__]))
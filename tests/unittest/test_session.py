@@ -0,0 +1,66 @@
+import pytest
+import sys
+
+from http.server import BaseHTTPRequestHandler
+
+from eupol.download import session
+
+
+class Handler(BaseHTTPRequestHandler):
+    # keep-alive, so that pooled connections are reused
+    protocol_version = "HTTP/1.1"
+    # (path, client port) of every request
+    requests = []
+    # statuses to answer before the 200, once each
+    failures = []
+
+    def do_GET(self):
+        self.requests.append((self.path, self.client_address[1]))
+        status = self.failures.pop(0) if self.failures else 200
+        body = b"ok" if status == 200 else b""
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server(monkeypatch, serve):
+    """The base URL of a local server, with sessions that retry without waiting"""
+    monkeypatch.setitem(session.settings, "backoff", 0)
+    session.close()
+    Handler.requests, Handler.failures = [], []
+    yield serve(Handler)
+    session.close()
+
+def test_sessions(server):
+    """Each host has its own session, whose connection is kept alive between requests."""
+    assert session.for_url(f"{server}/a") is session.for_url(f"{server}/b?c=d")
+    assert session.for_url(f"{server}/a") is not session.for_url(server.replace("127.0.0.1", "localhost") + "/a")
+    assert session.get(f"{server}/a").text == "ok"
+    assert session.get(f"{server}/b").text == "ok"
+    [(_, first), (_, second)] = Handler.requests
+    assert first == second
+
+def test_retries(server):
+    """Transient statuses are retried, up to the configured number of retries."""
+    Handler.failures = [503]
+    response = session.get(f"{server}/flaky")
+    assert response.status_code == 200 and response.text == "ok"
+    assert [path for path, _ in Handler.requests] == ["/flaky", "/flaky"]
+
+    retries = session.settings["retries"]
+    try:
+        session.configure(retries=1)
+        Handler.requests, Handler.failures = [], [503, 503]
+        assert session.get(f"{server}/flaky").status_code == 503
+        assert len(Handler.requests) == 2
+    finally:
+        session.configure(retries=retries)
+
+
+if __name__ == '__main__':
+    # the tests need the server fixture
+    sys.exit(pytest.main([__file__]))
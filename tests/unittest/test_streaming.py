@@ -0,0 +1,88 @@
+import io
+
+from eupol.download.sdmx import streaming
+from eupol.download.sdmx.base import sdmxBase
+from documents import dataflows, categorisations, categoryschemes, datastructure, codelist
+
+
+def test_flows():
+    """Dataflows are flattened one record at a time, english names win."""
+    records = list(streaming.flows(io.BytesIO(dataflows.encode()), key=sdmxBase._cleantxt))
+    assert len(records) == 2
+    assert records[0]["id"] == "MED_PS25"
+    assert records[0]["agency_id"] == "ESTAT"
+    assert records[0]["name"] == "Technical and vocational education training (TVET)"
+    assert records[0]["structure.ref.id"] == "MED_PS25"
+    assert records[0]["update_data"] == "2021-02-08T23:00:00+0100"
+    assert "annotations" not in "".join(records[0].keys())
+    assert records[1]["description"] == "Expenditure"
+
+def test_categorisations():
+    """Categorisations expose the keys `TableOfContents` joins on."""
+    records = list(streaming.categorisations(io.BytesIO(categorisations.encode()), key=sdmxBase._cleantxt))
+    assert records == [{
+        "id": "MED_PS25_t_med",
+        "agency_id": "ESTAT",
+        "version": "1.0",
+        "name": "Categorisation",
+        "source.ref.id": "MED_PS25",
+        "source.ref.version": "1.0",
+        "source.ref.agency_id": "ESTAT",
+        "source.ref.package": "datastructure",
+        "source.ref.class": "Dataflow",
+        "target.ref.id": "t_na10.t_nama10",
+        "target.ref.maintainable_parent_id": "t_economy",
+        "target.ref.maintainable_parent_version": "1.0",
+        "target.ref.agency_id": "ESTAT",
+        "target.ref.package": "categoryscheme",
+        "target.ref.class": "Category",
+    }]
+
+def test_categorisations_fields():
+    """Only the selected fields are read, annotations on demand."""
+    fields = {"name": ("Name",), "target.ref.maintainable_parent_id": ("Target", "Ref", "maintainableParentID"), "missing": ("Source", "Nope", "id")}
+    records = list(streaming.categorisations(io.BytesIO(categorisations.encode()), fields=fields))
+    assert records == [{"name": "Categorisation", "target.ref.maintainable_parent_id": "t_economy", "missing": None}]
+    records = list(streaming.categorisations(io.BytesIO(categorisations.encode()), fields=fields, annotated=True))
+    assert records[0]["annotations.dissemination"] == "2021-02-08"
+
+def test_categories():
+    """Category schemes yield one row per leaf, like `CategoryScheme.flatcats`."""
+    rows = list(streaming.categories(io.BytesIO(categoryschemes.encode())))
+    assert rows == [
+        {"id": "t_economy", "name": "Economy and finance", "level1.id": "t_na10", "level1.name": "National accounts (including GDP)", "level2.id": "t_nama10", "level2.name": "Annual national accounts"},
+        {"id": "t_economy", "name": "Economy and finance", "level1.id": "t_na10", "level1.name": "National accounts (including GDP)", "level2.id": "t_namq10", "level2.name": "Quarterly national accounts"},
+        {"id": "t_economy", "name": "Economy and finance", "level1.id": "t_gov", "level1.name": "Government statistics"},
+        {"id": "t_empty", "name": "Empty scheme"},
+    ]
+
+def test_dimensions():
+    """Only the coded dimensions come out, with their codelist reference."""
+    rows = list(streaming.dimensions(io.BytesIO(datastructure.encode()), key=sdmxBase._cleantxt))
+    assert rows == [
+        {"dimension": "freq", "position": "1", "agency": "ESTAT", "codelist": "FREQ", "version": "3.0"},
+        {"dimension": "geo", "position": "2", "agency": "ESTAT", "codelist": "GEO", "version": "13.0"},
+    ]
+
+def test_codes():
+    """Codes keep their hierarchical parent."""
+    rows = list(streaming.codes(io.BytesIO(codelist.encode()), key=sdmxBase._cleantxt))
+    assert rows == [
+        {"id": "EU27_2020", "name": "European Union - 27 countries (from 2020)"},
+        {"id": "BE", "name": "Belgium", "parent.ref.id": "EU27_2020"},
+    ]
+
+def test_columns():
+    """Columns first seen mid-stream are back-filled."""
+    cols = streaming.columns(iter([{"a": 1}, {"a": 2, "b": 3}, {"b": 4}]))
+    assert cols == {"a": [1, 2, None], "b": [None, 3, 4]}
+
+
+if __name__ == '__main__':
+    test_flows()
+    test_categorisations()
+    test_categorisations_fields()
+    test_categories()
+    test_dimensions()
+    test_codes()
+    test_columns()
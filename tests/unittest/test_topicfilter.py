@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+import sys
+import os
+
+from eupol.download.cache import manager
+from eupol.download.sdmx import federated
+from eupol.download.sdmx.federated import Federation
+from eupol.download.sdmx.topicfilter import TopicFilter
+
+toc = pd.DataFrame({
+    "category_scheme.name": ["Economy", "Economy", "Population"],
+    "dataflow.id": ["nama_10_gdp", "nama_10_a10", "une_rt_m"],
+    "dataflow.name": ["Gross domestic product", "Gross value added", "Unemployment by sex and age"],
+})
+
+
+class Stub:
+    """`Model` stand-in serving a fixed table of contents"""
+    def __init__(self, agency_id: str, toc: pd.DataFrame):
+        self.agency_id = agency_id
+        self.toc = toc
+
+    def init(self, **kwargs) -> pd.DataFrame:
+        if self.toc is None:
+            raise ConnectionError(f"{self.agency_id} is down")
+        return self.toc
+
+def test_search_cache(cachedir):
+    """Searches are cached where the cache manager looks for them by default."""
+    found = TopicFilter(Stub("ESTAT", toc)).search("unemployment")
+    assert found["dataflow_name"].tolist() == ["Unemployment by sex and age"]
+    [entry] = manager.entries("searches")
+    assert entry["path"].startswith(str(cachedir / "eupol" / "dataframes"))
+    again = TopicFilter(Stub("ESTAT", toc.iloc[:0])).search("unemployment")
+    pd.testing.assert_frame_equal(again, found)
+
+def agencies(monkeypatch, tocs):
+    """Federations build their agencies from `tocs` (None for an agency that fails)"""
+    monkeypatch.setattr(federated, "Model", lambda agency: Stub(agency, tocs[agency]))
+
+def test_federation(cachedir, monkeypatch):
+    """The tables of every agency are unioned with an agency column, and cached."""
+    agencies(monkeypatch, {"ESTAT": toc, "COMP": toc.iloc[2:]})
+    federation = Federation(["ESTAT", "COMP"])
+    built = federation.init()
+    assert built["agency"].tolist() == ["ESTAT"] * 3 + ["COMP"]
+    assert built["dataflow.id"].tolist() == [*toc["dataflow.id"], "une_rt_m"]
+    assert federation.filename.startswith(str(cachedir))
+
+    agencies(monkeypatch, {"ESTAT": None, "COMP": None})
+    pd.testing.assert_frame_equal(Federation(["ESTAT", "COMP"]).init(), built)
+
+def test_federation_partial(cachedir, monkeypatch):
+    """An agency that fails leaves the others' tables, which aren't cached."""
+    agencies(monkeypatch, {"ESTAT": toc, "COMP": None})
+    federation = Federation(["ESTAT", "COMP"])
+    assert federation.init()["agency"].tolist() == ["ESTAT"] * 3
+    assert not os.path.exists(federation.filename)
+
+    agencies(monkeypatch, {"ESTAT": None, "COMP": None})
+    with pytest.raises(RuntimeError):
+        Federation(["ESTAT", "COMP"]).init()
+
+def test_federation_search(cachedir, monkeypatch):
+    """Federated searches say which agency matched, and can be narrowed to one agency."""
+    agencies(monkeypatch, {"ESTAT": toc, "COMP": toc.assign(**{"dataflow.name": ["Competition cases", "State aid", "Unemployment benefits"]})})
+    federation = Federation(["ESTAT", "COMP"])
+    found = TopicFilter(federation).search("unemployment")
+    assert found[["agency", "dataflow_name"]].values.tolist() == [["ESTAT", "Unemployment by sex and age"], ["COMP", "Unemployment benefits"]]
+
+    comp = TopicFilter(federation, agency_id="COMP")
+    assert comp.state["agency"].unique().tolist() == ["COMP"]
+    found = comp.search("unemployment")
+    assert found[["agency", "dataflow_name"]].values.tolist() == [["COMP", "Unemployment benefits"]]
+    found = TopicFilter(federation, agency_id="ESTAT").search("unemployment")
+    assert found[["agency", "dataflow_name"]].values.tolist() == [["ESTAT", "Unemployment by sex and age"]]
+    with pytest.raises(ValueError):
+        TopicFilter(federation, agency_id="GROW")
+
+
+if __name__ == '__main__':
+    # the tests need the fixtures of conftest.py
+    sys.exit(pytest.main([__file__]))